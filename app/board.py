@@ -0,0 +1,137 @@
+import asyncio
+from collections import OrderedDict
+from typing import Any, List, Optional
+
+from app.outbound import OutboundScheduler
+from game.session import GameSession
+from i18n import t
+
+
+class _Board:
+    __slots__ = ("chat_id", "lang", "intro", "kwargs", "lines", "shown", "message", "timer")
+
+    def __init__(self, chat_id: int, lang: str, intro: str, kwargs: dict) -> None:
+        self.chat_id = chat_id
+        self.lang = lang
+        self.intro = intro
+        self.kwargs = kwargs                        # reply_markup, message_thread_id
+        self.lines: List[str] = []                  # one per player, in join order
+        self.shown = 0                              # players in the last text sent
+        self.message: Optional[asyncio.Future] = None  # resolves to the posted Message
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class LobbyBoard:
+    """
+    One roster message per lobby, kept up to date by editing it.
+
+    Changes within `delay` seconds of each other are merged into a single
+    edit, so a burst of joins costs one API call however many people join.
+    Roster lines are built once per player and kept; an edit is only queued
+    when someone joined since the last one.
+    """
+
+    def __init__(self, outbox: OutboundScheduler, delay: float = 2.0, max_boards: int = 10_000) -> None:
+        self.outbox = outbox
+        self.delay = delay
+        self.max_boards = max_boards
+        self._boards: "OrderedDict[str, _Board]" = OrderedDict()  # session code -> board, LRU
+
+    def post(
+        self,
+        session: GameSession,
+        lang: str,
+        intro: str,
+        message_id: Optional[int] = None,
+        **kwargs: Any,
+    ) -> None:
+        """
+        Show the board for `session`: `intro` followed by the roster. With a
+        `message_id` that message is edited into the board, otherwise a new
+        message is sent.
+        """
+        previous = self._boards.pop(session.code, None)
+        if previous is not None and previous.timer is not None:
+            previous.timer.cancel()
+
+        board = _Board(session.chat_id, lang, intro, kwargs)
+        self._boards[session.code] = board
+        while len(self._boards) > self.max_boards:
+            _, oldest = self._boards.popitem(last=False)
+            if oldest.timer is not None:
+                oldest.timer.cancel()
+
+        text = self._render(board, session)
+        board.shown = len(session.players)
+        if message_id is None:
+            board.message = self.outbox.send_message(board.chat_id, text, **kwargs)
+        else:
+            board.message = self.outbox.edit_message_text(
+                board.chat_id, message_id, text, reply_markup=kwargs.get("reply_markup"),
+            )
+
+    def changed(self, session: GameSession) -> bool:
+        """
+        The roster changed; update the board after `delay` seconds. Returns
+        False if the session has no board (e.g. it was opened before a restart).
+        """
+        board = self._boards.get(session.code)
+        if board is None:
+            return False
+        self._boards.move_to_end(session.code)
+        if board.timer is None:
+            board.timer = asyncio.get_running_loop().call_later(self.delay, self._flush, session)
+        return True
+
+    def roster(self, session: GameSession, lang: str) -> str:
+        """The roster text, from the board's cached lines when possible."""
+        board = self._boards.get(session.code)
+        if board is not None and board.lang == lang:
+            self._extend(board, session)
+            lines = board.lines
+        else:
+            lines = [f"{i}. {p.username}" for i, p in enumerate(session.players, start=1)]
+        header = t(lang, "players_header", count=len(session.players), max=session.max_players)
+        return "\n".join([header, *lines])
+
+    def _flush(self, session: GameSession) -> None:
+        board = self._boards.get(session.code)
+        if board is None:
+            return
+        board.timer = None
+
+        message = board.message
+        if message is not None and not message.done():
+            # The board itself is still in the queue; try again later
+            board.timer = asyncio.get_running_loop().call_later(self.delay, self._flush, session)
+            return
+
+        if len(session.players) == board.shown:
+            return  # nothing new since the last edit
+        text = self._render(board, session)
+        board.shown = len(session.players)
+
+        if (
+            message is None
+            or message.cancelled()
+            or message.exception() is not None
+            or not hasattr(message.result(), "message_id")
+        ):
+            # The board could not be posted; post it again
+            board.message = self.outbox.send_message(board.chat_id, text, **board.kwargs)
+            return
+        self.outbox.edit_message_text(
+            board.chat_id, message.result().message_id, text, reply_markup=board.kwargs.get("reply_markup"),
+        )
+
+    def _render(self, board: _Board, session: GameSession) -> str:
+        return board.intro + "\n\n" + self.roster(session, board.lang)
+
+    @staticmethod
+    def _extend(board: _Board, session: GameSession) -> None:
+        lines = board.lines
+        players = session.players
+        if len(players) < len(lines):
+            lines.clear()
+        for i in range(len(lines), len(players)):
+            lines.append(f"{i + 1}. {players[i].username}")
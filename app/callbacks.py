@@ -0,0 +1,69 @@
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# Inline button payloads look like "1:action:arg1:arg2". The leading version
+# lets us change the format later: buttons from an older format (still on old
+# messages in chats) are simply ignored instead of being misread.
+VERSION = "1"
+SEPARATOR = ":"
+MAX_CALLBACK_DATA = 64  # bytes, Telegram limit
+
+CallbackHandler = Callable[..., Awaitable[Any]]
+
+
+def pack(action: str, *args: Any) -> str:
+    data = SEPARATOR.join((VERSION, action, *map(str, args)))
+    if len(data.encode()) > MAX_CALLBACK_DATA:
+        raise ValueError(f"Callback data is longer than {MAX_CALLBACK_DATA} bytes: {data!r}")
+    return data
+
+
+def action_of(data: str) -> str:
+    """Action name of a payload, "unknown" if it is not ours (for metrics/logs)."""
+    version, _, rest = data.partition(SEPARATOR)
+    if version != VERSION:
+        return "unknown"
+    return rest.partition(SEPARATOR)[0] or "unknown"
+
+
+class CallbackRouter:
+    """
+    Maps the action of a button payload to its handler with one dict lookup.
+
+    Handlers are registered with the types of their arguments:
+
+        @router.action("lang", str)
+        async def set_language(call, state, lang, new_lang): ...
+    """
+
+    def __init__(self) -> None:
+        self._routes: Dict[str, Tuple[CallbackHandler, Tuple[type, ...]]] = {}
+
+    def action(self, name: str, *arg_types: type) -> Callable[[CallbackHandler], CallbackHandler]:
+        if SEPARATOR in name:
+            raise ValueError(f"Action name must not contain {SEPARATOR!r}: {name!r}")
+
+        def register(handler: CallbackHandler) -> CallbackHandler:
+            self._routes[name] = (handler, arg_types)
+            return handler
+
+        return register
+
+    def resolve(self, data: str) -> Optional[Tuple[CallbackHandler, Tuple[Any, ...]]]:
+        """Handler and decoded arguments, or None for unknown/stale payloads."""
+        parts = data.split(SEPARATOR)
+        if parts[0] != VERSION or len(parts) < 2:
+            return None
+
+        route = self._routes.get(parts[1])
+        if route is None:
+            return None
+        handler, arg_types = route
+
+        raw = parts[2:]
+        if len(raw) != len(arg_types):
+            return None
+        try:
+            args = tuple(convert(value) for convert, value in zip(arg_types, raw))
+        except ValueError:
+            return None
+        return handler, args
@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from aiogram.exceptions import TelegramForbiddenError, TelegramNetworkError, TelegramServerError
+
+from app.outbound import OutboundScheduler
+from game.deck import CARD_NAMES, Deal, cards_of
+from game.session import GameSession
+from i18n import t
+
+logger = logging.getLogger(__name__)
+
+# Catalog key of each card's name ("card_lead_pipe", ...), by card id
+CARD_KEYS = tuple("card_" + name.lower().replace(" ", "_") for name in CARD_NAMES)
+
+# Worth another try; anything else (a 400, a 403) will not get better
+TRANSIENT = (TelegramNetworkError, TelegramServerError)
+
+
+@dataclass
+class FanoutResult:
+    code: str
+    delivered: List[int] = field(default_factory=list)    # telegram ids
+    unreachable: List[int] = field(default_factory=list)  # never opened a private chat with the bot
+    failed: List[int] = field(default_factory=list)
+    seconds: float = 0.0
+
+
+class HandFanout:
+    """
+    Sends every player of a started game their hand in a private chat.
+
+    All texts are rendered up front, then sent at once through the outbound
+    queue, which keeps to the rate limits (and retries a 429). At most
+    `concurrency` hands are in flight across all games, so a burst of starts
+    cannot fill the queue with DMs ahead of group replies. Network and
+    server errors are retried per recipient, `retries` times with backoff.
+
+    A 403 means the user never opened a private chat with the bot. Their
+    hand is kept (the `max_held` most recent ones) and sent again by
+    `resend()` once they do.
+    """
+
+    def __init__(
+        self,
+        outbox: OutboundScheduler,
+        concurrency: int = 20,
+        retries: int = 3,
+        backoff: float = 1.0,
+        max_held: int = 10_000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.outbox = outbox
+        self.retries = retries
+        self.backoff = backoff
+        self.max_held = max_held
+        self.clock = clock
+        self._slots = asyncio.Semaphore(concurrency)
+        self._held: "OrderedDict[int, List[str]]" = OrderedDict()  # telegram_id -> undelivered hands
+
+        # Metrics
+        self.fanouts = 0
+        self.delivered = 0
+        self.unreachable = 0
+        self.failed = 0
+        self.seconds_total = 0.0
+        self.seconds_max = 0.0
+
+    @staticmethod
+    def render(session: GameSession, game: Deal, lang: str) -> List[Tuple[int, str]]:
+        """(telegram_id, text) per player, in seat order."""
+        messages = []
+        for player, hand in zip(session.players, game.hands):
+            cards = "\n".join(f"• {t(lang, CARD_KEYS[card])}" for card in cards_of(hand))
+            messages.append((player.telegram_id, t(lang, "your_hand", code=session.code, cards=cards)))
+        return messages
+
+    async def send(self, code: str, messages: List[Tuple[int, str]]) -> FanoutResult:
+        """Deliver all `messages` concurrently and report who got theirs."""
+        result = FanoutResult(code)
+        started = self.clock()
+        outcomes = await asyncio.gather(*(self._deliver(user_id, text) for user_id, text in messages))
+        for (user_id, text), outcome in zip(messages, outcomes):
+            if outcome is None:
+                result.delivered.append(user_id)
+            elif isinstance(outcome, TelegramForbiddenError):
+                result.unreachable.append(user_id)
+                self._hold(user_id, text)
+            else:
+                result.failed.append(user_id)
+        result.seconds = self.clock() - started
+
+        self.fanouts += 1
+        self.delivered += len(result.delivered)
+        self.unreachable += len(result.unreachable)
+        self.failed += len(result.failed)
+        self.seconds_total += result.seconds
+        self.seconds_max = max(self.seconds_max, result.seconds)
+        logger.info(
+            "Hands for %s: %d delivered, %d unreachable, %d failed in %.3fs",
+            code, len(result.delivered), len(result.unreachable), len(result.failed), result.seconds,
+        )
+        return result
+
+    def resend(self, telegram_id: int) -> int:
+        """Queue the hands held for a user who was unreachable. Returns how many."""
+        texts = self._held.pop(telegram_id, [])
+        for text in texts:
+            self.outbox.send_message(telegram_id, text)
+        return len(texts)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "fanouts": self.fanouts,
+            "delivered": self.delivered,
+            "unreachable": self.unreachable,
+            "failed": self.failed,
+            "held": len(self._held),
+            "seconds_avg": self.seconds_total / self.fanouts if self.fanouts else 0.0,
+            "seconds_max": self.seconds_max,
+        }
+
+    async def _deliver(self, user_id: int, text: str) -> Optional[Exception]:
+        """None once delivered, otherwise the last error."""
+        async with self._slots:
+            for attempt in range(self.retries + 1):
+                try:
+                    await self.outbox.send_message(user_id, text)
+                    return None
+                except TRANSIENT as e:
+                    if attempt == self.retries:
+                        return e
+                    await asyncio.sleep(self.backoff * 2 ** attempt)
+                except Exception as e:
+                    return e
+
+    def _hold(self, user_id: int, text: str) -> None:
+        self._held.setdefault(user_id, []).append(text)
+        self._held.move_to_end(user_id)
+        while len(self._held) > self.max_held:
+            self._held.popitem(last=False)
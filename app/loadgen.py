@@ -0,0 +1,335 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import sys
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, AsyncGenerator, Collection, Dict, Iterable, Iterator, List, Optional
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.exceptions import TelegramForbiddenError
+from aiogram.methods import EditMessageText, SendMessage
+from aiogram.types import Chat, Message
+
+from app.callbacks import pack
+from app.metrics import Histogram
+from app.sharding import update_chat_id
+from game.errors import GameError
+
+# Offline load generator: drives bot.py's dispatcher with a stream of updates,
+# answering every API call locally, and reports throughput and latency.
+#
+#   python -m app.loadgen --groups 500 --users 5 --noise 20
+#   python -m app.loadgen --api-latency 50 --no-dm 0.2   (slow API, 20% of players never opened a DM)
+#   python -m app.loadgen --replay updates.jsonl      (one raw Update per line)
+#   python -m app.loadgen --save-baseline base.json
+#   python -m app.loadgen --baseline base.json --threshold 0.1
+#   python -m app.loadgen --baseline bench/loadgen-baseline.json  (defaults, as checked in)
+
+TOKEN = "42:LOADGEN"
+CHATTER = ("hi", "who's in?", "ok", "one sec", "lol", "ready when you are")
+
+
+class FakeSession(BaseSession):
+    """
+    Answers every API call locally, the way Telegram would, after `latency`
+    seconds. Messages to the users in `no_dm` fail with a 403, as for users
+    who never opened a private chat with the bot.
+    """
+
+    def __init__(self, latency: float = 0.0, no_dm: Collection[int] = ()) -> None:
+        super().__init__()
+        self.latency = latency
+        self.no_dm = no_dm
+        self.calls: Counter = Counter()
+        self._message_id = 0
+
+    async def make_request(self, bot: Bot, method: Any, timeout: Optional[int] = None) -> Any:
+        self.calls[type(method).__name__] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if isinstance(method, SendMessage) and method.chat_id in self.no_dm:
+            raise TelegramForbiddenError(method=method, message="Forbidden: bot can't initiate conversation with a user")
+        if isinstance(method, (SendMessage, EditMessageText)):
+            self._message_id += 1
+            return Message(
+                message_id=self._message_id,
+                date=datetime.now(),
+                chat=Chat(id=method.chat_id, type="supergroup" if method.chat_id < 0 else "private"),
+                text=method.text,
+            )
+        return True
+
+    async def stream_content(
+        self,
+        url: str,
+        headers: Optional[Dict[str, Any]] = None,
+        timeout: int = 30,
+        chunk_size: int = 65536,
+        raise_for_status: bool = True,
+    ) -> AsyncGenerator[bytes, None]:
+        # Only bot.download() reads files, and no handler calls it: every file is empty
+        return
+        yield
+
+    async def close(self) -> None:
+        pass
+
+
+# -------------------------
+# Update streams
+# -------------------------
+class Updates:
+    """Builds raw update dicts, as Telegram sends them."""
+
+    def __init__(self) -> None:
+        self.next_id = 1
+
+    def message(self, chat_id: int, user_id: int, text: str) -> Dict[str, Any]:
+        update_id = self._id()
+        return {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": self._chat(chat_id),
+                "from": self._user(user_id),
+                "text": text,
+            },
+        }
+
+    def callback(self, chat_id: int, user_id: int, data: str) -> Dict[str, Any]:
+        update_id = self._id()
+        return {
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "from": self._user(user_id),
+                "chat_instance": str(chat_id),
+                "data": data,
+                "message": {
+                    "message_id": update_id,
+                    "date": int(time.time()),
+                    "chat": self._chat(chat_id),
+                    "text": "menu",
+                },
+            },
+        }
+
+    def _id(self) -> int:
+        update_id = self.next_id
+        self.next_id += 1
+        return update_id
+
+    @staticmethod
+    def _chat(chat_id: int) -> Dict[str, Any]:
+        return {"id": chat_id, "type": "supergroup", "title": f"Load {chat_id}"}
+
+    @staticmethod
+    def _user(user_id: int) -> Dict[str, Any]:
+        return {"id": user_id, "is_bot": False, "first_name": "Player", "username": f"user{user_id}"}
+
+
+def group_script(app: Any, updates: Updates, chat_id: int, users: List[int], noise: int,
+                 rng: random.Random) -> Iterator[Dict[str, Any]]:
+    """One group's game: open a lobby, everyone joins, look around, start."""
+    owner = users[0]
+    yield updates.message(chat_id, owner, "/start")
+    yield updates.message(chat_id, owner, "/newgame")
+
+    # Generated lazily: the lobby exists once the update above was handled
+    try:
+        code = app.game_storage.get_by_chat(chat_id).code
+    except GameError:
+        return
+    for i, user in enumerate(users[1:]):
+        if i % 2:
+            yield updates.message(chat_id, user, f"/join {code}")
+        else:
+            yield updates.callback(chat_id, user, pack("join_flow"))
+            yield updates.message(chat_id, user, code)
+        for _ in range(noise):
+            yield updates.message(chat_id, rng.choice(users), rng.choice(CHATTER))
+
+    yield updates.message(chat_id, owner, "/players")
+    yield updates.callback(chat_id, owner, pack("players"))
+    yield updates.callback(chat_id, owner, pack("start"))
+    yield updates.callback(chat_id, rng.choice(users), pack("status"))
+
+
+def synthetic(app: Any, groups: int, users: int, noise: int, seed: int) -> List[Iterator[Dict[str, Any]]]:
+    rng = random.Random(seed)
+    updates = Updates()
+    return [
+        group_script(
+            app, updates, -1_000_000 - g,
+            [10_000 + g * users + u for u in range(users)], noise, rng,
+        )
+        for g in range(groups)
+    ]
+
+
+def recorded(path: str) -> List[Iterator[Dict[str, Any]]]:
+    """Updates from a file, one JSON object per line, split into per-chat streams."""
+    chats: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                update = json.loads(line)
+                chats[update_chat_id(update)].append(update)
+    return [iter(stream) for stream in chats.values()]
+
+
+# -------------------------
+# Running
+# -------------------------
+@dataclass
+class Report:
+    updates: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+    updates_per_sec: float = 0.0
+    p50_ms: float = 0.0
+    p99_ms: float = 0.0
+    max_ms: float = 0.0
+    retained_blocks_per_update: float = 0.0
+    traced_peak_mb: Optional[float] = None
+    peak_rss_mb: float = 0.0
+    api_calls: Dict[str, int] = field(default_factory=dict)
+    hands: Dict[str, float] = field(default_factory=dict)
+
+    def print(self) -> None:
+        for key, value in asdict(self).items():
+            if isinstance(value, float):
+                value = round(value, 3)
+            print(f"{key:>28}: {value}")
+
+
+def load_app() -> Any:
+    os.environ.setdefault("BOT_TOKEN", TOKEN)
+    import bot as app
+    from app.outbound import OutboundScheduler
+
+    app.create_app()
+
+    # Rate limits would only measure the limiter; send as fast as the fake API answers
+    unlimited = 1e9
+    app.outbox = OutboundScheduler(unlimited, unlimited, unlimited, unlimited, unlimited)
+    app.lobby_board.outbox = app.outbox
+    app.hand_fanout.outbox = app.outbox
+    return app
+
+
+async def run(app: Any, streams: Iterable[Iterator[Dict[str, Any]]], concurrency: int,
+              trace_malloc: bool = False, api_latency: float = 0.0, no_dm: Collection[int] = ()) -> Report:
+    """
+    Feed the streams through the dispatcher. Each stream (one chat) is fed
+    in order; up to `concurrency` streams are in progress at a time.
+    """
+    session = FakeSession(api_latency, no_dm)
+    bot = Bot(token=TOKEN, session=session)
+    dp = app.build_dispatcher()
+    services = app.start_services(bot)
+
+    pending = list(streams)
+    pending.reverse()
+    hist = Histogram()
+    report = Report()
+
+    async def worker() -> None:
+        while pending:
+            for update in pending.pop():
+                start = time.perf_counter()
+                try:
+                    await dp.feed_raw_update(bot, update)
+                except Exception:
+                    report.errors += 1
+                hist.record(time.perf_counter() - start)
+
+    if trace_malloc:
+        tracemalloc.start()
+    blocks = sys.getallocatedblocks()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    while app.outbox.depth or app.background_tasks:
+        await asyncio.sleep(0.01)
+    report.seconds = time.perf_counter() - started
+    retained = sys.getallocatedblocks() - blocks
+    if trace_malloc:
+        report.traced_peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+
+    await app.stop_services(services)
+
+    report.updates = hist.count
+    report.updates_per_sec = hist.count / report.seconds if report.seconds else 0.0
+    report.p50_ms = hist.percentile(0.50) * 1000
+    report.p99_ms = hist.percentile(0.99) * 1000
+    report.max_ms = hist.percentile(1.0) * 1000
+    report.retained_blocks_per_update = retained / hist.count if hist.count else 0.0
+    report.peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    report.api_calls = dict(session.calls)
+    report.hands = app.hand_fanout.stats()
+    return report
+
+
+def regressions(report: Report, baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """What got worse than the baseline by more than `threshold` (a fraction)."""
+    found = []
+    if report.updates_per_sec < baseline["updates_per_sec"] * (1 - threshold):
+        found.append(f"updates/sec {report.updates_per_sec:.0f} < baseline {baseline['updates_per_sec']:.0f}")
+    for key in ("p50_ms", "p99_ms"):
+        if getattr(report, key) > baseline[key] * (1 + threshold):
+            found.append(f"{key} {getattr(report, key):.3f} > baseline {baseline[key]:.3f}")
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline load test for the bot's handlers")
+    parser.add_argument("--groups", type=int, default=200, help="synthetic groups")
+    parser.add_argument("--users", type=int, default=5, help="users per group")
+    parser.add_argument("--noise", type=int, default=10, help="chat messages after each join")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--replay", metavar="FILE", help="feed recorded updates instead (JSON lines)")
+    parser.add_argument("--concurrency", type=int, default=16, help="chats in progress at a time")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="ms the fake API takes per call")
+    parser.add_argument("--no-dm", type=float, default=0.0, help="fraction of users who never opened a DM")
+    parser.add_argument("--trace-malloc", action="store_true", help="report peak traced memory (slow)")
+    parser.add_argument("--save-baseline", metavar="FILE")
+    parser.add_argument("--baseline", metavar="FILE", help="fail if worse than this baseline")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed regression (fraction)")
+    args = parser.parse_args()
+
+    app = load_app()
+    if args.replay:
+        streams = recorded(args.replay)
+    else:
+        streams = synthetic(app, args.groups, args.users, args.noise, args.seed)
+    # Synthetic user ids are 10_000 + n (see synthetic())
+    rng = random.Random(args.seed)
+    no_dm = {10_000 + n for n in range(args.groups * args.users) if rng.random() < args.no_dm}
+    report = asyncio.run(run(app, streams, args.concurrency, args.trace_malloc, args.api_latency / 1000, no_dm))
+    report.print()
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(asdict(report), f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            found = regressions(report, json.load(f), args.threshold)
+        for line in found:
+            print("REGRESSION:", line)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+import asyncio
+from typing import List
+
+
+class ChatLocks:
+    """
+    Per-chat asyncio locks for session operations.
+
+    A fixed pool of locks is shared by hashing the chat id, so memory stays
+    constant no matter how many chats the bot has seen. Two chats may share
+    a lock, which only costs a little waiting, never correctness.
+    """
+
+    def __init__(self, stripes: int = 1024) -> None:
+        self._locks: List[asyncio.Lock] = [asyncio.Lock() for _ in range(stripes)]
+
+    def __call__(self, chat_id: int) -> asyncio.Lock:
+        return self._locks[hash(chat_id) % len(self._locks)]
@@ -0,0 +1,175 @@
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List
+
+from aiohttp import web
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.types import CallbackQuery, TelegramObject
+
+from app.callbacks import action_of
+
+perf_counter = time.perf_counter
+
+
+class Histogram:
+    """
+    Latency histogram with log-linear buckets (HDR style).
+
+    Values are kept in microseconds: exact below 8 us, then 8 buckets per
+    power of two, so any value is off by at most 12.5%. Recording is a
+    bit_length, a shift and a list increment.
+    """
+
+    __slots__ = ("counts", "count", "sum")
+
+    SIZE = 64 * 8
+
+    def __init__(self) -> None:
+        self.counts = [0] * self.SIZE
+        self.count = 0
+        self.sum = 0.0
+
+    def record(self, seconds: float) -> None:
+        us = int(seconds * 1_000_000)
+        shift = us.bit_length() - 4
+        if shift < 0:
+            index = us
+        else:
+            index = (shift + 1) * 8 + (us >> shift) - 8
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+
+    @classmethod
+    def upper_bound(cls, index: int) -> float:
+        """Upper edge of bucket `index`, in seconds."""
+        if index < 8:
+            return (index + 1) / 1_000_000
+        shift, sub = divmod(index, 8)
+        return ((9 + sub) << (shift - 1)) / 1_000_000
+
+    def percentile(self, q: float) -> float:
+        target = q * self.count
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= target:
+                return self.upper_bound(index)
+        return 0.0
+
+
+class Metrics:
+    def __init__(self, prefix: str = "clue") -> None:
+        self.prefix = prefix
+        self.handlers: Dict[str, Histogram] = {}
+        self.api_calls: Dict[str, Histogram] = {}
+        self.errors: Counter = Counter()
+        self.gauges: Dict[str, Callable[[], float]] = {}
+
+    def observe_handler(self, name: str, seconds: float) -> None:
+        hist = self.handlers.get(name)
+        if hist is None:
+            hist = self.handlers[name] = Histogram()
+        hist.record(seconds)
+
+    def observe_api(self, method: str, seconds: float) -> None:
+        hist = self.api_calls.get(method)
+        if hist is None:
+            hist = self.api_calls[method] = Histogram()
+        hist.record(seconds)
+
+    def count_error(self, error: Exception) -> None:
+        self.errors[type(error).__name__] += 1
+
+    def gauge(self, name: str, read: Callable[[], float]) -> None:
+        """Register a value that is read on every scrape."""
+        self.gauges[name] = read
+
+    # -------------------------
+    # Prometheus text format
+    # -------------------------
+    def render(self) -> str:
+        lines: List[str] = []
+        self._render_histograms(lines, "handler_seconds", "handler", self.handlers)
+        self._render_histograms(lines, "telegram_api_seconds", "method", self.api_calls)
+
+        name = f"{self.prefix}_game_errors_total"
+        lines.append(f"# TYPE {name} counter")
+        for error, n in sorted(self.errors.items()):
+            lines.append(f'{name}{{error="{error}"}} {n}')
+
+        for gauge, read in sorted(self.gauges.items()):
+            name = f"{self.prefix}_{gauge}"
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {read()}")
+        return "\n".join(lines) + "\n"
+
+    def _render_histograms(self, lines: List[str], metric: str, label: str, hists: Dict[str, Histogram]) -> None:
+        name = f"{self.prefix}_{metric}"
+        lines.append(f"# TYPE {name} histogram")
+        for key, hist in sorted(hists.items()):
+            cumulative = 0
+            for index, n in enumerate(hist.counts):
+                if n:
+                    cumulative += n
+                    lines.append(f'{name}_bucket{{{label}="{key}",le="{Histogram.upper_bound(index):.6f}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{label}="{key}",le="+Inf"}} {hist.count}')
+            lines.append(f'{name}_sum{{{label}="{key}"}} {hist.sum:.6f}')
+            lines.append(f'{name}_count{{{label}="{key}"}} {hist.count}')
+
+
+# -------------------------
+# aiogram hooks
+# -------------------------
+def handler_name(event: TelegramObject, data: Dict[str, Any]) -> str:
+    if isinstance(event, CallbackQuery):
+        # One series per button action: "callbacks:status", "callbacks:lang", ...
+        return "callbacks:" + action_of(event.data or "")
+    handler = data.get("handler")
+    return handler.callback.__name__ if handler else "unhandled"
+
+
+class HandlerTimer(BaseMiddleware):
+    """Inner middleware: times each handler call."""
+
+    def __init__(self, metrics: Metrics) -> None:
+        self.metrics = metrics
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        start = perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            self.metrics.observe_handler(handler_name(event, data), perf_counter() - start)
+
+
+class ApiTimer(BaseRequestMiddleware):
+    """Bot session middleware: times each Telegram API call."""
+
+    def __init__(self, metrics: Metrics) -> None:
+        self.metrics = metrics
+
+    async def __call__(self, make_request: Any, bot: Any, method: Any) -> Any:
+        start = perf_counter()
+        try:
+            return await make_request(bot, method)
+        finally:
+            self.metrics.observe_api(type(method).__name__, perf_counter() - start)
+
+
+async def serve(metrics: Metrics, host: str, port: int) -> web.AppRunner:
+    async def scrape(request: web.Request) -> web.Response:
+        return web.Response(text=metrics.render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", scrape)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
@@ -0,0 +1,299 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until one token is available (0 if it is available now)."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+
+class _Job:
+    __slots__ = ("method", "chat_id", "kwargs", "futures", "enqueued_at", "edit_key")
+
+    def __init__(self, method: str, chat_id: int, kwargs: Dict[str, Any], enqueued_at: float,
+                 edit_key: Optional[Tuple[int, int]] = None) -> None:
+        self.method = method
+        self.chat_id = chat_id
+        self.kwargs = kwargs
+        self.futures: List[asyncio.Future] = []
+        self.enqueued_at = enqueued_at
+        self.edit_key = edit_key
+
+
+class OutboundScheduler:
+    """
+    Queue for everything the bot sends to chats.
+
+    Each chat has its own FIFO queue and token bucket (~20 msg/min for groups,
+    ~1 msg/s for private chats), and all chats share a global bucket
+    (~30 msg/s). Chats take turns, so one busy group cannot hold up the
+    others. A pending edit of a message is replaced by a newer edit of the
+    same message. A 429 pauses only the chat that got it.
+
+    `send_message` / `edit_message_text` return a future with the API result;
+    handlers normally do not wait for it.
+    """
+
+    MAX_IDLE_BUCKETS = 10_000
+
+    def __init__(
+        self,
+        global_rate: float = 30.0,
+        group_rate: float = 20 / 60,
+        group_burst: float = 5,
+        private_rate: float = 1.0,
+        private_burst: float = 3,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.group_rate = group_rate
+        self.group_burst = group_burst
+        self.private_rate = private_rate
+        self.private_burst = private_burst
+        self.clock = clock
+
+        self._global = TokenBucket(global_rate, global_rate, clock())
+        self._buckets: Dict[int, TokenBucket] = {}
+        self._prune_at = self.MAX_IDLE_BUCKETS
+        self._queues: Dict[int, Deque[_Job]] = {}
+        self._ready: Deque[int] = deque()  # chats with queued jobs, round-robin
+        self._edits: Dict[Tuple[int, int], _Job] = {}
+        self._busy: Dict[int, float] = {}  # chat_id -> paused until (inf while a send is in flight)
+        self._wakeup = asyncio.Event()
+        self._sending: Set[asyncio.Task] = set()  # the loop only keeps weak references to tasks
+
+        # Metrics
+        self.depth = 0
+        self.sent = 0
+        self.coalesced = 0
+        self.retries = 0
+        self.failed = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    # -------------------------
+    # Public API
+    # -------------------------
+    def send_message(self, chat_id: int, text: str, **kwargs: Any) -> asyncio.Future:
+        return self._enqueue(_Job("send_message", chat_id, dict(kwargs, chat_id=chat_id, text=text), self.clock()))
+
+    def send_document(self, chat_id: int, document: Any, **kwargs: Any) -> asyncio.Future:
+        return self._enqueue(_Job("send_document", chat_id, dict(kwargs, chat_id=chat_id, document=document), self.clock()))
+
+    def edit_message_text(self, chat_id: int, message_id: int, text: str, **kwargs: Any) -> asyncio.Future:
+        key = (chat_id, message_id)
+        kwargs = dict(kwargs, chat_id=chat_id, message_id=message_id, text=text)
+
+        pending = self._edits.get(key)
+        if pending is not None:
+            # Only the latest content matters; the older caller gets the same result.
+            pending.kwargs = kwargs
+            self.coalesced += 1
+            future = asyncio.get_running_loop().create_future()
+            pending.futures.append(future)
+            return future
+
+        job = _Job("edit_message_text", chat_id, kwargs, self.clock(), edit_key=key)
+        self._edits[key] = job
+        return self._enqueue(job)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "depth": self.depth,
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "retries": self.retries,
+            "failed": self.failed,
+            "latency_avg": self.latency_total / self.sent if self.sent else 0.0,
+            "latency_max": self.latency_max,
+        }
+
+    async def run(self, bot: Any) -> None:
+        while True:
+            wait = self.pump(bot)
+            # Sleep until the first rate-limited chat (or the global bucket)
+            # frees up, or new work arrives
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), wait if wait != float("inf") else None)
+            except asyncio.TimeoutError:
+                pass
+
+    def pump(self, bot: Any) -> float:
+        """
+        Start every send the rate limits allow now. Returns the seconds until
+        the next one may go (inf when nothing is queued). `run()` calls it in
+        a loop; tests call it directly with a fake clock.
+        """
+        while self._ready:
+            now = self.clock()
+            wait = self._global.wait_time(now)
+            if wait:
+                return wait
+
+            chat_id, wait = self._pick_chat(now)
+            if chat_id is None:
+                return wait  # every chat with work is rate limited or busy
+
+            queue = self._queues[chat_id]
+            job = queue.popleft()
+            if queue:
+                self._ready.append(chat_id)
+            if job.edit_key is not None:
+                del self._edits[job.edit_key]
+            self._global.take()
+            self._bucket(chat_id, now).take()
+            self._busy[chat_id] = float("inf")
+            task = asyncio.create_task(self._deliver(bot, job))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+        return float("inf")
+
+    # -------------------------
+    # Internals
+    # -------------------------
+    def _enqueue(self, job: _Job) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        job.futures.append(future)
+
+        queue = self._queues.get(job.chat_id)
+        if queue is None:
+            queue = self._queues[job.chat_id] = deque()
+        if not queue:
+            self._ready.append(job.chat_id)
+        queue.append(job)
+        self.depth += 1
+        self._wakeup.set()
+        return future
+
+    def _bucket(self, chat_id: int, now: float) -> TokenBucket:
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            if len(self._buckets) >= self._prune_at:
+                self._prune_buckets(now)
+            if chat_id < 0:  # groups and channels
+                bucket = TokenBucket(self.group_rate, self.group_burst, now)
+            else:
+                bucket = TokenBucket(self.private_rate, self.private_burst, now)
+            self._buckets[chat_id] = bucket
+        return bucket
+
+    def _prune_buckets(self, now: float) -> None:
+        # A full bucket carries no state, so idle chats can be forgotten.
+        for chat_id, bucket in list(self._buckets.items()):
+            if chat_id not in self._queues and not bucket.wait_time(now) and bucket.tokens >= bucket.capacity:
+                del self._buckets[chat_id]
+        for chat_id, until in list(self._busy.items()):
+            if until <= now:
+                del self._busy[chat_id]
+        # Keep pruning amortized O(1) per new chat even if few were idle
+        self._prune_at = max(self.MAX_IDLE_BUCKETS, 2 * len(self._buckets))
+
+    def _pick_chat(self, now: float) -> Tuple[Optional[int], float]:
+        """Next chat (round-robin) that may send now, or how long to wait."""
+        wait = float("inf")
+        for _ in range(len(self._ready)):
+            chat_id = self._ready[0]
+            self._ready.rotate(-1)
+
+            busy_until = self._busy.get(chat_id, 0.0)
+            if busy_until > now:
+                wait = min(wait, busy_until - now)
+                continue
+
+            chat_wait = self._bucket(chat_id, now).wait_time(now)
+            if chat_wait:
+                wait = min(wait, chat_wait)
+                continue
+
+            self._ready.pop()  # it was rotated to the back
+            return chat_id, 0.0
+        return None, wait
+
+    async def _deliver(self, bot: Any, job: _Job) -> None:
+        chat_id = job.chat_id
+        resume_at = 0.0
+        try:
+            result = await getattr(bot, job.method)(**job.kwargs)
+        except TelegramRetryAfter as e:
+            self.retries += 1
+            resume_at = self.clock() + e.retry_after
+            self._requeue(job)
+            return
+        except TelegramBadRequest as e:
+            # Typical reason for edits: "message is not modified"
+            if job.edit_key is None:
+                self._fail(job, e)
+            else:
+                self._done(job, None)
+        except Exception as e:
+            self._fail(job, e)
+        else:
+            self._done(job, result)
+        finally:
+            self._release(chat_id, resume_at)
+
+    def _requeue(self, job: _Job) -> None:
+        queue = self._queues[job.chat_id]
+        if job.edit_key is not None:
+            newer = self._edits.get(job.edit_key)
+            if newer is not None:
+                # A newer edit is already queued; it supersedes this one.
+                newer.futures.extend(job.futures)
+                self.depth -= 1
+                return
+            self._edits[job.edit_key] = job
+        if not queue:
+            self._ready.append(job.chat_id)
+        queue.appendleft(job)
+
+    def _release(self, chat_id: int, resume_at: float) -> None:
+        if resume_at:
+            self._busy[chat_id] = resume_at
+        else:
+            self._busy.pop(chat_id, None)
+            if not self._queues[chat_id]:
+                del self._queues[chat_id]
+        self._wakeup.set()
+
+    def _done(self, job: _Job, result: Any) -> None:
+        latency = self.clock() - job.enqueued_at
+        self.depth -= 1
+        self.sent += 1
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+        for future in job.futures:
+            if not future.done():
+                future.set_result(result)
+
+    def _fail(self, job: _Job, error: Exception) -> None:
+        self.depth -= 1
+        self.failed += 1
+        logger.warning("%s to chat %s failed: %s", job.method, job.chat_id, error)
+        for future in job.futures:
+            if not future.done():
+                future.set_exception(error)
+                # Callers usually don't await the result; it is logged above.
+                future.exception()
@@ -0,0 +1,175 @@
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from app.metrics import handler_name
+
+logger = logging.getLogger(__name__)
+
+perf_counter = time.perf_counter
+
+
+@dataclass
+class Profile:
+    path: str
+    samples: int = 0
+    top: List[Tuple[str, int]] = field(default_factory=list)  # innermost frames by samples
+
+
+class SamplingProfiler:
+    """
+    Time-boxed sampling profiler for the event loop.
+
+    `start()` launches a helper thread that looks at the loop thread's stack
+    every `interval` seconds for the given duration, then writes the stacks
+    in collapsed form ("outer;inner;innermost count" per line), as read by
+    flamegraph.pl, speedscope or inferno. Between profiles nothing runs.
+    """
+
+    def __init__(self, directory: str = ".", interval: float = 0.005) -> None:
+        self.directory = directory
+        self.interval = interval
+        self._running: Optional[asyncio.Future] = None
+
+    @property
+    def running(self) -> bool:
+        return self._running is not None and not self._running.done()
+
+    def start(self, seconds: float) -> "asyncio.Future[Profile]":
+        """Profile the calling (event loop) thread for `seconds`."""
+        if self.running:
+            raise RuntimeError("A profile is already running")
+        loop = asyncio.get_running_loop()
+        future: "asyncio.Future[Profile]" = loop.create_future()
+        path = os.path.join(self.directory, f"profile-{datetime.now():%Y%m%d-%H%M%S}.folded")
+        thread = threading.Thread(
+            target=self._sample,
+            args=(loop, future, threading.get_ident(), seconds, path),
+            name="profiler",
+            daemon=True,
+        )
+        self._running = future
+        thread.start()
+        return future
+
+    def start_logged(self, seconds: float) -> None:
+        """Start a profile outside a handler (on a signal); the outcome is logged."""
+        try:
+            future = self.start(seconds)
+        except RuntimeError as e:
+            logger.warning("%s", e)
+            return
+        logger.warning("Profiling the event loop for %.0f s", seconds)
+        future.add_done_callback(_log_profile)
+
+    def _sample(self, loop: asyncio.AbstractEventLoop, future: asyncio.Future, thread_id: int,
+                seconds: float, path: str) -> None:
+        stacks: Counter = Counter()
+        labels: Dict[Any, str] = {}  # code object -> frame label
+        deadline = time.monotonic() + seconds
+        try:
+            while time.monotonic() < deadline:
+                frame = sys._current_frames().get(thread_id)
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = labels.get(code)
+                    if label is None:
+                        label = labels[code] = (
+                            f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                        )
+                    names.append(label)
+                    frame = frame.f_back
+                if names:
+                    names.reverse()
+                    stacks[";".join(names)] += 1
+                time.sleep(self.interval)
+
+            with open(path, "w", encoding="utf-8") as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+
+            innermost: Counter = Counter()
+            for stack, count in stacks.items():
+                innermost[stack.rpartition(";")[2]] += count
+            result = Profile(path, sum(stacks.values()), innermost.most_common(5))
+        except Exception as e:
+            loop.call_soon_threadsafe(_settle, future, None, e)
+        else:
+            loop.call_soon_threadsafe(_settle, future, result, None)
+
+
+def _log_profile(future: asyncio.Future) -> None:
+    if future.cancelled():
+        return
+    if future.exception() is not None:
+        logger.error("Profile failed: %s", future.exception())
+        return
+    profile = future.result()
+    logger.warning("Profile written to %s (%d samples)", profile.path, profile.samples)
+
+
+def _settle(future: asyncio.Future, result: Any, error: Optional[Exception]) -> None:
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class SlowUpdateLog(BaseMiddleware):
+    """
+    Inner middleware: appends every update whose handler took `threshold`
+    seconds or more to a JSON-lines file, with the handler name and time.
+    The "update" field of each line can be fed to `python -m app.loadgen
+    --replay`. Only installed when a threshold is set.
+    """
+
+    def __init__(self, path: str, threshold: float) -> None:
+        self.path = path
+        self.threshold = threshold
+        self.recorded = 0
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        start = perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            elapsed = perf_counter() - start
+            if elapsed >= self.threshold:
+                self._record(event, data, elapsed)
+
+    def _record(self, event: TelegramObject, data: Dict[str, Any], elapsed: float) -> None:
+        name = handler_name(event, data)
+        update = data.get("event_update")
+        logger.warning("Slow update: %s took %.0f ms", name, elapsed * 1000)
+        line = json.dumps({
+            "at": datetime.now().isoformat(timespec="seconds"),
+            "handler": name,
+            "ms": round(elapsed * 1000, 1),
+            "update": update.model_dump(mode="json", exclude_none=True) if update is not None else None,
+        }, ensure_ascii=False)
+        # Rare by design, so a plain append on the loop is fine
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError:
+            logger.exception("Failed to write %s", self.path)
+        self.recorded += 1
@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Connection
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+import aiohttp
+from aiogram.client.telegram import PRODUCTION
+
+from storage.codes import ALPHABET
+
+logger = logging.getLogger(__name__)
+
+MAX_SHARDS = len(ALPHABET)
+BATCH_SIZE = 100
+
+
+def shard_for_chat(chat_id: int, shards: int) -> int:
+    return chat_id % shards
+
+
+def shard_prefix(index: int) -> str:
+    return ALPHABET[index]
+
+
+def update_chat_id(update: Dict[str, Any]) -> int:
+    """Chat an update belongs to, read straight from the JSON (0 if none)."""
+    for kind in ("message", "edited_message", "channel_post", "edited_channel_post"):
+        message = update.get(kind)
+        if message:
+            return message["chat"]["id"]
+
+    callback = update.get("callback_query")
+    if callback:
+        message = callback.get("message")
+        if message:
+            return message["chat"]["id"]
+        return callback["from"]["id"]
+
+    for kind in ("my_chat_member", "chat_member", "chat_join_request"):
+        event = update.get(kind)
+        if event:
+            return event["chat"]["id"]
+    return 0
+
+
+def is_private_start(update: Dict[str, Any]) -> bool:
+    """
+    A /start in a private chat. Hands held for a player live in the shard of
+    the group the game was in, so every shard gets to see it.
+    """
+    message = update.get("message")
+    if not message or message["chat"].get("type") != "private":
+        return False
+    text = message.get("text", "")
+    return text == "/start" or text.startswith(("/start ", "/start@"))
+
+
+# -------------------------
+# Worker process
+# -------------------------
+def worker_main(index: int, shards: int, conn: Connection) -> None:
+    # Must be set before bot.py is imported: it picks its shard from the env
+    os.environ["SHARD_INDEX"] = str(index)
+    os.environ["SHARD_COUNT"] = str(shards)
+
+    import bot as app
+
+    asyncio.run(_worker(app, conn))
+
+
+async def _worker(app: Any, conn: Connection) -> None:
+    app.create_app()
+    bot = app.create_bot()
+    dp = app.build_dispatcher()
+    services = app.start_services(bot)
+    loop = asyncio.get_running_loop()
+    reader = ThreadPoolExecutor(max_workers=1)
+    tasks: Set[asyncio.Task] = set()
+
+    await dp.emit_startup(bot=bot)
+    try:
+        while True:
+            batch = await loop.run_in_executor(reader, conn.recv)
+            for update in batch:
+                task = asyncio.create_task(dp.feed_raw_update(bot, update))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+    except EOFError:
+        pass  # front process is gone
+    finally:
+        await dp.emit_shutdown(bot=bot)
+        await app.stop_services(services)
+        await bot.session.close()
+
+
+# -------------------------
+# Front process
+# -------------------------
+class Shard:
+    def __init__(self, index: int, shards: int) -> None:
+        self.index = index
+        self.shards = shards
+        self.pending: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+        self.process: Optional[multiprocessing.Process] = None
+        self.conn: Optional[Connection] = None
+        # Pipe writes can block, so each shard sends from its own thread
+        self._writer = ThreadPoolExecutor(max_workers=1)
+
+    def spawn(self) -> None:
+        ctx = multiprocessing.get_context("spawn")
+        receiver, sender = ctx.Pipe(duplex=False)
+        self.process = ctx.Process(
+            target=worker_main, args=(self.index, self.shards, receiver), name=f"shard-{self.index}", daemon=True
+        )
+        self.process.start()
+        receiver.close()
+        self.conn = sender
+
+    async def forward(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.pending.get()]
+            while len(batch) < BATCH_SIZE and not self.pending.empty():
+                batch.append(self.pending.get_nowait())
+
+            while True:
+                conn = self.conn
+                try:
+                    await loop.run_in_executor(self._writer, conn.send, batch)
+                    break
+                except (BrokenPipeError, OSError):
+                    # Worker died; wait for the supervisor to replace it and resend
+                    while self.conn is conn:
+                        await asyncio.sleep(0.1)
+
+    def stop(self) -> None:
+        if self.conn:
+            self.conn.close()
+        if self.process and self.process.is_alive():
+            self.process.join(timeout=5)
+            if self.process.is_alive():
+                self.process.terminate()
+
+
+async def _supervise(shards: List[Shard]) -> None:
+    while True:
+        await asyncio.sleep(1)
+        for shard in shards:
+            if not shard.process.is_alive():
+                logger.warning("Shard %d exited with %s, restarting", shard.index, shard.process.exitcode)
+                shard.conn.close()
+                shard.spawn()
+
+
+async def _telegram(http: aiohttp.ClientSession, token: str, method: str, **params: Any) -> Any:
+    async with http.post(PRODUCTION.api_url(token=token, method=method), json=params) as resp:
+        body = await resp.json()
+    if not body.get("ok"):
+        raise RuntimeError(f"{method} failed: {body.get('description')}")
+    return body["result"]
+
+
+async def run_front(token: str, shards: int, allowed_updates: Sequence[str]) -> None:
+    """
+    Sharded mode: one front process, N worker processes.
+
+    The front process long-polls Telegram and forwards every update to the worker
+    that owns its chat (`shard_for_chat`); a private /start goes to all of them
+    (`is_private_start`). Each worker is a normal bot process
+    (its own dispatcher, storage and chat languages) that only sees its own
+    chats. Join codes start with the shard's letter, so a worker can tell a code
+    from another shard apart from an unknown one.
+
+    If a worker dies, the front starts a new one for the same shard and keeps
+    sending that shard's updates to it.
+    """
+    if not 1 <= shards <= MAX_SHARDS:
+        raise ValueError(f"Number of shards must be between 1 and {MAX_SHARDS}")
+
+    workers = [Shard(i, shards) for i in range(shards)]
+    for worker in workers:
+        worker.spawn()
+    tasks = [asyncio.create_task(w.forward()) for w in workers]
+    tasks.append(asyncio.create_task(_supervise(workers)))
+    print(f"Front process started with {shards} workers")
+
+    timeout = aiohttp.ClientTimeout(total=60)
+    offset = 0
+    try:
+        async with aiohttp.ClientSession(timeout=timeout) as http:
+            await _telegram(http, token, "deleteWebhook")
+            while True:
+                # Updates are routed as raw JSON; the front never parses them into models
+                try:
+                    updates = await _telegram(
+                        http, token, "getUpdates",
+                        offset=offset, timeout=30, allowed_updates=list(allowed_updates),
+                    )
+                except (aiohttp.ClientError, asyncio.TimeoutError, RuntimeError) as e:
+                    logger.warning("getUpdates failed: %s", e)
+                    await asyncio.sleep(1)
+                    continue
+
+                for update in updates:
+                    offset = update["update_id"] + 1
+                    if is_private_start(update):
+                        for worker in workers:
+                            worker.pending.put_nowait(update)
+                        continue
+                    workers[shard_for_chat(update_chat_id(update), shards)].pending.put_nowait(update)
+    finally:
+        for task in tasks:
+            task.cancel()
+        for worker in workers:
+            worker.stop()
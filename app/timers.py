@@ -0,0 +1,272 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+SLOT_BITS = 6
+SLOTS = 1 << SLOT_BITS  # per level
+SLOT_MASK = SLOTS - 1
+LEVELS = 4              # 64**4 ticks: 194 days at one tick per second
+
+Handler = Callable[[str], Awaitable[None]]
+
+
+class _Timer:
+    __slots__ = ("code", "kind", "tick", "slot")
+
+    def __init__(self, code: str, kind: str, tick: int) -> None:
+        self.code = code
+        self.kind = kind
+        self.tick = tick                        # due at the end of this tick
+        self.slot: Optional[Dict[Tuple[str, str], "_Timer"]] = None  # the wheel slot holding it
+
+
+class TimerWheel:
+    """
+    Per-session deadlines ("autostart", turn timeouts, ...) for every game,
+    driven by one task.
+
+    A hierarchical timing wheel: LEVELS levels of 64 slots, where a slot of
+    level n spans 64**n ticks. A timer sits in the lowest level that reaches
+    its tick and moves down a level each time the wheel turns onto its slot.
+    Scheduling, rescheduling and cancelling are a dict insert and delete.
+    The loop only wakes for ticks that have timers due, and at most once per
+    64 ticks to move timers down, so pending timers cost nothing while they
+    wait.
+
+    Each session has at most one timer per kind; `on(kind, handler)` sets
+    what runs when it fires. With a `path`, pending deadlines are written to
+    a file by `run_writer()` (as wall-clock times) and loaded back on start;
+    those that passed while the bot was down fire right away.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        tick: float = 1.0,
+        flush_interval: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+        wall: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = path
+        self.tick = tick
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self.wall = wall
+        self.handlers: Dict[str, Handler] = {}
+
+        self._origin = clock()
+        self._now = 0  # last tick processed
+        self._wheel: List[List[Dict[Tuple[str, str], _Timer]]] = [
+            [{} for _ in range(SLOTS)] for _ in range(LEVELS)
+        ]
+        self._timers: Dict[Tuple[str, str], _Timer] = {}
+        self._wakeup = asyncio.Event()
+        self._sleeping_until: Optional[int] = None  # tick the loop waits for (None: until woken)
+        self._running: Set[asyncio.Task] = set()
+        self._dirty = False
+        self._io_lock = threading.Lock()
+
+        # Metrics
+        self.fired = 0
+
+        if path and os.path.exists(path):
+            self._load(path)
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    def on(self, kind: str, handler: Handler) -> None:
+        """Run `handler(code)` when a timer of this kind fires."""
+        self.handlers[kind] = handler
+
+    def schedule(self, code: str, kind: str, delay: float) -> None:
+        """Fire in `delay` seconds, replacing the session's pending timer of this kind."""
+        key = (code, kind)
+        timer = self._timers.get(key)
+        if timer is None:
+            timer = self._timers[key] = _Timer(code, kind, 0)
+        else:
+            del timer.slot[key]
+        # Rounded up, so a timer never fires early
+        timer.tick = max(math.ceil((self.clock() + delay - self._origin) / self.tick), self._now + 1)
+        self._place(timer)
+        self._dirty = self.path is not None
+
+        if self._sleeping_until is None or timer.tick < self._sleeping_until:
+            self._wakeup.set()
+
+    def cancel(self, code: str, kind: str) -> bool:
+        timer = self._timers.pop((code, kind), None)
+        if timer is None:
+            return False
+        del timer.slot[(code, kind)]
+        self._dirty = self.path is not None
+        return True
+
+    def cancel_session(self, code: str) -> int:
+        """Cancel every pending timer of a session. Returns how many there were."""
+        return sum(self.cancel(code, kind) for kind in self.handlers)
+
+    def retain(self, keep: Callable[[str], bool]) -> int:
+        """Cancel the timers of every session for which `keep(code)` is false. Returns how many."""
+        dropped = [key for key in self._timers if not keep(key[0])]
+        for code, kind in dropped:
+            self.cancel(code, kind)
+        return len(dropped)
+
+    def remaining(self, code: str, kind: str) -> Optional[float]:
+        """Seconds until the timer fires, or None if there is none."""
+        timer = self._timers.get((code, kind))
+        if timer is None:
+            return None
+        return max(0.0, self._origin + timer.tick * self.tick - self.clock())
+
+    # -------------------------
+    # Turning the wheel
+    # -------------------------
+    def advance(self) -> int:
+        """Fire every timer that is due by now. Returns how many fired."""
+        target = int((self.clock() - self._origin) // self.tick)
+        fired = 0
+        while self._now < target:
+            next_tick = self._next_tick()
+            if next_tick is None or next_tick > target:
+                self._now = target  # nothing due or to move down on the way
+                break
+            self._now = next_tick
+            self._cascade()
+            fired += self._fire(self._wheel[0][next_tick & SLOT_MASK])
+        self.fired += fired
+        return fired
+
+    async def run(self) -> None:
+        while True:
+            self.advance()
+            self._wakeup.clear()
+            self._sleeping_until = self._next_tick()
+            if self._sleeping_until is None:
+                await self._wakeup.wait()
+                continue
+            delay = self._origin + self._sleeping_until * self.tick - self.clock()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(delay, 0.0))
+            except asyncio.TimeoutError:
+                pass
+
+    def _place(self, timer: _Timer) -> None:
+        delta = timer.tick - self._now
+        if delta <= 0:
+            level, tick = 0, self._now  # due in the tick being processed
+        else:
+            level = min((delta.bit_length() - 1) // SLOT_BITS, LEVELS - 1)
+            # Past the top level's reach it waits in the farthest slot and is placed again from there
+            tick = min(timer.tick, self._now + SLOTS ** LEVELS - 1)
+        slot = self._wheel[level][(tick >> (SLOT_BITS * level)) & SLOT_MASK]
+        slot[(timer.code, timer.kind)] = timer
+        timer.slot = slot
+
+    def _next_tick(self) -> Optional[int]:
+        """The next tick with timers due or to move down, None if the wheel is empty."""
+        if not self._timers:
+            return None
+        level0 = self._wheel[0]
+        boundary = (self._now | SLOT_MASK) + 1
+        for tick in range(self._now + 1, boundary):
+            if level0[tick & SLOT_MASK]:
+                return tick
+        return boundary
+
+    def _cascade(self) -> None:
+        # Highest level first: what it moves down may land in a lower slot due now
+        now = self._now
+        for level in range(LEVELS - 1, 0, -1):
+            if now & ((1 << (SLOT_BITS * level)) - 1):
+                continue  # not on this level's slot boundary
+            slot = self._wheel[level][(now >> (SLOT_BITS * level)) & SLOT_MASK]
+            if slot:
+                timers = list(slot.values())
+                slot.clear()
+                for timer in timers:
+                    self._place(timer)
+
+    def _fire(self, slot: Dict[Tuple[str, str], _Timer]) -> int:
+        if not slot:
+            return 0
+        timers = list(slot.values())
+        slot.clear()
+        for timer in timers:
+            del self._timers[(timer.code, timer.kind)]
+            handler = self.handlers.get(timer.kind)
+            if handler is None:
+                logger.warning("No handler for %s timer of %s", timer.kind, timer.code)
+                continue
+            task = asyncio.create_task(self._run_handler(handler, timer))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+        self._dirty = self.path is not None
+        return len(timers)
+
+    @staticmethod
+    async def _run_handler(handler: Handler, timer: _Timer) -> None:
+        try:
+            await handler(timer.code)
+        except Exception:
+            logger.exception("%s timer of %s failed", timer.kind, timer.code)
+
+    # -------------------------
+    # File
+    # -------------------------
+    def _load(self, path: str) -> None:
+        with open(path, encoding="utf-8") as f:
+            saved = json.load(f)
+        now = self.wall()
+        for code, kind, deadline in saved:
+            self.schedule(code, kind, deadline - now)
+        self._dirty = False
+
+    def _snapshot(self) -> List[Tuple[str, str, float]]:
+        # Wall-clock deadlines: the monotonic clock restarts with the process
+        offset = self.wall() - self.clock() + self._origin
+        return [(t.code, t.kind, offset + t.tick * self.tick) for t in self._timers.values()]
+
+    def _write(self, saved: List[Tuple[str, str, float]]) -> None:
+        with self._io_lock:
+            with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(saved, f, separators=(",", ":"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(self.path + ".tmp", self.path)
+
+    def flush(self) -> None:
+        """Write pending deadlines synchronously (used on shutdown)."""
+        if self._dirty:
+            self._dirty = False
+            self._write(self._snapshot())
+
+    async def run_writer(self) -> None:
+        if not self.path:
+            return
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if not self._dirty:
+                continue
+            # Taken on the event loop, so the write never sees a half-applied change
+            self._dirty = False
+            saved = self._snapshot()
+            try:
+                await asyncio.to_thread(self._write, saved)
+            except OSError:
+                logger.exception("Failed to write %d timers, will retry", len(saved))
+                self._dirty = True
+
+    def close(self) -> None:
+        for task in self._running:
+            task.cancel()
+        self.flush()
@@ -0,0 +1,123 @@
+import asyncio
+import hmac
+import logging
+import os
+import secrets
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import setup_application
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+@dataclass
+class WebhookConfig:
+    url: str                    # public base URL Telegram should call, e.g. https://bot.example.com
+    path: str = "/webhook"
+    host: str = "127.0.0.1"
+    port: int = 8080
+    secret: str = ""
+    workers: int = 16
+    queue_size: int = 1000
+
+    @classmethod
+    def from_env(cls) -> "WebhookConfig":
+        url = os.getenv("WEBHOOK_URL")
+        if not url:
+            raise RuntimeError("WEBHOOK_URL not found. It is required for --webhook.")
+        return cls(
+            url=url.rstrip("/"),
+            path=os.getenv("WEBHOOK_PATH", cls.path),
+            host=os.getenv("WEBHOOK_HOST", cls.host),
+            port=int(os.getenv("WEBHOOK_PORT", cls.port)),
+            # Without a configured secret, use a random one for this run
+            secret=os.getenv("WEBHOOK_SECRET") or secrets.token_urlsafe(32),
+            workers=int(os.getenv("WEBHOOK_WORKERS", cls.workers)),
+            queue_size=int(os.getenv("WEBHOOK_QUEUE", cls.queue_size)),
+        )
+
+
+class WebhookHandler:
+    """
+    Accepts Telegram updates and acknowledges them right away.
+
+    Updates go into a bounded queue that a fixed pool of workers feeds to the
+    dispatcher, so slow handlers never hold up the HTTP response. When the
+    queue is full the request gets 503 and Telegram delivers it again later.
+    """
+
+    def __init__(self, dp: Dispatcher, bot: Bot, secret: str, workers: int = 16, queue_size: int = 1000) -> None:
+        self.dp = dp
+        self.bot = bot
+        self.secret = secret
+        self.workers = workers
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=queue_size)
+        self._tasks: List[asyncio.Task] = []
+
+    async def handle(self, request: web.Request) -> web.Response:
+        token = request.headers.get(SECRET_HEADER, "")
+        if not hmac.compare_digest(token, self.secret):
+            return web.Response(status=401)
+
+        try:
+            update = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+
+        try:
+            self.queue.put_nowait(update)
+        except asyncio.QueueFull:
+            return web.Response(status=503)
+        return web.Response()
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self) -> None:
+        while True:
+            update = await self.queue.get()
+            try:
+                await self.dp.feed_raw_update(self.bot, update)
+            except Exception:
+                logger.exception("Failed to process update %s", update.get("update_id"))
+            finally:
+                self.queue.task_done()
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot, config: WebhookConfig, handler: Optional[WebhookHandler] = None) -> None:
+    handler = handler or WebhookHandler(dp, bot, config.secret, config.workers, config.queue_size)
+
+    app = web.Application()
+    app.router.add_post(config.path, handler.handle)
+    # Runs the dispatcher's startup/shutdown hooks with the server
+    setup_application(app, dp, bot=bot)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, config.host, config.port)
+    await site.start()
+    handler.start()
+
+    await bot.set_webhook(
+        config.url + config.path,
+        secret_token=config.secret,
+        allowed_updates=dp.resolve_used_update_types(),
+    )
+    print(f"Webhook listening on {config.host}:{config.port}{config.path}")
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await handler.stop()
+        await runner.cleanup()
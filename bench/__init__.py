@@ -0,0 +1,23 @@
+"""
+Micro-benchmarks of the bot's hot paths, one module each, run from the repo
+root (see "Benchmarks" in the README):
+
+    python -m bench.callbacks
+
+They print the best time per operation over a few repeats; compare numbers
+from the same machine only.
+"""
+import timeit
+from typing import Callable
+
+
+def measure(fn: Callable[[], object], number: int, repeat: int = 5) -> float:
+    """Best seconds per call of `fn`, over `repeat` runs of `number` calls."""
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+
+
+def report(name: str, seconds: float, baseline: float = 0.0) -> None:
+    line = f"{name:>44}: {seconds * 1e6:10.3f} us"
+    if baseline:
+        line += f"  (speedup {baseline / seconds:.2f}x)"
+    print(line)
@@ -0,0 +1,64 @@
+import random
+import time
+
+from bench import report
+from storage.codes import ALPHABET, CodeAllocator
+
+# Join code allocation at 10%, 50% and 90% of the 4-character code space:
+# CodeAllocator against drawing random codes until a free one comes up (what
+# create_session did before storage/codes.py).
+#
+#   python -m bench.codes
+
+LENGTH = 4
+SPACE = len(ALPHABET) ** LENGTH
+SAMPLE = 20_000
+
+
+def random_code(rng: random.Random) -> str:
+    return "".join(rng.choice(ALPHABET) for _ in range(LENGTH))
+
+
+def bench_random(occupancy: float) -> float:
+    rng = random.Random(1)
+    codes = CodeAllocator(length=LENGTH, key=1)
+    # Check characters left out: the old codes were just the random part
+    taken = {codes._encode(n)[:-1] for n in rng.sample(range(SPACE), int(SPACE * occupancy))}
+    start = time.perf_counter()
+    for _ in range(SAMPLE):
+        code = random_code(rng)
+        while code in taken:
+            code = random_code(rng)
+        taken.add(code)
+    return (time.perf_counter() - start) / SAMPLE
+
+
+def bench_allocator(occupancy: float) -> float:
+    # max_fill=1 keeps the length at 4, so the fill level is the one asked for
+    codes = CodeAllocator(length=LENGTH, max_fill=1.0, key=1)
+    # Where that many allocate() calls would leave it
+    codes._next = codes.live = int(SPACE * occupancy)
+    start = time.perf_counter()
+    for _ in range(SAMPLE):
+        codes.allocate()
+    return (time.perf_counter() - start) / SAMPLE
+
+
+def bench_reuse() -> float:
+    # Fresh codes used up: every allocation comes from the released queue
+    codes = CodeAllocator(length=LENGTH, max_fill=1.0, key=1)
+    codes._next = codes.live = SPACE
+    live = [codes._encode(n) for n in range(SAMPLE)]
+    start = time.perf_counter()
+    for code in live:
+        codes.release(code)
+        codes.allocate()
+    return (time.perf_counter() - start) / SAMPLE
+
+
+if __name__ == "__main__":
+    for occupancy in (0.1, 0.5, 0.9):
+        old = bench_random(occupancy)
+        report(f"random + retry at {occupancy:.0%}", old)
+        report(f"CodeAllocator.allocate at {occupancy:.0%}", bench_allocator(occupancy), old)
+    report("release + allocate, space used up", bench_reuse())
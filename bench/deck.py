@@ -0,0 +1,40 @@
+import random
+from typing import List, Tuple
+
+from bench import measure, report
+from game.deck import CARD_NAMES, ITEMS, LOCATIONS, SUSPECTS, deal, deal_many
+
+# Dealing a game (Case File + every hand): game/deck.py's one-pass shuffle
+# into bitmasks against shuffling a list of card names and dealing it into
+# lists, then batches through deal_many in deals/s.
+#
+#   python -m bench.deck
+
+CASES = [(s, i, l) for s in SUSPECTS for i in ITEMS for l in LOCATIONS]
+BATCH = 100_000
+
+
+def list_deal(players: int, rng: random.Random) -> Tuple[Tuple[str, str, str], List[List[str]]]:
+    case = rng.choice(CASES)
+    deck = [name for name in CARD_NAMES if name not in case]
+    rng.shuffle(deck)
+    hands: List[List[str]] = [[] for _ in range(players)]
+    for seat, card in enumerate(deck):
+        hands[seat % players].append(card)
+    return case, hands
+
+
+def batch(players: int) -> None:
+    for _ in deal_many(BATCH, players, seed=1):
+        pass
+
+
+if __name__ == "__main__":
+    rng = random.Random(1)
+    for players in (3, 6):
+        old = measure(lambda: list_deal(players, rng), 20_000)
+        report(f"{players} players, list of names", old)
+        report(f"{players} players, deal()", measure(lambda: deal(players, rng), 20_000), old)
+    for players in (3, 6):
+        seconds = measure(lambda: batch(players), 1, repeat=3)
+        print(f"deal_many, {players} players: {BATCH / seconds:,.0f} deals/s")
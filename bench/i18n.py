@@ -0,0 +1,73 @@
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+import bot
+from bench import measure, report
+from game.errors import NotOwner
+from i18n import LRM, t
+from i18n.texts import TR
+
+# Text and keyboard rendering per button press: the compiled catalogs and
+# cached keyboards against formatting TR and building the markup on every
+# call (bot.py before i18n/ existed). Hebrew, as it also has {lrm} to fill.
+#
+#   python -m bench.i18n
+
+LANG = "he"
+
+
+def old_t(lang: str, key: str, **kwargs) -> str:
+    text = TR.get(lang, TR["en"]).get(key, TR["en"].get(key, key))
+    kwargs.setdefault("lrm", LRM if lang == "he" else "")
+    return text.format(**kwargs) if kwargs else text
+
+
+def old_main_menu(lang: str) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text=old_t(lang, key), callback_data=data)]
+        for key, data in (
+            ("btn_newgame", "newgame"), ("btn_join", "join_flow"), ("btn_players", "players"),
+            ("btn_start", "start"), ("btn_status", "status"), ("btn_help", "help"),
+            ("btn_languages", "languages"),
+        )
+    ])
+
+
+def old_back_menu(lang: str) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text=old_t(lang, "btn_back"), callback_data="menu")]
+    ])
+
+
+def old_translate_error(e: Exception, lang: str) -> str:
+    key = f"err_{type(e).__name__}"
+    if key in TR.get(lang, {}):
+        return old_t(lang, key)
+    if key in TR["en"]:
+        return TR["en"][key]
+    return old_t(lang, "err_default")
+
+
+STATUS = dict(state="LOBBY", code="ABCD", count=3, max=6)
+
+
+CASES = {
+    "menu": (
+        lambda: (old_t(LANG, "menu_title"), old_main_menu(LANG)),
+        lambda: (t(LANG, "menu_title"), bot.main_menu(LANG)),
+    ),
+    "status": (
+        lambda: (old_t(LANG, "status", **STATUS), old_back_menu(LANG)),
+        lambda: (t(LANG, "status", **STATUS), bot.back_menu(LANG)),
+    ),
+    "error": (
+        lambda: (old_translate_error(NotOwner(), LANG), old_back_menu(LANG)),
+        lambda: (bot.translate_error(NotOwner(), LANG), bot.back_menu(LANG)),
+    ),
+}
+
+
+if __name__ == "__main__":
+    for name, (before, after) in CASES.items():
+        old = measure(before, 20_000)
+        report(f"{name} press, TR + new keyboard", old)
+        report(f"{name} press, catalog + cached keyboard", measure(after, 20_000), old)
@@ -0,0 +1,68 @@
+import time
+import tracemalloc
+
+from bench import measure, report
+from game.session import GameSession
+from storage.index import SessionIndex
+
+# SessionIndex at 1M players (250k sessions of 4): building and checking it
+# from the sessions, its memory, keeping it up to date on a join, and the
+# sessions of a user through it against scanning every session's players.
+#
+#   python -m bench.index
+
+SESSIONS = 250_000
+PLAYERS = 4
+
+
+def sessions():
+    made = []
+    for n in range(SESSIONS):
+        session = GameSession(code=f"{n:05X}", chat_id=-n, owner_id=n * PLAYERS)
+        for user_id in range(n * PLAYERS, (n + 1) * PLAYERS):
+            session.add_player(user_id, None)
+        made.append(session)
+    return made
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def scan(all_sessions, telegram_id: int):
+    return [s for s in all_sessions if s.has_player(telegram_id)]
+
+
+if __name__ == "__main__":
+    all_sessions = sessions()
+    players = SESSIONS * PLAYERS
+    index = SessionIndex()
+
+    tracemalloc.start()
+    built = timed(lambda: index.rebuild(all_sessions))
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # Traced allocations are slower; time the build again without them
+    built = min(built, timed(lambda: index.rebuild(all_sessions)))
+    print(f"{players} players in {SESSIONS} sessions: rebuilt in {built:.2f}s, "
+          f"{size / players:.0f} B/player, check() in {timed(lambda: index.check(all_sessions)):.2f}s")
+
+    next_id = iter(range(players, players * 2))
+    lobbies = [GameSession(code="L0", chat_id=1, owner_id=players)]
+
+    def join():
+        lobby = lobbies[-1]
+        if len(lobby.players) == lobby.max_players:
+            lobby = GameSession(code=f"L{len(lobbies)}", chat_id=1, owner_id=players)
+            lobbies.append(lobby)
+        lobby.add_player(next(next_id), None)
+        index.update(lobby)
+
+    report("add_player + index.update", measure(join, 20_000))
+
+    user = players // 2
+    old = measure(lambda: scan(all_sessions, user), 1, repeat=3)
+    report("sessions of a user, scan", old)
+    report("sessions of a user, index.of_user", measure(lambda: index.of_user(user), 200_000), old)
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from game.events import Event, PlayerJoined, SessionClosed, SessionOpened, StateChanged, apply, events_of
+from game.player import Player
+from game.session import SessionState
+from storage.journal import SNAPSHOT_MAGIC, _SNAPSHOT_HEADER, _journal_path, encode, recover
+
+# Cold start from the session journal: replay of a journal holding the whole
+# history (events/s through the memory-mapped reader), against the same
+# state written as a snapshot of the live sessions, as JournalStorage leaves
+# it after rotating. Each game is opened, joined by 4, started, and 90% of
+# them closed again.
+#
+#   python -m bench.journal
+
+PLAYERS = 4
+START = datetime(2026, 1, 1)
+
+
+def history(games: int) -> List[Event]:
+    events: List[Event] = []
+    for n in range(games):
+        code = f"{n:06X}"
+        at = START + timedelta(seconds=n)
+        events.append(SessionOpened(code, -n, n, at, 3, 6))
+        events.extend(PlayerJoined(code, Player(n + i, f"user{n + i}", at)) for i in range(PLAYERS))
+        events.append(StateChanged(code, SessionState.STARTED))
+        if n % 10:
+            events.append(SessionClosed(code))
+    return events
+
+
+def best_recover(directory: str) -> float:
+    runs = []
+    for _ in range(3):
+        start = time.perf_counter()
+        recover(directory)
+        runs.append(time.perf_counter() - start)
+    return min(runs)
+
+
+if __name__ == "__main__":
+    for games in (20_000, 150_000):
+        events = history(games)
+        with tempfile.TemporaryDirectory() as full, tempfile.TemporaryDirectory() as snapped:
+            with open(_journal_path(full, 0), "wb") as f:
+                f.write(b"".join(map(encode, events)))
+            replay = best_recover(full)
+
+            sessions = {}
+            for event in events:
+                apply(sessions, event)
+            live = [e for s in sessions.values() for e in events_of(s)]
+            with open(os.path.join(snapped, "snapshot"), "wb") as f:
+                f.write(_SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, 1) + b"".join(map(encode, live)))
+            open(_journal_path(snapped, 1), "wb").close()
+            cold = best_recover(snapped)
+
+        print(f"{len(events):>9} events: replayed in {replay:6.2f}s ({len(events) / replay:,.0f} events/s); "
+              f"snapshot of {len(sessions)} live games ({len(live)} events) in {cold:5.2f}s")
@@ -0,0 +1,83 @@
+import asyncio
+import random
+import time
+
+from aiogram import Bot
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from app import loadgen
+from bench import report
+from storage.fsm import FSMStorage
+
+# Dispatch throughput of a noisy group (1000 chatter messages from 200
+# users) with FSMStorage's per-chat record count in front of the state
+# lookup, against aiogram's MemoryStorage that bot.py used before. Run once
+# with nobody in the join flow and once with 20 users asked for a code who
+# keep chatting (their messages must not be taken as codes either). Then
+# the state lookup itself, which aiogram makes for every message, for a user
+# with no record.
+#
+#   python -m bench.prefilter
+
+GROUP = -1
+USERS = 200
+MESSAGES = 1000
+
+
+async def scenario(app, storage, prompted: int) -> float:
+    updates = loadgen.Updates()
+    rng = random.Random(1)
+    bot = Bot(token=loadgen.TOKEN, session=loadgen.FakeSession())
+    dp = app.build_dispatcher()
+    dp.fsm.storage = storage
+    services = app.start_services(bot)
+    for user_id in range(prompted):
+        await dp.feed_raw_update(bot, updates.message(GROUP, user_id, "/join"))
+    # Quiet chats with pending join flows elsewhere
+    for chat_id in range(2, 100):
+        await dp.feed_raw_update(bot, updates.message(-chat_id, 1, "/join"))
+    batch = [
+        updates.message(GROUP, rng.randrange(USERS), rng.choice(loadgen.CHATTER))
+        for _ in range(MESSAGES)
+    ]
+    start = time.perf_counter()
+    for update in batch:
+        await dp.feed_raw_update(bot, update)
+    seconds = time.perf_counter() - start
+    await app.stop_services(services)
+    return seconds
+
+
+async def lookups(storage, calls: int = 100_000) -> float:
+    await storage.set_state(StorageKey(bot_id=1, chat_id=GROUP, user_id=0), "JoinFlow:waiting_for_code")
+    quiet = StorageKey(bot_id=1, chat_id=-2, user_id=1)
+    noisy = StorageKey(bot_id=1, chat_id=GROUP, user_id=1)
+    best = {}
+    for name, key in (("quiet chat", quiet), ("chat with a prompt", noisy)):
+        runs = []
+        for _ in range(5):
+            start = time.perf_counter()
+            for _ in range(calls):
+                await storage.get_state(key)
+            runs.append((time.perf_counter() - start) / calls)
+        best[name] = min(runs)
+    return best
+
+
+def run(app, storage_factory, prompted: int) -> float:
+    return min(asyncio.run(scenario(app, storage_factory(), prompted)) for _ in range(3))
+
+
+if __name__ == "__main__":
+    app = loadgen.load_app()
+    for prompted in (0, 20):
+        old = run(app, MemoryStorage, prompted)
+        new = run(app, FSMStorage, prompted)
+        print(f"{prompted:>3} users in the join flow: {MESSAGES / old:8.0f} msg/s MemoryStorage, "
+              f"{MESSAGES / new:8.0f} msg/s FSMStorage  ({old / new:.2f}x)")
+    old = asyncio.run(lookups(MemoryStorage()))
+    new = asyncio.run(lookups(FSMStorage()))
+    for name in old:
+        report(f"get_state, {name}, MemoryStorage", old[name])
+        report(f"get_state, {name}, FSMStorage", new[name], old[name])
@@ -0,0 +1,69 @@
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from bench import measure, report
+from storage.prefs import LANG_CODES, ChatLanguages
+
+# Startup time and memory for 1M stored chat languages: ChatLanguages
+# loading its file out of an mmap, against the dict bot.py kept (chat_lang)
+# saved as JSON, which is what persisting it the obvious way would give.
+# Then a lookup in each.
+#
+#   python -m bench.prefs
+
+CHATS = 1_000_000
+
+
+def best_of(fn, repeat: int = 3) -> float:
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+    return min(runs)
+
+
+def traced(fn):
+    tracemalloc.start()
+    kept = fn()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return kept, size
+
+
+if __name__ == "__main__":
+    rng = random.Random(1)
+    chats = {-rng.getrandbits(40) - 1: rng.choice(LANG_CODES) for _ in range(CHATS)}
+
+    with tempfile.TemporaryDirectory() as directory:
+        packed = os.path.join(directory, "langs.bin")
+        prefs = ChatLanguages(packed)
+        for chat_id, lang in chats.items():
+            prefs.set(chat_id, lang)
+        prefs.close()
+        plain = os.path.join(directory, "langs.json")
+        with open(plain, "w") as f:
+            json.dump(chats, f)
+
+        def load_json():
+            with open(plain) as f:
+                return {int(k): v for k, v in json.load(f).items()}
+
+        old = best_of(load_json)
+        new = best_of(lambda: ChatLanguages(packed))
+        print(f"{CHATS} chats on disk: {os.path.getsize(plain) / CHATS:.1f} B/chat JSON, "
+              f"{os.path.getsize(packed) / CHATS:.1f} B/chat ChatLanguages")
+        print(f"load: {old:.2f}s JSON into a dict, {new:.3f}s ChatLanguages")
+
+        loaded_dict, dict_bytes = traced(load_json)
+        loaded, packed_bytes = traced(lambda: ChatLanguages(packed))
+        print(f"memory: {dict_bytes / CHATS:.1f} B/chat dict, {packed_bytes / CHATS:.1f} B/chat ChatLanguages")
+
+    chat_id = next(iter(chats))
+    old = measure(lambda: loaded_dict.get(chat_id, "en"), 200_000)
+    report("lookup, dict", old)
+    report("lookup, ChatLanguages.get", measure(lambda: loaded.get(chat_id), 200_000), old)
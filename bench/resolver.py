@@ -0,0 +1,47 @@
+import random
+from typing import List, Optional, Tuple
+
+from bench import measure, report
+from game.deck import CARD_NAMES, ITEMS, LOCATIONS, SUSPECTS, cards_of, deal
+from game.resolver import resolve_suggestion, suggestion_mask
+
+# Resolving a suggestion: resolver.py's seat table and hand masks against
+# walking the seats and scanning lists of card names, over a fixed set of
+# random deals and suggestions.
+#
+#   python -m bench.resolver
+
+ROUNDS = 1000
+
+
+def list_refutation(hands: List[List[str]], suggester: int, suggestion: List[str]) -> Tuple[Optional[int], List[str]]:
+    seat = suggester
+    for _ in range(len(hands) - 1):
+        seat = (seat + 1) % len(hands)
+        shown = [card for card in suggestion if card in hands[seat]]
+        if shown:
+            return seat, shown
+    return None, []
+
+
+def rounds(players: int):
+    rng = random.Random(players)
+    made = []
+    for _ in range(ROUNDS):
+        game = deal(players, rng)
+        suggester = rng.randrange(players)
+        names = [rng.choice(SUSPECTS), rng.choice(ITEMS), rng.choice(LOCATIONS)]
+        ids = [CARD_NAMES.index(name) for name in names]
+        lists = [[CARD_NAMES[card] for card in cards_of(hand)] for hand in game.hands]
+        made.append((game.hands, lists, suggester, suggestion_mask(*ids), names))
+    return made
+
+
+if __name__ == "__main__":
+    for players in (3, 6):
+        made = rounds(players)
+        old = measure(lambda: [list_refutation(lists, s, names) for _, lists, s, _, names in made], 20) / ROUNDS
+        report(f"{players} players, lists of names", old)
+        new = measure(lambda: [resolve_suggestion(hands, s, mask) for hands, _, s, mask, _ in made], 20) / ROUNDS
+        report(f"{players} players, resolve_suggestion", new, old)
+        print(f"resolve_suggestion, {players} players: {1 / new:,.0f} suggestions/s")
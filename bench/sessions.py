@@ -0,0 +1,78 @@
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional
+
+from bench import measure, report
+from game.session import GameSession, SessionState, normalize_username
+
+# Memory per lobby (tracemalloc bytes, 4 players each) at 1k/10k/100k
+# sessions, and the cost of filling and starting a lobby: slotted
+# GameSession/Player with the telegram_id index against the plain
+# dataclasses with a list scan they replaced.
+#
+#   python -m bench.sessions
+
+PLAYERS = 4
+
+
+@dataclass(frozen=True)
+class PlainPlayer:
+    telegram_id: int
+    username: str
+    joined_at: datetime
+
+
+@dataclass
+class PlainSession:
+    code: str
+    chat_id: int
+    owner_id: int
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    state: SessionState = SessionState.LOBBY
+    players: List[PlainPlayer] = field(default_factory=list)
+    min_players: int = 3
+    max_players: int = 6
+
+    def add_player(self, telegram_id: int, username: Optional[str]) -> PlainPlayer:
+        if any(p.telegram_id == telegram_id for p in self.players):
+            raise ValueError("already joined")
+        player = PlainPlayer(telegram_id, normalize_username(username, telegram_id), datetime.utcnow())
+        self.players.append(player)
+        return player
+
+    def start(self, requester_id: int) -> None:
+        self.state = SessionState.STARTED
+
+
+def lobby(cls, n: int):
+    session = cls(code=f"{n:04X}", chat_id=-n, owner_id=n)
+    for user_id in range(n, n + PLAYERS):
+        session.add_player(user_id, f"user{user_id}")
+    return session
+
+
+def bytes_per_session(cls, count: int) -> float:
+    tracemalloc.start()
+    sessions = [lobby(cls, n) for n in range(count)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del sessions
+    return size / count
+
+
+def fill_and_start(cls) -> None:
+    session = cls(code="ABCD", chat_id=-1, owner_id=1)
+    for user_id in range(1, 7):
+        session.add_player(user_id, "user")
+    session.start(1)
+
+
+if __name__ == "__main__":
+    for count in (1_000, 10_000, 100_000):
+        plain = bytes_per_session(PlainSession, count)
+        slotted = bytes_per_session(GameSession, count)
+        print(f"{count:>8} sessions: {plain:8.0f} B plain, {slotted:8.0f} B slotted per session")
+    old = measure(lambda: fill_and_start(PlainSession), 20_000)
+    report("6 x add_player + start, plain", old)
+    report("6 x add_player + start, slotted", measure(lambda: fill_and_start(GameSession), 20_000), old)
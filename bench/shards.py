@@ -0,0 +1,111 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Connection
+from typing import List, Set
+
+from app.sharding import BATCH_SIZE, shard_for_chat, update_chat_id
+from bench.webhook import synthetic_updates
+
+# Throughput of sharded mode by worker count: the front routes synthetic
+# updates by chat_id over pipes, in batches, to worker processes that run
+# bot.py's dispatcher against the load generator's fake API. Scaling needs
+# as many free cores as workers.
+#
+#   python -m bench.shards --updates 20000 --workers 1 2 4
+
+
+def worker_main(index: int, shards: int, conn: Connection) -> None:
+    os.environ["SHARD_INDEX"] = str(index)
+    os.environ["SHARD_COUNT"] = str(shards)
+    from app import loadgen
+
+    asyncio.run(_worker(loadgen.load_app(), conn))
+
+
+async def _worker(app, conn: Connection) -> None:
+    from aiogram import Bot
+
+    from app import loadgen
+
+    bot = Bot(token=loadgen.TOKEN, session=loadgen.FakeSession())
+    dp = app.build_dispatcher()
+    services = app.start_services(bot)
+    loop = asyncio.get_running_loop()
+    reader = ThreadPoolExecutor(max_workers=1)
+    tasks: Set[asyncio.Task] = set()
+    handled = 0
+
+    conn.send("ready")
+    while True:
+        # Same loop as app/sharding.py's worker, until the front sends None
+        batch = await loop.run_in_executor(reader, conn.recv)
+        if batch is None:
+            break
+        for update in batch:
+            task = asyncio.create_task(dp.feed_raw_update(bot, update))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        handled += len(batch)
+    while tasks or app.outbox.depth:
+        await asyncio.sleep(0.01)
+    await app.stop_services(services)
+    conn.send(handled)
+
+
+def run(updates: list, shards: int) -> float:
+    ctx = multiprocessing.get_context("spawn")
+    conns: List[Connection] = []
+    processes = []
+    for index in range(shards):
+        front, worker = ctx.Pipe()
+        process = ctx.Process(target=worker_main, args=(index, shards, worker), daemon=True)
+        process.start()
+        conns.append(front)
+        processes.append(process)
+    for conn in conns:
+        assert conn.recv() == "ready"
+
+    started = time.perf_counter()
+    batches: List[list] = [[] for _ in range(shards)]
+    for update in updates:
+        shard = shard_for_chat(update_chat_id(update), shards)
+        batch = batches[shard]
+        batch.append(update)
+        if len(batch) == BATCH_SIZE:
+            conns[shard].send(batch)
+            batch.clear()
+    for conn, batch in zip(conns, batches):
+        if batch:
+            conn.send(batch)
+        conn.send(None)
+    handled = sum(conn.recv() for conn in conns)
+    elapsed = time.perf_counter() - started
+
+    for process in processes:
+        process.join()
+    assert handled == len(updates)
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sharded mode throughput by worker count")
+    parser.add_argument("--updates", type=int, default=20_000)
+    parser.add_argument("--chats", type=int, default=1000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    updates = synthetic_updates(args.updates, args.chats, seed=1)
+    print(f"{args.updates} updates over {args.chats} chats, {os.cpu_count()} CPUs")
+    baseline = None
+    for shards in args.workers:
+        rate = len(updates) / run(updates, shards)
+        baseline = baseline or rate
+        print(f"{shards:>3} workers: {rate:8.0f} updates/s  ({rate / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
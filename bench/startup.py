@@ -0,0 +1,76 @@
+import os
+import re
+import subprocess
+import sys
+import time
+
+# Cold start of a worker, each step in a fresh interpreter: importing bot.py
+# (its own `-X importtime` total, and the slowest modules it pulls in),
+# `python bot.py --check`, and the time from launching a process to its first
+# update handled by the dispatcher (fake Telegram API, see app/loadgen.py).
+# Prints whether that last one is within TARGET_FIRST_UPDATE.
+#
+#   python -m bench.startup
+#
+# bench/startup.txt has the `-X importtime` output for bot.py before and
+# after aiogram and the services were imported lazily.
+
+RUNS = 5
+# Seconds from launch to the first update handled; importing aiogram is most
+# of it and cannot be deferred past the first update
+TARGET_FIRST_UPDATE = 5.0
+ENV = dict(os.environ, BOT_TOKEN="123456:bench")
+
+FIRST_UPDATE = """
+import asyncio
+from aiogram import Bot
+from app import loadgen
+app = loadgen.load_app()
+
+async def first() -> None:
+    bot = Bot(token=loadgen.TOKEN, session=loadgen.FakeSession())
+    dp = app.build_dispatcher()
+    services = app.start_services(bot)
+    await dp.feed_raw_update(bot, loadgen.Updates().message(-1, 1, "/start"))
+    await app.stop_services(services)
+
+asyncio.run(first())
+"""
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def importtime(module: str = "bot"):
+    """Cumulative microseconds of `module` and the modules it imported, slowest first."""
+    err = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=ENV, capture_output=True, text=True, check=True,
+    ).stderr
+    rows = [(int(cumulative), len(indent), name) for _, cumulative, indent, name in IMPORT_LINE.findall(err)]
+    end = next(i for i, (_, _, name) in enumerate(rows) if name == module)
+    total, depth, _ = rows[end]
+    # Its imports are listed just before it, indented deeper
+    start = end
+    while start and rows[start - 1][1] > depth:
+        start -= 1
+    return total, sorted(((us, name) for us, _, name in rows[start:end]), reverse=True)[:5]
+
+
+def wall(args) -> float:
+    runs = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], env=ENV, capture_output=True, check=True)
+        runs.append(time.perf_counter() - start)
+    return min(runs)
+
+
+if __name__ == "__main__":
+    total, slowest = min(importtime() for _ in range(RUNS))
+    print(f"import bot: {total / 1000:.1f} ms (-X importtime, cumulative)")
+    for us, name in slowest:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+    print(f"python bot.py --check: {wall(['bot.py', '--check']):.2f}s")
+    first = wall(["-c", FIRST_UPDATE])
+    verdict = "within" if first <= TARGET_FIRST_UPDATE else "OVER"
+    print(f"launch to first update: {first:.2f}s ({verdict} the {TARGET_FIRST_UPDATE:.1f}s target)")
@@ -0,0 +1,118 @@
+import argparse
+import asyncio
+import random
+import time
+from typing import Any, Dict, List
+
+from aiogram import Bot
+from aiohttp import ClientSession, web
+
+from app import loadgen
+from app.callbacks import pack
+from app.metrics import Histogram
+from app.webhook import SECRET_HEADER, WebhookHandler
+
+# Replays synthetic updates to a local webhook server over HTTP and reports
+# how fast they are acknowledged and how long until their handler finished
+# (p50/p99), with the bot's handlers answered by the load generator's fake API.
+#
+#   python -m bench.webhook --updates 5000 --clients 32
+#   python -m bench.webhook --api-latency 200   (slow API: acks must stay fast)
+
+SECRET = "bench"
+PATH = "/webhook"
+
+
+def synthetic_updates(count: int, chats: int, seed: int) -> List[Dict[str, Any]]:
+    """Group traffic that needs no lobby: chatter, commands and menu buttons."""
+    rng = random.Random(seed)
+    updates = loadgen.Updates()
+    made = []
+    for _ in range(count):
+        chat_id = -1_000_000 - rng.randrange(chats)
+        user_id = 10_000 + rng.randrange(chats * 5)
+        kind = rng.random()
+        if kind < 0.7:
+            made.append(updates.message(chat_id, user_id, rng.choice(loadgen.CHATTER)))
+        elif kind < 0.8:
+            made.append(updates.message(chat_id, user_id, rng.choice(("/start", "/help", "/players"))))
+        else:
+            made.append(updates.callback(chat_id, user_id, pack(rng.choice(("menu", "help", "status")))))
+    return made
+
+
+async def run(count: int, clients: int, chats: int, api_latency: float, workers: int, seed: int) -> None:
+    app = loadgen.load_app()
+    bot = Bot(token=loadgen.TOKEN, session=loadgen.FakeSession(api_latency))
+    dp = app.build_dispatcher()
+    services = app.start_services(bot)
+
+    sent_at: Dict[int, float] = {}
+    handled = Histogram()
+
+    @dp.update.outer_middleware()
+    async def finished(handler, update, data):
+        try:
+            return await handler(update, data)
+        finally:
+            handled.record(time.perf_counter() - sent_at[update.update_id])
+
+    webhook = WebhookHandler(dp, bot, SECRET, workers=workers, queue_size=count)
+    server = web.Application()
+    server.router.add_post(PATH, webhook.handle)
+    runner = web.AppRunner(server, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    webhook.start()
+
+    pending = synthetic_updates(count, chats, seed)
+    pending.reverse()
+    acked = Histogram()
+    rejected = 0
+
+    async def client(http: ClientSession) -> None:
+        nonlocal rejected
+        url = f"http://127.0.0.1:{port}{PATH}"
+        while pending:
+            update = pending.pop()
+            start = sent_at[update["update_id"]] = time.perf_counter()
+            async with http.post(url, json=update, headers={SECRET_HEADER: SECRET}) as response:
+                if response.status != 200:
+                    rejected += 1
+            acked.record(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    async with ClientSession() as http:
+        await asyncio.gather(*(client(http) for _ in range(clients)))
+    ingested = time.perf_counter() - started
+    await webhook.queue.join()
+    elapsed = time.perf_counter() - started
+
+    await webhook.stop()
+    await runner.cleanup()
+    await app.stop_services(services)
+
+    print(f"{count} updates, {clients} clients, {workers} workers, API latency {api_latency * 1000:.0f} ms")
+    print(f"  ingested in {ingested:.2f}s ({count / ingested:.0f}/s), handled in {elapsed:.2f}s ({count / elapsed:.0f}/s)")
+    print(f"  ack      p50 {acked.percentile(0.5) * 1000:7.2f} ms   p99 {acked.percentile(0.99) * 1000:7.2f} ms")
+    print(f"  handler  p50 {handled.percentile(0.5) * 1000:7.2f} ms   p99 {handled.percentile(0.99) * 1000:7.2f} ms")
+    if rejected:
+        print(f"  rejected {rejected}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Webhook ingestion benchmark")
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=32, help="concurrent HTTP connections")
+    parser.add_argument("--chats", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=16, help="WEBHOOK_WORKERS")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="ms the fake API takes per call")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(run(args.updates, args.clients, args.chats, args.api_latency / 1000, args.workers, args.seed))
+
+
+if __name__ == "__main__":
+    main()
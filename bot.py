@@ -1,276 +1,301 @@
 import os
+import argparse
 import asyncio
-from dotenv import load_dotenv
+import html
+import signal
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import TYPE_CHECKING, List, Optional, Set, Tuple
+
+from app.callbacks import CallbackRouter, pack
+from app.locks import ChatLocks
+from storage.base import SessionStorage
+from storage.codes import ALPHABET, CodeAllocator
+from storage.memory import InMemoryStorage
+from game.deck import deal
+from game.errors import GameError, SessionNotFound
+from game.player import Player
+from game.session import GameSession, SessionState
+from i18n import ERROR_KEYS, LANGUAGES, catalog, t
+
+if TYPE_CHECKING:
+    # aiogram (seconds to import) and the services are imported by
+    # create_app(), create_bot() and build_dispatcher(): `--check` needs
+    # neither, the sharded front none of the services
+    from aiogram import Bot, Dispatcher, types
+    from aiogram.types import InlineKeyboardMarkup
+
+    from app.board import LobbyBoard
+    from app.hands import HandFanout
+    from app.outbound import OutboundScheduler
+    from app.timers import TimerWheel
+    from storage.fsm import FSMStorage
+    from storage.prefs import ChatLanguages
+
+    # Imported at runtime only when enabled (METRICS_PORT, /profile)
+    from app.metrics import Metrics
+    from app.profiling import SamplingProfiler
 
-from aiogram import Bot, Dispatcher, types
-from aiogram.client.default import DefaultBotProperties
-from aiogram.enums import ParseMode
-from aiogram.filters import CommandStart, Command
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from aiogram.exceptions import TelegramBadRequest
+TOKEN = os.getenv("BOT_TOKEN")
 
-from aiogram.fsm.storage.memory import MemoryStorage
-from aiogram.fsm.state import StatesGroup, State
-from aiogram.fsm.context import FSMContext
+# Set by app/sharding.py in worker processes (python bot.py --shards N)
+SHARD_INDEX = int(os.getenv("SHARD_INDEX", "0"))
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "1"))
 
-from storage.memory import InMemoryStorage
-from game.errors import GameError
 
-load_dotenv()
+def make_storage() -> SessionStorage:
+    # Each shard's codes start with its own letter
+    codes = CodeAllocator(prefix=ALPHABET[SHARD_INDEX] if SHARD_COUNT > 1 else "")
+
+    # In-memory by default; set DB_PATH to keep lobbies across restarts
+    db_path = shard_path("DB_PATH")
+    if db_path:
+        from storage.sqlite import SQLiteStorage
+        return SQLiteStorage(db_path, flush_interval_ms=int(os.getenv("DB_FLUSH_MS", "200")), codes=codes)
+
+    # ...or JOURNAL_DIR to keep an event journal of every change
+    journal_dir = os.getenv("JOURNAL_DIR")
+    if journal_dir:
+        from storage.journal import JournalStorage
+        return JournalStorage(journal_path(journal_dir), flush_interval_ms=int(os.getenv("DB_FLUSH_MS", "200")), codes=codes)
+    return InMemoryStorage(codes=codes)
 
-TOKEN = os.getenv("BOT_TOKEN")
-if not TOKEN:
-    raise RuntimeError("BOT_TOKEN not found. Check your .env file.")
 
-# Your game sessions storage (in-memory)
-game_storage = InMemoryStorage()
+def journal_path(journal_dir: str) -> str:
+    return os.path.join(journal_dir, f"shard{SHARD_INDEX}") if SHARD_COUNT > 1 else journal_dir
 
-# FSM storage (temporary states like "waiting for join code")
-fsm_storage = MemoryStorage()
 
-# Fix for Hebrew (RTL) when showing LTR commands like "/join ABCD"
-LRM = "\u200E"  # Left-to-Right Mark (invisible)
+def owns_chat(chat_id: int) -> bool:
+    if SHARD_COUNT == 1:
+        return True
+    from app.sharding import shard_for_chat
+    return shard_for_chat(chat_id, SHARD_COUNT) == SHARD_INDEX
 
-# Chat language (per group chat_id). Default = English.
-chat_lang: dict[int, str] = {}  # chat_id -> "en" | "ru" | "he"
+
+def shard_path(name: str) -> Optional[str]:
+    # Each shard has its own file
+    path = os.getenv(name)
+    if path and SHARD_COUNT > 1:
+        path = f"{path}.{SHARD_INDEX}"
+    return path
 
 
 # -------------------------
-# Translations dictionary
+# Services
 # -------------------------
-TR = {
-    "en": {
-        "menu_title": "Control menu:",
-        "btn_newgame": "🎲 New game",
-        "btn_join": "➕ Join",
-        "btn_players": "👥 Players",
-        "btn_start": "🚀 Start",
-        "btn_status": "ℹ️ Status",
-        "btn_help": "❓ Help",
-        "btn_languages": "🌐 Languages",
-        "btn_back": "⬅️ Back",
-
-        "only_group_cmd": "This command works only in group chats.",
-        "join_only_group": "Join works only in group chats.",
-        "send_join_code": "Send the join code (example: <code>{lrm}A1B2</code>).",
-
-        "game_created": (
-            "🎲 <b>Game created!</b>\n"
-            "Code: <b>{code}</b>\n\n"
-            "To join: <code>{lrm}/join {code}</code>\n"
-            "Or press <b>Join</b> in the menu."
-        ),
-        "joined": "✅ {username} joined the lobby.",
-        "code_other_group": "This code belongs to another group chat.",
-
-        "status": "Status: <b>{state}</b>\nCode: <b>{code}</b>\nPlayers: {count}/{max}",
-        "players_header": "Players ({count}/{max}):",
-
-        "help": (
-            "<b>How to use the bot</b>\n\n"
-            "✅ <b>Create lobby</b>: <code>{lrm}/newgame</code> (group chat only)\n"
-            "➕ <b>Join lobby</b>: <code>{lrm}/join CODE</code> (or press <b>Join</b>)\n"
-            "👥 <b>Players</b>: <code>{lrm}/players</code>\n"
-            "🚀 <b>Start</b>: <code>{lrm}/start</code> (owner only)\n\n"
-            "<i>Tip:</i> Use the menu buttons to avoid typing commands."
-        ),
-
-        "lang_choose": "<b>Select language</b>:",
-        "lang_set_en": "✅ Language set to English.",
-        "lang_set_ru": "✅ Language set to Russian.",
-        "lang_set_he": "✅ Language set to Hebrew.",
-
-        "game_started": "🚀 The game has started (M1).",
-
-        "err_SessionNotFound": "No active lobby. Use /newgame.",
-        "err_PlayerAlreadyJoined": "You are already in the lobby.",
-        "err_SessionAlreadyStarted": "The game has already started.",
-        "err_SessionFull": "The lobby is full.",
-        "err_NotEnoughPlayers": "Not enough players to start.",
-        "err_NotOwner": "Only the lobby owner can start the game.",
-        "err_default": "Something went wrong.",
-    },
-
-    "ru": {
-        "menu_title": "Меню управления:",
-        "btn_newgame": "🎲 Новая игра",
-        "btn_join": "➕ Вступить",
-        "btn_players": "👥 Игроки",
-        "btn_start": "🚀 Старт",
-        "btn_status": "ℹ️ Статус",
-        "btn_help": "❓ Помощь",
-        "btn_languages": "🌐 Язык",
-        "btn_back": "⬅️ Назад",
-
-        "only_group_cmd": "Эта команда работает только в группе.",
-        "join_only_group": "Вступление работает только в группе.",
-        "send_join_code": "Отправь код игры (пример: <code>{lrm}A1B2</code>).",
-
-        "game_created": (
-            "🎲 <b>Игра создана!</b>\n"
-            "Код: <b>{code}</b>\n\n"
-            "Чтобы вступить: <code>{lrm}/join {code}</code>\n"
-            "Или нажми <b>Вступить</b> в меню."
-        ),
-        "joined": "✅ {username} присоединился к лобби.",
-        "code_other_group": "Этот код относится к другой группе.",
-
-        "status": "Статус: <b>{state}</b>\nКод: <b>{code}</b>\nИгроки: {count}/{max}",
-        "players_header": "Игроки ({count}/{max}):",
-
-        "help": (
-            "<b>Как пользоваться ботом</b>\n\n"
-            "✅ <b>Создать лобби</b>: <code>{lrm}/newgame</code> (только в группе)\n"
-            "➕ <b>Вступить</b>: <code>{lrm}/join CODE</code> (или кнопка <b>Вступить</b>)\n"
-            "👥 <b>Игроки</b>: <code>{lrm}/players</code>\n"
-            "🚀 <b>Старт</b>: <code>{lrm}/start</code> (только создатель)\n\n"
-            "<i>Совет:</i> используй кнопки меню, чтобы не вводить команды."
-        ),
-
-        "lang_choose": "<b>Выбери язык</b>:",
-        "lang_set_en": "✅ Язык переключен на English.",
-        "lang_set_ru": "✅ Язык переключен на Русский.",
-        "lang_set_he": "✅ Язык переключен на עברית.",
-
-        "game_started": "🚀 Игра началась (M1).",
-
-        "err_SessionNotFound": "Нет активной игры. Используй /newgame.",
-        "err_PlayerAlreadyJoined": "Ты уже в лобби.",
-        "err_SessionAlreadyStarted": "Игра уже началась.",
-        "err_SessionFull": "Лобби заполнено.",
-        "err_NotEnoughPlayers": "Недостаточно игроков для старта.",
-        "err_NotOwner": "Только создатель игры может начать.",
-        "err_default": "Произошла ошибка.",
-    },
-
-    "he": {
-        "menu_title": "תפריט שליטה:",
-        "btn_newgame": "🎲 משחק חדש",
-        "btn_join": "➕ הצטרפות",
-        "btn_players": "👥 שחקנים",
-        "btn_start": "🚀 התחלה",
-        "btn_status": "ℹ️ סטטוס",
-        "btn_help": "❓ עזרה",
-        "btn_languages": "🌐 שפה",
-        "btn_back": "⬅️ חזרה",
-
-        "only_group_cmd": "הפקודה הזו עובדת רק בקבוצות.",
-        "join_only_group": "הצטרפות עובדת רק בקבוצות.",
-        "send_join_code": "שלח את קוד ההצטרפות (לדוגמה: <code>{lrm}A1B2</code>).",
-
-        "game_created": (
-            "🎲 <b>המשחק נוצר!</b>\n"
-            "קוד: <b>{code}</b>\n\n"
-            "כדי להצטרף: <code>{lrm}/join {code}</code>\n"
-            "או לחץ <b>הצטרפות</b> בתפריט."
-        ),
-        "joined": "✅ {username} הצטרף ללובי.",
-        "code_other_group": "הקוד הזה שייך לקבוצה אחרת.",
-
-        "status": "סטטוס: <b>{state}</b>\nקוד: <b>{code}</b>\nשחקנים: {count}/{max}",
-        "players_header": "שחקנים ({count}/{max}):",
-
-        "help": (
-            "<b>איך משתמשים בבוט</b>\n\n"
-            "✅ <b>יצירת לובי</b>: <code>{lrm}/newgame</code> (רק בקבוצה)\n"
-            "➕ <b>הצטרפות</b>: <code>{lrm}/join CODE</code> (או כפתור <b>הצטרפות</b>)\n"
-            "👥 <b>שחקנים</b>: <code>{lrm}/players</code>\n"
-            "🚀 <b>התחלה</b>: <code>{lrm}/start</code> (רק הבעלים)\n\n"
-            "<i>טיפ:</i> השתמש בכפתורים כדי לא להקליד פקודות."
-        ),
-
-        "lang_choose": "<b>בחר שפה</b>:",
-        "lang_set_en": "✅ השפה הוגדרה לאנגלית.",
-        "lang_set_ru": "✅ השפה הוגדרה לרוסית.",
-        "lang_set_he": "✅ השפה הוגדרה לעברית.",
-
-        "game_started": "🚀 המשחק התחיל (M1).",
-
-        "err_SessionNotFound": "אין לובי פעיל. השתמש ב־/newgame.",
-        "err_PlayerAlreadyJoined": "אתה כבר בלובי.",
-        "err_SessionAlreadyStarted": "המשחק כבר התחיל.",
-        "err_SessionFull": "הלובי מלא.",
-        "err_NotEnoughPlayers": "אין מספיק שחקנים כדי להתחיל.",
-        "err_NotOwner": "רק בעל הלובי יכול להתחיל את המשחק.",
-        "err_default": "משהו השתבש.",
-    },
-}
+# Created by create_app(), once per process. Importing this module opens no
+# files, so the sharded front process and `--check` never touch storage.
+game_storage: SessionStorage
+outbox: "OutboundScheduler"
+lobby_board: "LobbyBoard"
+hand_fanout: "HandFanout"
+timers: "TimerWheel"
+autostart_after = 0.0
+fsm_storage: Optional["FSMStorage"] = None
+chat_lang: "ChatLanguages"
+metrics: Optional["Metrics"] = None
+admin_ids: Set[int] = set()
+profiler: Optional["SamplingProfiler"] = None
+
+# Longest /profile run an admin can ask for, in seconds
+MAX_PROFILE_SECONDS = 300
+
+
+def create_app() -> None:
+    global game_storage, outbox, lobby_board, hand_fanout, timers, autostart_after, fsm_storage, chat_lang, metrics
+    global admin_ids
+    from app.board import LobbyBoard
+    from app.hands import HandFanout
+    from app.outbound import OutboundScheduler
+    from app.timers import TimerWheel
+    from storage.fsm import FSMStorage
+    from storage.prefs import ChatLanguages
+
+    # Your game sessions storage
+    game_storage = make_storage()
+
+    # Everything the bot sends goes through this queue (Telegram rate limits).
+    # Shards split the global limit between them.
+    outbox = OutboundScheduler(global_rate=30.0 / SHARD_COUNT)
+
+    # One roster message per lobby, edited as people join
+    lobby_board = LobbyBoard(outbox)
+
+    # Each player's hand goes to their private chat when a game starts
+    hand_fanout = HandFanout(outbox)
+
+    # Deadlines of every session, on one timing wheel. With LOBBY_AUTOSTART
+    # set, a lobby with enough players starts by itself after that many
+    # seconds without a new join. Set TIMERS_PATH to keep them across restarts.
+    timers = TimerWheel(shard_path("TIMERS_PATH"))
+    timers.on("autostart", autostart_lobby)
+    # A dropped session's code can be handed out again; its deadlines go with it.
+    # Saved deadlines of sessions that did not survive the restart (all of
+    # them with in-memory storage) are dropped for the same reason.
+    game_storage.on_eviction(lambda session, reason: timers.cancel_session(session.code))
+    timers.retain(game_storage.has_session)
+    autostart_after = float(os.getenv("LOBBY_AUTOSTART", "0"))
+
+    # FSM storage (temporary states like "waiting for join code").
+    # States expire after FSM_TTL seconds; with DB_PATH they survive restarts.
+    fsm_storage = FSMStorage(shard_path("DB_PATH"), ttl=float(os.getenv("FSM_TTL", "900")))
+
+    # Chat language (per group chat_id). Default = English.
+    # Set LANG_PATH to keep it across restarts.
+    chat_lang = ChatLanguages(shard_path("LANG_PATH"))
+
+    # Telegram user ids allowed to run admin commands (/profile)
+    admin_ids = {int(i) for i in os.getenv("ADMIN_IDS", "").split(",") if i.strip()}
+
+    # Prometheus metrics, only collected when METRICS_PORT is set
+    if os.getenv("METRICS_PORT"):
+        from app.metrics import Metrics
+        metrics = Metrics()
+        metrics.gauge("live_sessions", lambda: game_storage.live_sessions)
+        metrics.gauge("lobbies", lambda: game_storage.index.count(SessionState.LOBBY))
+        metrics.gauge("started_games", lambda: game_storage.index.count(SessionState.STARTED))
+        metrics.gauge("fsm_records", lambda: fsm_storage.live_records)
+        metrics.gauge("outbox_depth", lambda: outbox.depth)
+        metrics.gauge("hand_fanout_seconds_max", lambda: hand_fanout.seconds_max)
+        metrics.gauge("hands_unreachable", lambda: hand_fanout.unreachable)
+        metrics.gauge("pending_timers", lambda: len(timers))
+
+
+def check_config(webhook: bool = False, shards: int = 0) -> List[str]:
+    """Problems with the configuration, found without connecting anywhere."""
+    problems = []
+
+    left, _, right = (TOKEN or "").partition(":")
+    if not TOKEN:
+        problems.append("BOT_TOKEN not found. Check your .env file.")
+    elif not (left.isdigit() and right) or any(c.isspace() for c in TOKEN):
+        problems.append("BOT_TOKEN does not look like a bot token (123456:ABC...).")
+
+    for name, convert in (
+        ("DB_FLUSH_MS", int), ("FSM_TTL", float), ("LOBBY_AUTOSTART", float), ("METRICS_PORT", int),
+        ("SLOW_UPDATE_MS", float), ("PROFILE_SECONDS", float),
+    ):
+        value = os.getenv(name)
+        if value is not None:
+            try:
+                convert(value)
+            except ValueError:
+                problems.append(f"{name} must be a number, got {value!r}.")
+
+    if os.getenv("DB_PATH") and os.getenv("JOURNAL_DIR"):
+        problems.append("Both DB_PATH and JOURNAL_DIR are set; only DB_PATH would be used.")
+    for name in ("DB_PATH", "JOURNAL_DIR", "LANG_PATH", "TIMERS_PATH", "SLOW_UPDATE_LOG"):
+        path = os.getenv(name)
+        if path:
+            parent = os.path.dirname(os.path.abspath(path))
+            if not os.access(parent, os.W_OK):
+                problems.append(f"{name}: directory {parent} does not exist or is not writable.")
+
+    if any(not i.strip().isdigit() for i in os.getenv("ADMIN_IDS", "").split(",") if i.strip()):
+        problems.append("ADMIN_IDS must be comma-separated Telegram user ids.")
+    profile_dir = os.getenv("PROFILE_DIR")
+    if profile_dir and not os.access(profile_dir, os.W_OK):
+        problems.append(f"PROFILE_DIR: directory {profile_dir} does not exist or is not writable.")
+
+    if webhook:
+        from app.webhook import WebhookConfig
+        try:
+            WebhookConfig.from_env()
+        except (RuntimeError, ValueError) as e:
+            problems.append(str(e))
+
+    if shards:
+        from app.sharding import MAX_SHARDS
+        if not 1 <= shards <= MAX_SHARDS:
+            problems.append(f"--shards must be between 1 and {MAX_SHARDS}.")
+        if webhook:
+            problems.append("--webhook and --shards cannot be combined; sharded mode uses long polling.")
+
+    # Catalogs are otherwise compiled lazily; make sure every language compiles
+    for lang in LANGUAGES:
+        try:
+            catalog(lang)
+        except (KeyError, ValueError) as e:
+            problems.append(f"Texts for {lang!r} do not compile: {e}")
+    return problems
 
 
 # -------------------------
 # Helpers: language + text
 # -------------------------
 def get_lang(chat_id: int) -> str:
-    return chat_lang.get(chat_id, "en")
-
-
-def lrm_for(lang: str) -> str:
-    # Apply LRM only for Hebrew (RTL). For EN/RU leave empty.
-    return LRM if lang == "he" else ""
-
-
-def t(lang: str, key: str, **kwargs) -> str:
-    text = TR.get(lang, TR["en"]).get(key, TR["en"].get(key, key))
-    # Always inject lrm (empty for EN/RU, LRM for HE)
-    kwargs.setdefault("lrm", lrm_for(lang))
-    return text.format(**kwargs) if kwargs else text
+    return chat_lang.get(chat_id)
 
 
 # -------------------------
 # Keyboards
 # -------------------------
-def main_menu(lang: str) -> InlineKeyboardMarkup:
+# Keyboards only depend on the language, so each one is built once and reused
+# (aiogram models are immutable).
+@lru_cache(maxsize=None)
+def main_menu(lang: str) -> "InlineKeyboardMarkup":
+    from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
     return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text=t(lang, "btn_newgame"), callback_data="newgame")],
-        [InlineKeyboardButton(text=t(lang, "btn_join"), callback_data="join_flow")],
-        [InlineKeyboardButton(text=t(lang, "btn_players"), callback_data="players")],
-        [InlineKeyboardButton(text=t(lang, "btn_start"), callback_data="start")],
-        [InlineKeyboardButton(text=t(lang, "btn_status"), callback_data="status")],
-        [InlineKeyboardButton(text=t(lang, "btn_help"), callback_data="help")],
-        [InlineKeyboardButton(text=t(lang, "btn_languages"), callback_data="languages")],
+        [InlineKeyboardButton(text=t(lang, "btn_newgame"), callback_data=pack("newgame"))],
+        [InlineKeyboardButton(text=t(lang, "btn_join"), callback_data=pack("join_flow"))],
+        [InlineKeyboardButton(text=t(lang, "btn_players"), callback_data=pack("players"))],
+        [InlineKeyboardButton(text=t(lang, "btn_start"), callback_data=pack("start"))],
+        [InlineKeyboardButton(text=t(lang, "btn_status"), callback_data=pack("status"))],
+        [InlineKeyboardButton(text=t(lang, "btn_help"), callback_data=pack("help"))],
+        [InlineKeyboardButton(text=t(lang, "btn_languages"), callback_data=pack("languages"))],
     ])
 
 
-def back_menu(lang: str) -> InlineKeyboardMarkup:
+@lru_cache(maxsize=None)
+def back_menu(lang: str) -> "InlineKeyboardMarkup":
+    from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
     return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text=t(lang, "btn_back"), callback_data="menu")]
+        [InlineKeyboardButton(text=t(lang, "btn_back"), callback_data=pack("menu"))]
     ])
 
 
-def languages_menu(lang: str) -> InlineKeyboardMarkup:
+@lru_cache(maxsize=None)
+def languages_menu(lang: str) -> "InlineKeyboardMarkup":
+    from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
     return InlineKeyboardMarkup(inline_keyboard=[
         [
-            InlineKeyboardButton(text="English", callback_data="lang:en"),
-            InlineKeyboardButton(text="Русский", callback_data="lang:ru"),
-            InlineKeyboardButton(text="עברית", callback_data="lang:he"),
+            InlineKeyboardButton(text="English", callback_data=pack("lang", "en")),
+            InlineKeyboardButton(text="Русский", callback_data=pack("lang", "ru")),
+            InlineKeyboardButton(text="עברית", callback_data=pack("lang", "he")),
         ],
-        [InlineKeyboardButton(text=t(lang, "btn_back"), callback_data="menu")]
+        [InlineKeyboardButton(text=t(lang, "btn_back"), callback_data=pack("menu"))]
     ])
 
 
 # -------------------------
 # Misc helpers
 # -------------------------
-def is_group(chat: types.Chat) -> bool:
+def is_group(chat: "types.Chat") -> bool:
     return chat.type in ("group", "supergroup")
 
 
-async def edit_menu_message(call: types.CallbackQuery, text: str, reply_markup: InlineKeyboardMarkup) -> None:
+def topic_of(message: "types.Message") -> Optional[int]:
+    return message.message_thread_id if message.is_topic_message else None
+
+
+async def reply(message: "types.Message", text: str, reply_markup: Optional["InlineKeyboardMarkup"] = None) -> None:
+    """
+    Queue an answer in the same chat (and topic). Does not wait for delivery.
+    """
+    outbox.send_message(message.chat.id, text, reply_markup=reply_markup, message_thread_id=topic_of(message))
+
+
+async def edit_menu_message(call: "types.CallbackQuery", text: str, reply_markup: "InlineKeyboardMarkup") -> None:
     """
     Edit the same message instead of sending a new one (prevents chat spam).
+    Quick repeated presses are merged into one edit by the outbound queue,
+    which also ignores "message is not modified".
     """
-    try:
-        await call.message.edit_text(text, reply_markup=reply_markup)
-    except TelegramBadRequest:
-        # Typical reason: "message is not modified"
-        pass
+    outbox.edit_message_text(call.message.chat.id, call.message.message_id, text, reply_markup=reply_markup)
 
 
 def format_players(session, lang: str) -> str:
-    lines = [t(lang, "players_header", count=len(session.players), max=session.max_players)]
-    for i, p in enumerate(session.players, start=1):
-        lines.append(f"{i}. {p.username}")
-    return "\n".join(lines)
+    return lobby_board.roster(session, lang)
 
 
 def translate_error(e: Exception, lang: str) -> str:
@@ -278,58 +303,213 @@ def translate_error(e: Exception, lang: str) -> str:
     Translate game errors by class name.
     This works even if original exception messages are in Russian.
     """
-    name = type(e).__name__
-    key = f"err_{name}"
-    if key in TR.get(lang, {}):
-        return t(lang, key)
-    if key in TR["en"]:
-        return TR["en"][key]
-    return t(lang, "err_default")
+    return t(lang, ERROR_KEYS.get(type(e), "err_default"))
+
+
+def error_text(e: GameError, lang: str) -> str:
+    if metrics:
+        metrics.count_error(e)
+    return f"⚠️ {translate_error(e, lang)}"
 
 
 # -------------------------
-# Join flow (FSM)
+# Session operations
 # -------------------------
-class JoinFlow(StatesGroup):
-    waiting_for_code = State()
+# Every lookup-and-change of a chat's session runs under that chat's lock, so
+# concurrent updates (a join racing /start, a double-tapped button) are applied
+# one after another and their replies are queued in the same order.
+chat_locks = ChatLocks()
+
+# Pressing "New game" twice within this window returns the same lobby
+NEWGAME_DEBOUNCE = timedelta(seconds=10)
+
+
+async def open_lobby(chat_id: int, user: "types.User") -> GameSession:
+    async with chat_locks(chat_id):
+        try:
+            current = game_storage.get_by_chat(chat_id)
+        except SessionNotFound:
+            current = None
+
+        if (
+            current is not None
+            and current.state == SessionState.LOBBY
+            and current.owner_id == user.id
+            and len(current.players) == 1
+            and datetime.utcnow() - current.created_at < NEWGAME_DEBOUNCE
+        ):
+            return current
+
+        session = game_storage.create_session(chat_id, user.id)
+        session.add_player(user.id, user.username)
+        game_storage.save(session)
+        return session
+
+
+async def join_lobby(session: GameSession, user: "types.User") -> Player:
+    async with chat_locks(session.chat_id):
+        # The lobby may have been replaced while we waited for the lock
+        if game_storage.get_by_code(session.code) is not session:
+            raise SessionNotFound("Invalid code.")
+        player = session.add_player(user.id, user.username)
+        game_storage.save(session)
+        # Every join restarts the countdown
+        if autostart_after and len(session.players) >= session.min_players:
+            timers.schedule(session.code, "autostart", autostart_after)
+        return player
+
+
+async def start_game(chat_id: int, user_id: int) -> GameSession:
+    async with chat_locks(chat_id):
+        session = game_storage.get_by_chat(chat_id)
+        session.start(user_id)
+        game_storage.save(session)
+        timers.cancel(session.code, "autostart")
+        return session
+
+
+async def autostart_lobby(code: str) -> None:
+    """Start a lobby nobody joined for LOBBY_AUTOSTART seconds, on the owner's behalf."""
+    try:
+        await game_storage.preload_code(code)
+        session = game_storage.get_by_code(code)
+        async with chat_locks(session.chat_id):
+            # Replaced or started meanwhile
+            if game_storage.get_by_code(code) is not session or session.state != SessionState.LOBBY:
+                return
+            session.start(session.owner_id)
+            game_storage.save(session)
+    except GameError:
+        return
+
+    lang = get_lang(session.chat_id)
+    outbox.send_message(session.chat_id, t(lang, "game_autostarted"))
+    deal_hands(session, lang)
+
+
+# Work started by handlers that outlives them, such as hand deliveries and
+# profiles (the event loop only keeps weak references)
+background_tasks: Set[asyncio.Task] = set()
+
+
+def run_in_background(coro) -> None:
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+
+def deal_hands(session: GameSession, lang: str, thread_id: Optional[int] = None) -> None:
+    """
+    Deal the cards and DM every player their hand in the background, so the
+    group reply does not wait for the private chats.
+    """
+    from app.hands import HandFanout
+    messages = HandFanout.render(session, deal(len(session.players)), lang)
+    run_in_background(send_hands(session, messages, lang, thread_id))
+
+
+async def send_hands(session: GameSession, messages: List[Tuple[int, str]], lang: str, thread_id: Optional[int]) -> None:
+    result = await hand_fanout.send(session.code, messages)
+    if result.unreachable:
+        players = ", ".join(session.get_player(user_id).username for user_id in result.unreachable)
+        outbox.send_message(
+            session.chat_id, t(lang, "hands_unreachable", players=players), message_thread_id=thread_id,
+        )
+
+
+async def send_profile(running: asyncio.Future, chat_id: int, thread_id: Optional[int], lang: str) -> None:
+    from aiogram.types import FSInputFile
+    try:
+        profile = await running
+    except OSError:
+        outbox.send_message(chat_id, t(lang, "err_default"), message_thread_id=thread_id)
+        raise
+    top = "\n".join(f"{count} {html.escape(frame)}" for frame, count in profile.top)
+    outbox.send_document(
+        chat_id,
+        FSInputFile(profile.path),
+        caption=t(lang, "profile_done", path=html.escape(profile.path), samples=profile.samples, top=top),
+        message_thread_id=thread_id,
+    )
 
 
 # -------------------------
-# Main
+# Handlers
 # -------------------------
-async def main() -> None:
-    bot = Bot(token=TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+async def preload_session(handler, event, data):
+    # Sessions only on disk are read in a thread before handlers look up
+    # their chat, not on the event loop
+    message = getattr(event, "message", event)  # a button's message, or the message itself
+    chat = message.chat if message is not None else None
+    if chat is not None and is_group(chat):
+        await game_storage.preload_chat(chat.id)
+    return await handler(event, data)
+
+
+def build_dispatcher() -> "Dispatcher":
+    from aiogram import Dispatcher, types
+    from aiogram.filters import Command, CommandStart
+    from aiogram.fsm.context import FSMContext
+    from aiogram.fsm.state import State, StatesGroup
+
+    # Join flow (FSM); stored states are named after the class, "JoinFlow:..."
+    class JoinFlow(StatesGroup):
+        waiting_for_code = State()
+
     dp = Dispatcher(storage=fsm_storage)
+    dp.message.middleware(preload_session)
+    dp.callback_query.middleware(preload_session)
+    if metrics:
+        from app.metrics import HandlerTimer
+        dp.message.middleware(HandlerTimer(metrics))
+        dp.callback_query.middleware(HandlerTimer(metrics))
+    # Updates slower than SLOW_UPDATE_MS are written out with their payload
+    if os.getenv("SLOW_UPDATE_MS"):
+        from app.profiling import SlowUpdateLog
+        slow_log = SlowUpdateLog(
+            os.getenv("SLOW_UPDATE_LOG", "slow_updates.jsonl"), float(os.getenv("SLOW_UPDATE_MS")) / 1000,
+        )
+        dp.message.middleware(slow_log)
+        dp.callback_query.middleware(slow_log)
 
     @dp.message(CommandStart())
     async def start_menu(message: types.Message):
+        # Players who could not get their hand when a game started. The front
+        # sends a private /start to every shard, as each holds the hands of
+        # its own groups' games; only the chat's own shard answers it.
+        if message.chat.type == "private":
+            hand_fanout.resend(message.from_user.id)
+            if not owns_chat(message.chat.id):
+                return
         lang = get_lang(message.chat.id)
-        await message.answer(t(lang, "menu_title"), reply_markup=main_menu(lang))
+        await reply(message, t(lang, "menu_title"), reply_markup=main_menu(lang))
 
     @dp.message(Command("help"))
     async def help_cmd(message: types.Message):
         lang = get_lang(message.chat.id)
-        await message.answer(t(lang, "help"))
+        await reply(message, t(lang, "help"))
 
     @dp.message(Command("newgame"))
     async def newgame(message: types.Message):
         lang = get_lang(message.chat.id)
 
         if not is_group(message.chat):
-            await message.answer(t(lang, "only_group_cmd"))
+            await reply(message, t(lang, "only_group_cmd"))
             return
 
-        session = game_storage.create_session(message.chat.id, message.from_user.id)
-        session.add_player(message.from_user.id, message.from_user.username)
+        session = await open_lobby(message.chat.id, message.from_user)
 
-        await message.answer(t(lang, "game_created", code=session.code), reply_markup=main_menu(lang))
+        lobby_board.post(
+            session, lang, t(lang, "game_created", code=session.code),
+            reply_markup=main_menu(lang), message_thread_id=topic_of(message),
+        )
 
     @dp.message(Command("join"))
     async def join_command(message: types.Message, state: FSMContext):
         lang = get_lang(message.chat.id)
 
         if not is_group(message.chat):
-            await message.answer(t(lang, "join_only_group"))
+            await reply(message, t(lang, "join_only_group"))
             return
 
         parts = (message.text or "").split(maxsplit=1)
@@ -338,9 +518,11 @@ async def main() -> None:
             return
 
         await state.set_state(JoinFlow.waiting_for_code)
-        await message.answer(t(lang, "send_join_code"))
+        await reply(message, t(lang, "send_join_code"))
 
-    @dp.message(JoinFlow.waiting_for_code)
+    # Only messages shaped like a code count as the answer; other chatter
+    # (and commands) from someone who was asked for a code goes on as usual.
+    @dp.message(JoinFlow.waiting_for_code, lambda message: game_storage.codes.looks_like(message.text))
     async def join_flow_receive_code(message: types.Message, state: FSMContext):
         lang = get_lang(message.chat.id)
 
@@ -348,12 +530,7 @@ async def main() -> None:
             await state.clear()
             return
 
-        code = (message.text or "").strip()
-        if not code:
-            await message.answer(t(lang, "send_join_code"))
-            return
-
-        await do_join(message, code, lang)
+        await do_join(message, message.text.strip(), lang)
 
         # Optional: remove the code message to reduce spam (works if bot is admin)
         try:
@@ -363,125 +540,258 @@ async def main() -> None:
 
         await state.clear()
 
+    # Admins only (ADMIN_IDS): /profile [seconds] samples the event loop and,
+    # once done, sends the flamegraph file with the busiest functions. The
+    # handler returns right away; the profile finishes in the background.
+    @dp.message(Command("profile"))
+    async def profile_cmd(message: types.Message):
+        if message.from_user is None or message.from_user.id not in admin_ids:
+            return
+        lang = get_lang(message.chat.id)
+
+        parts = (message.text or "").split()
+        seconds = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 30
+        seconds = min(max(seconds, 1), MAX_PROFILE_SECONDS)
+        try:
+            running = get_profiler().start(seconds)
+        except RuntimeError:
+            await reply(message, t(lang, "profile_busy"))
+            return
+        await reply(message, t(lang, "profile_started", seconds=seconds))
+        run_in_background(send_profile(running, message.chat.id, topic_of(message), lang))
+
     @dp.message(Command("players"))
     async def players_cmd(message: types.Message):
         lang = get_lang(message.chat.id)
         try:
             session = game_storage.get_by_chat(message.chat.id)
-            await message.answer(format_players(session, lang))
+            await reply(message, format_players(session, lang))
         except GameError as e:
-            await message.answer(f"⚠️ {translate_error(e, lang)}")
+            await reply(message, error_text(e, lang))
 
     @dp.message(Command("start"))
     async def start_cmd(message: types.Message):
         lang = get_lang(message.chat.id)
         try:
-            session = game_storage.get_by_chat(message.chat.id)
-            session.start(message.from_user.id)
-            await message.answer(t(lang, "game_started"))
+            session = await start_game(message.chat.id, message.from_user.id)
+            await reply(message, t(lang, "game_started"))
+            deal_hands(session, lang, topic_of(message))
         except GameError as e:
-            await message.answer(f"⚠️ {translate_error(e, lang)}")
+            await reply(message, error_text(e, lang))
 
-    @dp.callback_query()
-    async def callbacks(call: types.CallbackQuery, state: FSMContext):
-        chat_id = call.message.chat.id
-        lang = get_lang(chat_id)
-        data = call.data or ""
+    # Inline buttons: one handler per action, see app/callbacks.py
+    buttons = CallbackRouter()
 
-        await call.answer()  # remove loading spinner
+    @buttons.action("menu")
+    async def menu_button(call: types.CallbackQuery, state: FSMContext, lang: str):
+        await state.clear()
+        await edit_menu_message(call, t(lang, "menu_title"), main_menu(lang))
 
-        if data == "menu":
-            await state.clear()
-            lang = get_lang(chat_id)
-            await edit_menu_message(call, t(lang, "menu_title"), main_menu(lang))
-            return
+    @buttons.action("help")
+    async def help_button(call: types.CallbackQuery, state: FSMContext, lang: str):
+        await edit_menu_message(call, t(lang, "help"), back_menu(lang))
 
-        if data == "help":
-            await edit_menu_message(call, t(lang, "help"), back_menu(lang))
-            return
+    @buttons.action("languages")
+    async def languages_button(call: types.CallbackQuery, state: FSMContext, lang: str):
+        await edit_menu_message(call, t(lang, "lang_choose"), languages_menu(lang))
 
-        if data == "languages":
-            await edit_menu_message(call, t(lang, "lang_choose"), languages_menu(lang))
-            return
+    @buttons.action("lang", str)
+    async def lang_button(call: types.CallbackQuery, state: FSMContext, lang: str, new_lang: str):
+        if new_lang not in ("en", "ru", "he"):
+            new_lang = "en"
 
-        if data.startswith("lang:"):
-            new_lang = data.split(":", 1)[1]
-            if new_lang not in ("en", "ru", "he"):
-                new_lang = "en"
+        chat_lang.set(call.message.chat.id, new_lang)
+        await state.clear()
 
-            chat_lang[chat_id] = new_lang
-            await state.clear()
+        # Show confirmation in the selected language
+        await edit_menu_message(call, t(new_lang, f"lang_set_{new_lang}"), main_menu(new_lang))
 
-            # Show confirmation in the selected language
-            await edit_menu_message(call, t(new_lang, f"lang_set_{new_lang}"), main_menu(new_lang))
+    @buttons.action("join_flow")
+    async def join_button(call: types.CallbackQuery, state: FSMContext, lang: str):
+        if not is_group(call.message.chat):
+            await edit_menu_message(call, t(lang, "join_only_group"), back_menu(lang))
             return
+        await state.set_state(JoinFlow.waiting_for_code)
+        await edit_menu_message(call, t(lang, "send_join_code"), back_menu(lang))
 
-        if data == "join_flow":
-            if not is_group(call.message.chat):
-                await edit_menu_message(call, t(lang, "join_only_group"), back_menu(lang))
-                return
-            await state.set_state(JoinFlow.waiting_for_code)
-            await edit_menu_message(call, t(lang, "send_join_code"), back_menu(lang))
+    @buttons.action("newgame")
+    async def newgame_button(call: types.CallbackQuery, state: FSMContext, lang: str):
+        if not is_group(call.message.chat):
+            await edit_menu_message(call, t(lang, "only_group_cmd"), back_menu(lang))
             return
 
-        if data == "newgame":
-            if not is_group(call.message.chat):
-                await edit_menu_message(call, t(lang, "only_group_cmd"), back_menu(lang))
-                return
-
-            session = game_storage.create_session(chat_id, call.from_user.id)
-            session.add_player(call.from_user.id, call.from_user.username)
+        session = await open_lobby(call.message.chat.id, call.from_user)
+
+        # The menu message becomes the lobby board
+        lobby_board.post(
+            session, lang, t(lang, "game_created", code=session.code),
+            message_id=call.message.message_id, reply_markup=back_menu(lang),
+        )
+
+    @buttons.action("players")
+    async def players_button(call: types.CallbackQuery, state: FSMContext, lang: str):
+        session = game_storage.get_by_chat(call.message.chat.id)
+        await edit_menu_message(call, format_players(session, lang), back_menu(lang))
+
+    @buttons.action("start")
+    async def start_button(call: types.CallbackQuery, state: FSMContext, lang: str):
+        session = await start_game(call.message.chat.id, call.from_user.id)
+        await edit_menu_message(call, t(lang, "game_started"), back_menu(lang))
+        deal_hands(session, lang, topic_of(call.message))
+
+    @buttons.action("status")
+    async def status_button(call: types.CallbackQuery, state: FSMContext, lang: str):
+        session = game_storage.get_by_chat(call.message.chat.id)
+        await edit_menu_message(
+            call,
+            t(lang, "status",
+              state=str(session.state),
+              code=session.code,
+              count=len(session.players),
+              max=session.max_players),
+            back_menu(lang),
+        )
 
-            await edit_menu_message(call, t(lang, "game_created", code=session.code), back_menu(lang))
-            return
-
-        if data == "players":
-            try:
-                session = game_storage.get_by_chat(chat_id)
-                await edit_menu_message(call, format_players(session, lang), back_menu(lang))
-            except GameError as e:
-                await edit_menu_message(call, f"⚠️ {translate_error(e, lang)}", back_menu(lang))
-            return
+    @dp.callback_query()
+    async def callbacks(call: types.CallbackQuery, state: FSMContext):
+        await call.answer()  # remove loading spinner
 
-        if data == "start":
-            try:
-                session = game_storage.get_by_chat(chat_id)
-                session.start(call.from_user.id)
-                await edit_menu_message(call, t(lang, "game_started"), back_menu(lang))
-            except GameError as e:
-                await edit_menu_message(call, f"⚠️ {translate_error(e, lang)}", back_menu(lang))
-            return
+        route = buttons.resolve(call.data or "")
+        if route is None:
+            return  # unknown or stale button (e.g. from an old message)
+        handler, args = route
 
-        if data == "status":
-            try:
-                session = game_storage.get_by_chat(chat_id)
-                await edit_menu_message(
-                    call,
-                    t(lang, "status",
-                      state=str(session.state),
-                      code=session.code,
-                      count=len(session.players),
-                      max=session.max_players),
-                    back_menu(lang),
-                )
-            except GameError as e:
-                await edit_menu_message(call, f"⚠️ {translate_error(e, lang)}", back_menu(lang))
-            return
+        lang = get_lang(call.message.chat.id)
+        try:
+            await handler(call, state, lang, *args)
+        except GameError as e:
+            await edit_menu_message(call, error_text(e, lang), back_menu(lang))
 
     async def do_join(message: types.Message, code: str, lang: str) -> None:
         try:
+            # Codes from another shard always belong to another chat
+            if not game_storage.codes.owns(code.upper()):
+                await reply(message, t(lang, "code_other_group"))
+                return
+
+            await game_storage.preload_code(code)
             session = game_storage.get_by_code(code)
             if session.chat_id != message.chat.id:
-                await message.answer(t(lang, "code_other_group"))
+                await reply(message, t(lang, "code_other_group"))
                 return
 
-            player = session.add_player(message.from_user.id, message.from_user.username)
-            await message.answer(t(lang, "joined", username=player.username))
+            player = await join_lobby(session, message.from_user)
+            # Joins show up on the lobby board, a burst of them in one edit
+            if not lobby_board.changed(session):
+                await reply(message, t(lang, "joined", username=player.username))
         except GameError as e:
-            await message.answer(f"⚠️ {translate_error(e, lang)}")
+            await reply(message, error_text(e, lang))
+
+    return dp
 
-    await dp.start_polling(bot)
+
+# -------------------------
+# Main
+# -------------------------
+def create_bot() -> "Bot":
+    from aiogram import Bot
+    from aiogram.client.default import DefaultBotProperties
+    from aiogram.enums import ParseMode
+
+    if not TOKEN:
+        raise RuntimeError("BOT_TOKEN not found. Check your .env file.")
+    bot = Bot(token=TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+    if metrics:
+        from app.metrics import ApiTimer
+        bot.session.middleware(ApiTimer(metrics))
+    return bot
+
+
+def get_profiler() -> "SamplingProfiler":
+    global profiler
+    if profiler is None:
+        from app.profiling import SamplingProfiler
+        profiler = SamplingProfiler(os.getenv("PROFILE_DIR", "."))
+    return profiler
+
+
+def start_services(bot: "Bot") -> List[asyncio.Task]:
+    # Outbound queue + storage housekeeping (expired lobbies, write-behind)
+    background = [asyncio.create_task(outbox.run(bot))]
+    for name in ("run_sweeper", "run_writer"):
+        if hasattr(game_storage, name):
+            background.append(asyncio.create_task(getattr(game_storage, name)()))
+    background.append(asyncio.create_task(fsm_storage.run_writer()))
+    background.append(asyncio.create_task(chat_lang.run_writer()))
+    background.append(asyncio.create_task(timers.run()))
+    background.append(asyncio.create_task(timers.run_writer()))
+
+    # `kill -USR1 <pid>` profiles the event loop for PROFILE_SECONDS (see /profile)
+    if hasattr(signal, "SIGUSR1"):
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGUSR1, lambda: get_profiler().start_logged(float(os.getenv("PROFILE_SECONDS", "30"))),
+        )
+
+    if metrics:
+        from app.metrics import serve
+        # Each shard gets its own port
+        port = int(os.getenv("METRICS_PORT")) + SHARD_INDEX
+        background.append(asyncio.create_task(serve(metrics, os.getenv("METRICS_HOST", "127.0.0.1"), port)))
+    return background
+
+
+async def stop_services(background: List[asyncio.Task]) -> None:
+    for task in [*background, *background_tasks]:
+        task.cancel()
+    if hasattr(game_storage, "close"):
+        game_storage.close()
+    await fsm_storage.close()
+    chat_lang.close()
+    timers.close()
+
+
+async def main(webhook: bool = False, shards: int = 0) -> None:
+    if shards:
+        from app.sharding import run_front
+        await run_front(TOKEN, shards, build_dispatcher().resolve_used_update_types())
+        return
+
+    create_app()
+    bot = create_bot()
+    dp = build_dispatcher()
+    background = start_services(bot)
+
+    try:
+        if webhook:
+            from app.webhook import WebhookConfig, run_webhook
+            await run_webhook(dp, bot, WebhookConfig.from_env())
+        else:
+            # In case the bot ran in webhook mode before
+            await bot.delete_webhook()
+            await dp.start_polling(bot)
+    finally:
+        await stop_services(background)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Telegram Clue bot")
+    parser.add_argument("--webhook", action="store_true", help="receive updates via webhook instead of long polling")
+    parser.add_argument("--shards", type=int, default=0, help="run N worker processes, routing chats by chat_id")
+    parser.add_argument("--check", action="store_true", help="validate the configuration and exit")
+    args = parser.parse_args()
+
+    # Worker processes (--shards) inherit the environment, .env included
+    from dotenv import load_dotenv
+    load_dotenv()
+    TOKEN = os.getenv("BOT_TOKEN")
+
+    problems = check_config(webhook=args.webhook, shards=args.shards)
+    for problem in problems:
+        print("Config:", problem)
+    if problems:
+        raise SystemExit(1)
+    if args.check:
+        print("Config OK")
+        raise SystemExit(0)
+
+    asyncio.run(main(webhook=args.webhook, shards=args.shards))
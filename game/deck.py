@@ -0,0 +1,98 @@
+import random
+from array import array
+from dataclasses import dataclass
+from itertools import product
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+# Cards are small integers; a set of cards is an int bitmask (bit n = card n).
+SUSPECTS = ("Scarlett", "Mustard", "White", "Green", "Peacock", "Plum")
+ITEMS = ("Candlestick", "Knife", "Lead Pipe", "Revolver", "Rope", "Wrench")
+LOCATIONS = (
+    "Kitchen", "Ballroom", "Conservatory", "Dining Room", "Billiard Room",
+    "Library", "Lounge", "Hall", "Study",
+)
+
+CARD_NAMES = SUSPECTS + ITEMS + LOCATIONS
+CARD_COUNT = len(CARD_NAMES)
+
+SUSPECT_IDS = range(0, len(SUSPECTS))
+ITEM_IDS = range(len(SUSPECTS), len(SUSPECTS) + len(ITEMS))
+LOCATION_IDS = range(len(SUSPECTS) + len(ITEMS), CARD_COUNT)
+
+ALL_CARDS = (1 << CARD_COUNT) - 1
+
+# Every possible Case File (suspect, item, location) in a flat table, and for
+# each one the remaining 18 cards ready to be shuffled.
+CASE_FILES: Tuple[Tuple[int, int, int], ...] = tuple(product(SUSPECT_IDS, ITEM_IDS, LOCATION_IDS))
+_REST_DECKS: Tuple[bytes, ...] = tuple(
+    bytes(c for c in range(CARD_COUNT) if c not in case) for case in CASE_FILES
+)
+_CASE_MASKS = array("L", ((1 << s) | (1 << i) | (1 << l) for s, i, l in CASE_FILES))
+
+
+@dataclass(frozen=True, slots=True)
+class Deal:
+    case_file: int              # mask of the three hidden cards
+    hands: Tuple[int, ...]      # mask of each seat's cards, in seat order
+
+    def case_cards(self) -> List[int]:
+        return cards_of(self.case_file)
+
+
+def mask_of(cards: Sequence[int]) -> int:
+    mask = 0
+    for card in cards:
+        mask |= 1 << card
+    return mask
+
+
+def cards_of(mask: int) -> List[int]:
+    cards = []
+    while mask:
+        low = mask & -mask
+        cards.append(low.bit_length() - 1)
+        mask ^= low
+    return cards
+
+
+def holds_any(hand: int, cards: int) -> bool:
+    return hand & cards != 0
+
+
+def card_name(card: int) -> str:
+    return CARD_NAMES[card]
+
+
+def deal(players: int, rng: Optional[random.Random] = None) -> Deal:
+    """
+    Pick the Case File and deal the other cards round-robin.
+
+    The shuffle (Fisher–Yates) and the deal happen in the same pass over a
+    byte array, so no objects are created per card.
+    """
+    if players < 1:
+        raise ValueError("At least one player is required to deal.")
+    rand = (rng or random).random
+
+    case = int(rand() * len(CASE_FILES))
+    deck = bytearray(_REST_DECKS[case])
+    hands = [0] * players
+
+    seat = 0
+    for i in range(len(deck) - 1, -1, -1):
+        j = int(rand() * (i + 1))
+        card = deck[j]
+        deck[j] = deck[i]
+        hands[seat] |= 1 << card
+        seat += 1
+        if seat == players:
+            seat = 0
+
+    return Deal(case_file=_CASE_MASKS[case], hands=tuple(hands))
+
+
+def deal_many(count: int, players: int, seed: Optional[int] = None) -> Iterator[Deal]:
+    """Deal `count` games from one seeded stream (reproducible for a seed)."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield deal(players, rng)
@@ -0,0 +1,76 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Union
+
+from .player import Player
+from .session import GameSession, SessionState
+
+# Everything that can happen to a session, in the order it happened. Replaying
+# the events of a session from the start rebuilds it exactly.
+
+
+@dataclass(frozen=True, slots=True)
+class SessionOpened:
+    code: str
+    chat_id: int
+    owner_id: int
+    created_at: datetime
+    min_players: int
+    max_players: int
+
+
+@dataclass(frozen=True, slots=True)
+class PlayerJoined:
+    code: str
+    player: Player
+
+
+@dataclass(frozen=True, slots=True)
+class StateChanged:
+    code: str
+    state: SessionState
+
+
+@dataclass(frozen=True, slots=True)
+class SessionClosed:
+    code: str  # dropped from storage (replaced, expired, ...)
+
+
+Event = Union[SessionOpened, PlayerJoined, StateChanged, SessionClosed]
+
+
+def apply(sessions: Dict[str, GameSession], event: Event) -> None:
+    """Apply one event to `sessions` (code -> session)."""
+    if isinstance(event, SessionOpened):
+        sessions[event.code] = GameSession(
+            code=event.code,
+            chat_id=event.chat_id,
+            owner_id=event.owner_id,
+            created_at=event.created_at,
+            min_players=event.min_players,
+            max_players=event.max_players,
+        )
+        return
+
+    session = sessions.get(event.code)
+    if session is None:
+        return  # closed earlier in the journal
+
+    if isinstance(event, PlayerJoined):
+        session.restore_player(event.player)
+    elif isinstance(event, StateChanged):
+        session.state = event.state
+    elif isinstance(event, SessionClosed):
+        del sessions[event.code]
+
+
+def events_of(session: GameSession) -> List[Event]:
+    """Shortest list of events that rebuilds `session` (used for snapshots)."""
+    events: List[Event] = [SessionOpened(
+        session.code, session.chat_id, session.owner_id,
+        session.created_at, session.min_players, session.max_players,
+    )]
+    events.extend(PlayerJoined(session.code, p) for p in session.players)
+    if session.state != SessionState.LOBBY:
+        events.append(StateChanged(session.code, session.state))
+    return events
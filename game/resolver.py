@@ -0,0 +1,47 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Sequence, Tuple
+
+from .deck import ITEM_IDS, LOCATION_IDS, SUSPECT_IDS
+
+# Seats are indexes into GameSession.players; "clockwise" is join order.
+
+
+@dataclass(frozen=True, slots=True)
+class Refutation:
+    refuter: Optional[int]  # seat that has to show a card, None if nobody can
+    cards: int = 0          # mask of the suggested cards that seat holds
+
+
+NO_REFUTATION = Refutation(None)
+
+
+@lru_cache(maxsize=None)
+def seat_order(players: int) -> Tuple[Tuple[int, ...], ...]:
+    """For each seat, the other seats clockwise starting from its left."""
+    return tuple(
+        tuple((seat + step) % players for step in range(1, players))
+        for seat in range(players)
+    )
+
+
+def suggestion_mask(suspect: int, item: int, location: int) -> int:
+    if suspect not in SUSPECT_IDS or item not in ITEM_IDS or location not in LOCATION_IDS:
+        raise ValueError("A suggestion names one suspect, one item and one location.")
+    return (1 << suspect) | (1 << item) | (1 << location)
+
+
+def resolve_suggestion(hands: Sequence[int], suggester: int, suggestion: int) -> Refutation:
+    """
+    Walk clockwise from the suggester and stop at the first player holding
+    any suggested card. That player chooses which of `cards` to show.
+    """
+    for seat in seat_order(len(hands))[suggester]:
+        shown = hands[seat] & suggestion
+        if shown:
+            return Refutation(seat, shown)
+    return NO_REFUTATION
+
+
+def check_accusation(case_file: int, accusation: int) -> bool:
+    return case_file == accusation
@@ -1,7 +1,7 @@
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from .player import Player
 from .errors import (
@@ -25,7 +25,7 @@ def normalize_username(username: Optional[str], user_id: int) -> str:
     return f"user_{user_id}"
 
 
-@dataclass
+@dataclass(slots=True)
 class GameSession:
     code: str
     chat_id: int
@@ -38,11 +38,23 @@ class GameSession:
     min_players: int = 3
     max_players: int = 6
 
+    # telegram_id -> Player, kept in sync with `players` (which keeps join order)
+    _index: Dict[int, Player] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self._index = {p.telegram_id: p for p in self.players}
+
+    def has_player(self, telegram_id: int) -> bool:
+        return telegram_id in self._index
+
+    def get_player(self, telegram_id: int) -> Optional[Player]:
+        return self._index.get(telegram_id)
+
     def add_player(self, telegram_id: int, username: Optional[str]) -> Player:
         if self.state != SessionState.LOBBY:
             raise SessionAlreadyStarted("The game has already started. You cannot join now.")
 
-        if any(p.telegram_id == telegram_id for p in self.players):
+        if telegram_id in self._index:
             raise PlayerAlreadyJoined("You are already in the lobby.")
 
         if len(self.players) >= self.max_players:
@@ -54,8 +66,14 @@ class GameSession:
             joined_at=datetime.utcnow(),
         )
         self.players.append(player)
+        self._index[telegram_id] = player
         return player
 
+    def restore_player(self, player: Player) -> None:
+        """Put back a player recorded earlier (replay); the lobby rules were checked then."""
+        self.players.append(player)
+        self._index[player.telegram_id] = player
+
     def start(self, requester_id: int) -> None:
         if requester_id != self.owner_id:
             raise NotOwner("Only the lobby owner can start the game.")
@@ -0,0 +1,165 @@
+import argparse
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence, Tuple, Type
+
+from .deck import deal
+from .resolver import check_accusation, resolve_suggestion
+from .strategies import STRATEGIES, Strategy
+
+# Headless Clue: plays whole games between computer players, without
+# Telegram, to compare strategies and try out table sizes.
+#
+#   python -m game.simulator --games 100000 --players 4 --strategies deductive,naive,random
+
+
+@dataclass
+class SimulationResult:
+    games: int = 0
+    turns: int = 0
+    draws: int = 0
+    wins: Counter = field(default_factory=Counter)    # strategy -> games won
+    played: Counter = field(default_factory=Counter)  # strategy -> seats taken
+    seconds: float = 0.0
+    workers: int = 1
+
+    def merge(self, other: "SimulationResult") -> None:
+        self.games += other.games
+        self.turns += other.turns
+        self.draws += other.draws
+        self.wins.update(other.wins)
+        self.played.update(other.played)
+
+    @property
+    def games_per_sec(self) -> float:
+        return self.games / self.seconds if self.seconds else 0.0
+
+    def win_rate(self, strategy: str) -> float:
+        played = self.played[strategy]
+        return self.wins[strategy] / played if played else 0.0
+
+
+def play(strategies: Sequence[Type[Strategy]], rng: random.Random, max_rounds: int = 200) -> Tuple[Optional[int], int]:
+    """
+    Play one game, one strategy per seat. Returns the winning seat (None if
+    nobody won) and the number of turns taken.
+    """
+    players = len(strategies)
+    game = deal(players, rng)
+    sizes = [hand.bit_count() for hand in game.hands]
+    seats = [cls(seat, game.hands[seat], sizes, rng) for seat, cls in enumerate(strategies)]
+    out = [False] * players
+
+    turns = 0
+    for _ in range(max_rounds):
+        for seat, player in enumerate(seats):
+            if out[seat]:
+                continue
+            turns += 1
+
+            accusation = player.accusation()
+            if accusation is not None:
+                if check_accusation(game.case_file, accusation):
+                    return seat, turns
+                out[seat] = True  # still shows cards, but takes no more turns
+                if all(out):
+                    return None, turns
+                continue
+
+            suggestion = player.suggest()
+            refutation = resolve_suggestion(game.hands, seat, suggestion)
+            refuter = refutation.refuter
+            shown = seats[refuter].show(seat, refutation.cards) if refuter is not None else 0
+            for other in seats:
+                other.observe(seat, suggestion, refuter, shown if other.seat in (seat, refuter) else 0)
+    return None, turns
+
+
+def run_chunk(names: Sequence[str], players: int, count: int, seed: int, first: int = 0) -> SimulationResult:
+    """
+    Play `count` games from one RNG stream. Strategies take turns in the
+    seats (game i puts names[(seat + i) % len(names)] in each seat), so no
+    strategy keeps the first-move advantage.
+    """
+    rng = random.Random(seed)
+    classes = [STRATEGIES[name] for name in names]
+    result = SimulationResult()
+    for i in range(first, first + count):
+        lineup = [classes[(seat + i) % len(classes)] for seat in range(players)]
+        winner, turns = play(lineup, rng)
+        result.games += 1
+        result.turns += turns
+        result.played.update(cls.name for cls in lineup)
+        if winner is None:
+            result.draws += 1
+        else:
+            result.wins[lineup[winner].name] += 1
+    return result
+
+
+def simulate(
+    games: int,
+    players: int,
+    names: Sequence[str],
+    seed: int = 0,
+    workers: Optional[int] = None,
+    chunk: int = 250,
+) -> SimulationResult:
+    """
+    Play `games` games in chunks of `chunk`, spread over `workers` processes
+    (all cores by default; 1 runs everything in this process). Each chunk has
+    its own RNG stream derived from `seed`, so a run is reproducible for a
+    seed and chunk size whatever the number of workers.
+    """
+    if players < 2:
+        raise ValueError("At least two players are required.")
+    for name in names:
+        if name not in STRATEGIES:
+            raise ValueError(f"Unknown strategy {name!r}; choose from {', '.join(STRATEGIES)}")
+
+    workers = workers or os.cpu_count() or 1
+    jobs = [
+        (names, players, min(chunk, games - first), (seed << 32) ^ index, first)
+        for index, first in enumerate(range(0, games, chunk))
+    ]
+
+    total = SimulationResult(workers=workers)
+    started = time.perf_counter()
+    if workers == 1:
+        for job in jobs:
+            total.merge(run_chunk(*job))
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            for result in pool.map(run_chunk, *zip(*jobs)):
+                total.merge(result)
+    total.seconds = time.perf_counter() - started
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simulate Clue games between computer players")
+    parser.add_argument("--games", type=int, default=10_000)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--strategies", default="deductive,naive,random",
+                        help=f"comma-separated, from: {', '.join(STRATEGIES)}")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=0, help="processes (default: all cores)")
+    parser.add_argument("--chunk", type=int, default=250, help="games per task")
+    args = parser.parse_args()
+
+    names: List[str] = [name.strip() for name in args.strategies.split(",") if name.strip()]
+    result = simulate(args.games, args.players, names, args.seed, args.workers or None, args.chunk)
+
+    print(f"{result.games} games in {result.seconds:.2f}s on {result.workers} workers: "
+          f"{result.games_per_sec:.0f} games/s, {result.games_per_sec / result.workers:.0f} per core")
+    print(f"average {result.turns / result.games:.1f} turns, {result.draws} without a winner")
+    for name in dict.fromkeys(names):
+        print(f"  {name:>10}: {result.win_rate(name):6.1%} of seats won ({result.wins[name]} games)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+import random
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence, Tuple, Type
+
+from .deck import ALL_CARDS, ITEM_IDS, LOCATION_IDS, SUSPECT_IDS, cards_of
+from .resolver import seat_order
+
+SUSPECT_MASK = sum(1 << c for c in SUSPECT_IDS)
+ITEM_MASK = sum(1 << c for c in ITEM_IDS)
+LOCATION_MASK = sum(1 << c for c in LOCATION_IDS)
+CATEGORIES = (SUSPECT_MASK, ITEM_MASK, LOCATION_MASK)
+
+
+class Knowledge:
+    """
+    What one player knows about where the cards are, as bitmasks.
+
+    Rows 0..players-1 are seats, the last row is the Case File. `has[row]`
+    holds the cards known to be in that row and `lacks[row]` the cards known
+    not to be. `clauses` are "seat holds at least one of these cards" facts
+    from refutations the player did not get to see. Every new fact is
+    propagated until nothing more follows.
+    """
+
+    __slots__ = ("sizes", "has", "lacks", "clauses", "case")
+
+    def __init__(self, seat: int, hand: int, hand_sizes: Sequence[int]) -> None:
+        self.case = len(hand_sizes)
+        self.sizes = list(hand_sizes) + [len(CATEGORIES)]
+        self.has = [0] * (self.case + 1)
+        self.lacks = [0] * (self.case + 1)
+        self.clauses: List[Tuple[int, int]] = []
+        self.holds(seat, hand)
+        self.lacks[seat] |= ALL_CARDS & ~hand
+        self.propagate()
+
+    def solution(self) -> Optional[int]:
+        """Mask of the Case File once all three cards are known."""
+        case = self.has[self.case]
+        return case if case.bit_count() == len(CATEGORIES) else None
+
+    def unknown(self) -> int:
+        """Cards whose place is not known yet."""
+        placed = 0
+        for cards in self.has:
+            placed |= cards
+        return ALL_CARDS & ~placed
+
+    # -------------------------
+    # Facts
+    # -------------------------
+    def holds(self, row: int, cards: int) -> None:
+        self.has[row] |= cards
+        for other in range(len(self.has)):
+            if other != row:
+                self.lacks[other] |= cards
+
+    def lacks_all(self, row: int, cards: int) -> None:
+        self.lacks[row] |= cards
+
+    def holds_one_of(self, row: int, cards: int) -> None:
+        self.clauses.append((row, cards))
+
+    def propagate(self) -> None:
+        changed = True
+        while changed:
+            changed = False
+            has, lacks = self.has, self.lacks
+
+            for row, size in enumerate(self.sizes):
+                # Full hand known: everything else is lacked, and vice versa
+                if has[row].bit_count() == size and lacks[row] != ALL_CARDS & ~has[row]:
+                    lacks[row] = ALL_CARDS & ~has[row]
+                    changed = True
+                possible = ALL_CARDS & ~lacks[row]
+                if possible.bit_count() == size and has[row] != possible:
+                    self.holds(row, possible)
+                    changed = True
+
+            # The Case File has exactly one card of each category
+            case = self.case
+            for category in CATEGORIES:
+                if has[case] & category:
+                    rest = category & ~has[case]
+                    if rest & ~lacks[case]:
+                        lacks[case] |= rest
+                        changed = True
+                else:
+                    possible = category & ~lacks[case]
+                    if possible.bit_count() == 1:
+                        self.holds(case, possible)
+                        changed = True
+
+            # A card every row but one lacks is in that row
+            for card in cards_of(self.unknown()):
+                bit = 1 << card
+                rows = [row for row in range(len(has)) if not lacks[row] & bit]
+                if len(rows) == 1:
+                    self.holds(rows[0], bit)
+                    changed = True
+
+            clauses = []
+            for row, cards in self.clauses:
+                if cards & has[row]:
+                    continue  # already satisfied
+                cards &= ~lacks[row]
+                if cards.bit_count() == 1:
+                    self.holds(row, cards)
+                    changed = True
+                elif cards:
+                    clauses.append((row, cards))
+            self.clauses = clauses
+
+
+# -------------------------
+# Strategies
+# -------------------------
+class Strategy(ABC):
+    """
+    A computer player. The simulator calls `accusation()` at the start of
+    its turn, then `suggest()` if it does not accuse, `show()` when it has
+    to refute someone, and `observe()` on every suggestion anyone makes.
+    """
+
+    name = "base"
+
+    def __init__(self, seat: int, hand: int, hand_sizes: Sequence[int], rng: random.Random) -> None:
+        self.seat = seat
+        self.hand = hand
+        self.rng = rng
+        self.knowledge = Knowledge(seat, hand, hand_sizes)
+        self._order = seat_order(len(hand_sizes))
+
+    def accusation(self) -> Optional[int]:
+        return self.knowledge.solution()
+
+    @abstractmethod
+    def suggest(self) -> int:
+        """Mask of the suspect, item and location to suggest this turn."""
+
+    def show(self, suggester: int, cards: int) -> int:
+        """Pick one of `cards` (a mask of suggested cards we hold) to show."""
+        return 1 << self.rng.choice(cards_of(cards))
+
+    def observe(self, suggester: int, suggestion: int, refuter: Optional[int], shown: int) -> None:
+        """
+        Someone suggested. `shown` is the card shown if we were the
+        suggester or the refuter, otherwise 0.
+        """
+        k = self.knowledge
+        if shown and suggester == self.seat:
+            k.holds(refuter, shown)
+            k.propagate()
+
+
+class RandomStrategy(Strategy):
+    """Suggests random cards; learns only from cards shown to it."""
+
+    name = "random"
+
+    def suggest(self) -> int:
+        rng = self.rng
+        return sum(1 << rng.choice(cards_of(category)) for category in CATEGORIES)
+
+
+class NaiveStrategy(Strategy):
+    """Suggests cards it has not seen; learns only from cards shown to it."""
+
+    name = "naive"
+
+    def suggest(self) -> int:
+        unknown = self.knowledge.unknown()
+        suggestion = 0
+        for category in CATEGORIES:
+            candidates = cards_of(category & unknown) or cards_of(category & ~self.hand) or cards_of(category)
+            suggestion |= 1 << self.rng.choice(candidates)
+        return suggestion
+
+
+class DeductiveStrategy(NaiveStrategy):
+    """
+    Also learns from everyone else's suggestions: who could not refute and
+    who refuted (without seeing the card). In a solved category it suggests
+    a card from its own hand, so the answer narrows down the others.
+    """
+
+    name = "deductive"
+
+    def suggest(self) -> int:
+        k = self.knowledge
+        unknown = k.unknown()
+        case = k.has[k.case]
+        suggestion = 0
+        for category in CATEGORIES:
+            if case & category and self.hand & category:
+                candidates = cards_of(self.hand & category)
+            else:
+                candidates = cards_of(category & unknown) or cards_of(category & ~self.hand)
+            suggestion |= 1 << self.rng.choice(candidates or cards_of(category))
+        return suggestion
+
+    def observe(self, suggester: int, suggestion: int, refuter: Optional[int], shown: int) -> None:
+        k = self.knowledge
+        for seat in self._order[suggester]:
+            if seat == refuter:
+                break
+            k.lacks_all(seat, suggestion)
+        if refuter is not None and refuter != self.seat:
+            if shown:
+                k.holds(refuter, shown)
+            else:
+                k.holds_one_of(refuter, suggestion)
+        k.propagate()
+
+
+STRATEGIES: Dict[str, Type[Strategy]] = {
+    cls.name: cls for cls in (RandomStrategy, NaiveStrategy, DeductiveStrategy)
+}
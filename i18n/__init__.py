@@ -0,0 +1,95 @@
+from string import Formatter
+from types import MappingProxyType
+from typing import Dict, Mapping
+
+from game.errors import GameError
+from .texts import TR
+
+DEFAULT_LANG = "en"
+LANGUAGES = tuple(TR)
+
+# Fix for Hebrew (RTL) when showing LTR commands like "/join ABCD"
+LRM = "\u200E"  # Left-to-Right Mark (invisible)
+
+_formatter = Formatter()
+
+
+class Template(str):
+    """A catalog text that still has fields to fill in with str.format."""
+
+    __slots__ = ()
+
+
+def lrm_for(lang: str) -> str:
+    # Apply LRM only for Hebrew (RTL). For EN/RU leave empty.
+    return LRM if lang == "he" else ""
+
+
+def compile_text(text: str, lang: str) -> str:
+    """
+    Fill in everything that only depends on the language ({lrm}) once.
+    Returns a plain str if nothing is left to format, otherwise a Template.
+    """
+    static = []
+    template = []
+    dynamic = False
+    for literal, field, spec, conversion in _formatter.parse(text):
+        static.append(literal)
+        template.append(literal.replace("{", "{{").replace("}", "}}"))
+        if field is None:
+            continue
+        if field == "lrm":
+            static.append(lrm_for(lang))
+            template.append(lrm_for(lang))
+            continue
+        dynamic = True
+        template.append(
+            "{" + field + (f"!{conversion}" if conversion else "") + (f":{spec}" if spec else "") + "}"
+        )
+    if dynamic:
+        return Template("".join(template))
+    return "".join(static)
+
+
+def compile_catalog(lang: str) -> Mapping[str, str]:
+    # Missing keys fall back to English, resolved here instead of on every call
+    texts = {**TR[DEFAULT_LANG], **TR[lang]}
+    return MappingProxyType({key: compile_text(text, lang) for key, text in texts.items()})
+
+
+# Compiled on first use, so a process only pays for the languages its chats use
+CATALOGS: Dict[str, Mapping[str, str]] = {}
+
+
+def catalog(lang: str) -> Mapping[str, str]:
+    try:
+        return CATALOGS[lang]
+    except KeyError:
+        pass
+    if lang not in TR:
+        return catalog(DEFAULT_LANG)
+    compiled = CATALOGS[lang] = compile_catalog(lang)
+    return compiled
+
+
+def t(lang: str, key: str, **kwargs) -> str:
+    text = catalog(lang).get(key, key)
+    if type(text) is Template:
+        return text.format_map(kwargs)
+    return text
+
+
+def _error_keys() -> Dict[type, str]:
+    keys = {}
+    pending = [GameError]
+    while pending:
+        cls = pending.pop()
+        key = f"err_{cls.__name__}"
+        if key in TR[DEFAULT_LANG]:
+            keys[cls] = key
+        pending.extend(cls.__subclasses__())
+    return keys
+
+
+# Game error class -> translation key (see translate_error in bot.py)
+ERROR_KEYS: Dict[type, str] = _error_keys()
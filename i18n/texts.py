@@ -0,0 +1,261 @@
+# Translations: language -> key -> text.
+# Texts may use str.format fields; {lrm} is filled in per language.
+TR = {
+    "en": {
+        "menu_title": "Control menu:",
+        "btn_newgame": "🎲 New game",
+        "btn_join": "➕ Join",
+        "btn_players": "👥 Players",
+        "btn_start": "🚀 Start",
+        "btn_status": "ℹ️ Status",
+        "btn_help": "❓ Help",
+        "btn_languages": "🌐 Languages",
+        "btn_back": "⬅️ Back",
+
+        "only_group_cmd": "This command works only in group chats.",
+        "join_only_group": "Join works only in group chats.",
+        "send_join_code": "Send the join code (example: <code>{lrm}A1B2</code>).",
+
+        "game_created": (
+            "🎲 <b>Game created!</b>\n"
+            "Code: <b>{code}</b>\n\n"
+            "To join: <code>{lrm}/join {code}</code>\n"
+            "Or press <b>Join</b> in the menu."
+        ),
+        "joined": "✅ {username} joined the lobby.",
+        "code_other_group": "This code belongs to another group chat.",
+
+        "status": "Status: <b>{state}</b>\nCode: <b>{code}</b>\nPlayers: {count}/{max}",
+        "players_header": "Players ({count}/{max}):",
+
+        "help": (
+            "<b>How to use the bot</b>\n\n"
+            "✅ <b>Create lobby</b>: <code>{lrm}/newgame</code> (group chat only)\n"
+            "➕ <b>Join lobby</b>: <code>{lrm}/join CODE</code> (or press <b>Join</b>)\n"
+            "👥 <b>Players</b>: <code>{lrm}/players</code>\n"
+            "🚀 <b>Start</b>: <code>{lrm}/start</code> (owner only)\n\n"
+            "<i>Tip:</i> Use the menu buttons to avoid typing commands."
+        ),
+
+        "lang_choose": "<b>Select language</b>:",
+        "lang_set_en": "✅ Language set to English.",
+        "lang_set_ru": "✅ Language set to Russian.",
+        "lang_set_he": "✅ Language set to Hebrew.",
+
+        "game_started": "🚀 The game has started (M1).",
+        "game_autostarted": "🚀 Nobody else joined, so the game has started.",
+        "your_hand": "🃏 <b>Your cards</b> (game <code>{lrm}{code}</code>):\n{cards}",
+        "hands_unreachable": (
+            "✉️ I could not send the cards to {players}. "
+            "Open a private chat with me and press Start to get them."
+        ),
+
+        "card_scarlett": "Scarlett",
+        "card_mustard": "Mustard",
+        "card_white": "White",
+        "card_green": "Green",
+        "card_peacock": "Peacock",
+        "card_plum": "Plum",
+
+        "card_candlestick": "Candlestick",
+        "card_knife": "Knife",
+        "card_lead_pipe": "Lead Pipe",
+        "card_revolver": "Revolver",
+        "card_rope": "Rope",
+        "card_wrench": "Wrench",
+
+        "card_kitchen": "Kitchen",
+        "card_ballroom": "Ballroom",
+        "card_conservatory": "Conservatory",
+        "card_dining_room": "Dining Room",
+        "card_billiard_room": "Billiard Room",
+        "card_library": "Library",
+        "card_lounge": "Lounge",
+        "card_hall": "Hall",
+        "card_study": "Study",
+
+        "err_SessionNotFound": "No active lobby. Use /newgame.",
+        "err_PlayerAlreadyJoined": "You are already in the lobby.",
+        "err_SessionAlreadyStarted": "The game has already started.",
+        "err_SessionFull": "The lobby is full.",
+        "err_NotEnoughPlayers": "Not enough players to start.",
+        "err_NotOwner": "Only the lobby owner can start the game.",
+        "err_default": "Something went wrong.",
+
+        "profile_started": "⏱ Profiling the bot for {seconds} s…",
+        "profile_busy": "⏱ A profile is already running.",
+        "profile_done": "⏱ Profile saved to <code>{path}</code> ({samples} samples). Busiest:\n{top}",
+    },
+
+    "ru": {
+        "menu_title": "Меню управления:",
+        "btn_newgame": "🎲 Новая игра",
+        "btn_join": "➕ Вступить",
+        "btn_players": "👥 Игроки",
+        "btn_start": "🚀 Старт",
+        "btn_status": "ℹ️ Статус",
+        "btn_help": "❓ Помощь",
+        "btn_languages": "🌐 Язык",
+        "btn_back": "⬅️ Назад",
+
+        "only_group_cmd": "Эта команда работает только в группе.",
+        "join_only_group": "Вступление работает только в группе.",
+        "send_join_code": "Отправь код игры (пример: <code>{lrm}A1B2</code>).",
+
+        "game_created": (
+            "🎲 <b>Игра создана!</b>\n"
+            "Код: <b>{code}</b>\n\n"
+            "Чтобы вступить: <code>{lrm}/join {code}</code>\n"
+            "Или нажми <b>Вступить</b> в меню."
+        ),
+        "joined": "✅ {username} присоединился к лобби.",
+        "code_other_group": "Этот код относится к другой группе.",
+
+        "status": "Статус: <b>{state}</b>\nКод: <b>{code}</b>\nИгроки: {count}/{max}",
+        "players_header": "Игроки ({count}/{max}):",
+
+        "help": (
+            "<b>Как пользоваться ботом</b>\n\n"
+            "✅ <b>Создать лобби</b>: <code>{lrm}/newgame</code> (только в группе)\n"
+            "➕ <b>Вступить</b>: <code>{lrm}/join CODE</code> (или кнопка <b>Вступить</b>)\n"
+            "👥 <b>Игроки</b>: <code>{lrm}/players</code>\n"
+            "🚀 <b>Старт</b>: <code>{lrm}/start</code> (только создатель)\n\n"
+            "<i>Совет:</i> используй кнопки меню, чтобы не вводить команды."
+        ),
+
+        "lang_choose": "<b>Выбери язык</b>:",
+        "lang_set_en": "✅ Язык переключен на English.",
+        "lang_set_ru": "✅ Язык переключен на Русский.",
+        "lang_set_he": "✅ Язык переключен на עברית.",
+
+        "game_started": "🚀 Игра началась (M1).",
+        "game_autostarted": "🚀 Больше никто не присоединился, игра началась.",
+        "your_hand": "🃏 <b>Твои карты</b> (игра <code>{lrm}{code}</code>):\n{cards}",
+        "hands_unreachable": (
+            "✉️ Не удалось отправить карты: {players}. "
+            "Открой личный чат со мной и нажми Start, чтобы их получить."
+        ),
+
+        "card_scarlett": "Скарлет",
+        "card_mustard": "Мастард",
+        "card_white": "Уайт",
+        "card_green": "Грин",
+        "card_peacock": "Пикок",
+        "card_plum": "Плам",
+
+        "card_candlestick": "Подсвечник",
+        "card_knife": "Нож",
+        "card_lead_pipe": "Свинцовая труба",
+        "card_revolver": "Револьвер",
+        "card_rope": "Верёвка",
+        "card_wrench": "Гаечный ключ",
+
+        "card_kitchen": "Кухня",
+        "card_ballroom": "Бальный зал",
+        "card_conservatory": "Оранжерея",
+        "card_dining_room": "Столовая",
+        "card_billiard_room": "Бильярдная",
+        "card_library": "Библиотека",
+        "card_lounge": "Гостиная",
+        "card_hall": "Холл",
+        "card_study": "Кабинет",
+
+        "err_SessionNotFound": "Нет активной игры. Используй /newgame.",
+        "err_PlayerAlreadyJoined": "Ты уже в лобби.",
+        "err_SessionAlreadyStarted": "Игра уже началась.",
+        "err_SessionFull": "Лобби заполнено.",
+        "err_NotEnoughPlayers": "Недостаточно игроков для старта.",
+        "err_NotOwner": "Только создатель игры может начать.",
+        "err_default": "Произошла ошибка.",
+
+        "profile_started": "⏱ Профилирую бота {seconds} с…",
+        "profile_busy": "⏱ Профилирование уже идёт.",
+        "profile_done": "⏱ Профиль сохранён в <code>{path}</code> ({samples} замеров). Самое загруженное:\n{top}",
+    },
+
+    "he": {
+        "menu_title": "תפריט שליטה:",
+        "btn_newgame": "🎲 משחק חדש",
+        "btn_join": "➕ הצטרפות",
+        "btn_players": "👥 שחקנים",
+        "btn_start": "🚀 התחלה",
+        "btn_status": "ℹ️ סטטוס",
+        "btn_help": "❓ עזרה",
+        "btn_languages": "🌐 שפה",
+        "btn_back": "⬅️ חזרה",
+
+        "only_group_cmd": "הפקודה הזו עובדת רק בקבוצות.",
+        "join_only_group": "הצטרפות עובדת רק בקבוצות.",
+        "send_join_code": "שלח את קוד ההצטרפות (לדוגמה: <code>{lrm}A1B2</code>).",
+
+        "game_created": (
+            "🎲 <b>המשחק נוצר!</b>\n"
+            "קוד: <b>{code}</b>\n\n"
+            "כדי להצטרף: <code>{lrm}/join {code}</code>\n"
+            "או לחץ <b>הצטרפות</b> בתפריט."
+        ),
+        "joined": "✅ {username} הצטרף ללובי.",
+        "code_other_group": "הקוד הזה שייך לקבוצה אחרת.",
+
+        "status": "סטטוס: <b>{state}</b>\nקוד: <b>{code}</b>\nשחקנים: {count}/{max}",
+        "players_header": "שחקנים ({count}/{max}):",
+
+        "help": (
+            "<b>איך משתמשים בבוט</b>\n\n"
+            "✅ <b>יצירת לובי</b>: <code>{lrm}/newgame</code> (רק בקבוצה)\n"
+            "➕ <b>הצטרפות</b>: <code>{lrm}/join CODE</code> (או כפתור <b>הצטרפות</b>)\n"
+            "👥 <b>שחקנים</b>: <code>{lrm}/players</code>\n"
+            "🚀 <b>התחלה</b>: <code>{lrm}/start</code> (רק הבעלים)\n\n"
+            "<i>טיפ:</i> השתמש בכפתורים כדי לא להקליד פקודות."
+        ),
+
+        "lang_choose": "<b>בחר שפה</b>:",
+        "lang_set_en": "✅ השפה הוגדרה לאנגלית.",
+        "lang_set_ru": "✅ השפה הוגדרה לרוסית.",
+        "lang_set_he": "✅ השפה הוגדרה לעברית.",
+
+        "game_started": "🚀 המשחק התחיל (M1).",
+        "game_autostarted": "🚀 אף אחד נוסף לא הצטרף, אז המשחק התחיל.",
+        "your_hand": "🃏 <b>הקלפים שלך</b> (משחק <code>{lrm}{code}</code>):\n{cards}",
+        "hands_unreachable": (
+            "✉️ לא הצלחתי לשלוח את הקלפים ל־{players}. "
+            "פתח איתי צ'אט פרטי ולחץ Start כדי לקבל אותם."
+        ),
+
+        "card_scarlett": "סקרלט",
+        "card_mustard": "מאסטרד",
+        "card_white": "ווייט",
+        "card_green": "גרין",
+        "card_peacock": "פיקוק",
+        "card_plum": "פלאם",
+
+        "card_candlestick": "פמוט",
+        "card_knife": "סכין",
+        "card_lead_pipe": "צינור עופרת",
+        "card_revolver": "אקדח",
+        "card_rope": "חבל",
+        "card_wrench": "מפתח ברגים",
+
+        "card_kitchen": "מטבח",
+        "card_ballroom": "אולם נשפים",
+        "card_conservatory": "חממה",
+        "card_dining_room": "חדר אוכל",
+        "card_billiard_room": "חדר ביליארד",
+        "card_library": "ספרייה",
+        "card_lounge": "טרקלין",
+        "card_hall": "אולם כניסה",
+        "card_study": "חדר עבודה",
+
+        "err_SessionNotFound": "אין לובי פעיל. השתמש ב־/newgame.",
+        "err_PlayerAlreadyJoined": "אתה כבר בלובי.",
+        "err_SessionAlreadyStarted": "המשחק כבר התחיל.",
+        "err_SessionFull": "הלובי מלא.",
+        "err_NotEnoughPlayers": "אין מספיק שחקנים כדי להתחיל.",
+        "err_NotOwner": "רק בעל הלובי יכול להתחיל את המשחק.",
+        "err_default": "משהו השתבש.",
+
+        "profile_started": "⏱ מבצע פרופיילינג לבוט למשך {seconds} שניות…",
+        "profile_busy": "⏱ פרופיילינג כבר רץ.",
+        "profile_done": "⏱ הפרופיל נשמר ב־<code>{lrm}{path}</code> ({samples} דגימות). הכי עמוס:\n{top}",
+    },
+}
@@ -0,0 +1,40 @@
+from typing import Callable, List, Protocol
+
+from game.session import GameSession
+
+
+class SessionStorage(Protocol):
+    """Interface every session storage backend implements."""
+
+    def create_session(self, chat_id: int, owner_id: int) -> GameSession:
+        ...
+
+    def get_by_chat(self, chat_id: int) -> GameSession:
+        ...
+
+    def get_by_code(self, code: str) -> GameSession:
+        ...
+
+    def save(self, session: GameSession) -> None:
+        """Called by handlers after they mutate a session."""
+        ...
+
+    async def sessions_of_user(self, telegram_id: int) -> List[GameSession]:
+        """Unfinished sessions the user plays in, in any chat."""
+        ...
+
+    async def preload_chat(self, chat_id: int) -> None:
+        """Bring the chat's session into memory so `get_by_chat` needs no I/O."""
+        ...
+
+    async def preload_code(self, code: str) -> None:
+        """Same for `get_by_code`."""
+        ...
+
+    def has_session(self, code: str) -> bool:
+        """Whether the code belongs to a live session, without loading it."""
+        ...
+
+    def on_eviction(self, listener: Callable[[GameSession, str], None]) -> None:
+        """Call `listener(session, reason)` when a session is dropped (replaced, expired, ...)."""
+        ...
@@ -0,0 +1,140 @@
+import random
+import string
+from collections import deque
+from math import gcd
+from typing import Deque, Optional
+
+ALPHABET = string.ascii_uppercase + string.digits
+_INDEX = {c: i for i, c in enumerate(ALPHABET)}
+MAX_CODE_TEXT = 32
+
+# Weights of the check character, all coprime with len(ALPHABET): changing
+# any one character of a code always changes its check character.
+_WEIGHTS = [w for w in range(1, 4 * MAX_CODE_TEXT) if gcd(w, len(ALPHABET)) == 1][:MAX_CODE_TEXT]
+
+
+def check_char(body: str) -> str:
+    return ALPHABET[sum(w * _INDEX[c] for w, c in zip(_WEIGHTS, body)) % len(ALPHABET)]
+
+
+class CodeAllocator:
+    """
+    Hands out unique join codes in O(1).
+
+    Fresh codes come from a keyed Feistel permutation of 0..36**length-1, so
+    they look random but never repeat. Released codes wait in a FIFO queue and
+    are only reused once the fresh ones run out, which keeps an old code from
+    pointing at a new lobby right away. When more than `max_fill` of the
+    codes of the current length are live, the length grows by one.
+
+    Every code ends with a check character (see check_char), so `length`
+    random characters are followed by one that depends on them, and a word
+    typed in the join flow is only taken as a code if that character fits.
+
+    An optional `prefix` is put in front of every code. Sharded deployments
+    use it to tell which worker owns a code (see app/sharding.py).
+    """
+
+    ROUNDS = 4
+
+    def __init__(
+        self,
+        length: int = 4,
+        max_fill: float = 0.5,
+        key: Optional[int] = None,
+        prefix: str = "",
+    ) -> None:
+        self.prefix = prefix
+        self.max_fill = max_fill
+        self._key = key if key is not None else random.getrandbits(64)
+        self._released: Deque[str] = deque()
+        self.length = 0  # no previous length yet
+        self._resize(length)
+
+    @property
+    def occupancy(self) -> float:
+        return self.live / self.space
+
+    def allocate(self) -> str:
+        if self.live + 1 > self.space * self.max_fill:
+            self._resize(self.length + 1)
+
+        if self._next < self.space:
+            n = self._permute(self._next)
+            self._next += 1
+            code = self._encode(n)
+        else:
+            code = self._released.popleft()
+
+        self.live += 1
+        return code
+
+    def owns(self, code: str) -> bool:
+        """Whether `code` could have been issued by this allocator."""
+        return code.startswith(self.prefix)
+
+    def looks_like(self, text: Optional[str]) -> bool:
+        """
+        Cheap check used to ignore chatter from users who were asked for a
+        code: the prefix, the current or previous length and a matching check
+        character, in either case. A random word passes one time in 36.
+        """
+        if not text or len(text) > MAX_CODE_TEXT:
+            return False
+        code = text.strip().upper()
+        if not code.startswith(self.prefix):
+            return False
+        body, check = code[len(self.prefix):-1], code[-1:]
+        if not body or len(body) not in (self.length, self.previous_length):
+            return False
+        if not all(c in _INDEX for c in body):
+            return False
+        return check == check_char(body)
+
+    def release(self, code: str) -> None:
+        # Codes from before the last resize are simply retired.
+        if len(code) == len(self.prefix) + self.length + 1:
+            self._released.append(code)
+            # Codes recovered from disk at startup were never counted
+            if self.live:
+                self.live -= 1
+
+    def _resize(self, length: int) -> None:
+        self.previous_length = self.length  # its codes may still be live
+        self.length = length
+        self.space = len(ALPHABET) ** length
+        self.live = 0
+        self._next = 0
+        self._released.clear()
+
+        # Balanced Feistel network over the smallest even bit width that
+        # covers the code space; values past the end are cycle-walked.
+        bits = max(2, self.space.bit_length())
+        bits += bits % 2
+        self._half = bits // 2
+        self._mask = (1 << self._half) - 1
+        rng = random.Random(self._key ^ length)
+        self._round_keys = [rng.getrandbits(32) for _ in range(self.ROUNDS)]
+
+    def _permute(self, n: int) -> int:
+        while True:
+            n = self._feistel(n)
+            if n < self.space:
+                return n
+
+    def _feistel(self, n: int) -> int:
+        half, mask = self._half, self._mask
+        left, right = n >> half, n & mask
+        for k in self._round_keys:
+            f = ((right ^ k) * 0x9E3779B1) & 0xFFFFFFFF
+            f ^= f >> 15
+            left, right = right, left ^ (f & mask)
+        return (left << half) | right
+
+    def _encode(self, n: int) -> str:
+        chars = []
+        for _ in range(self.length):
+            n, i = divmod(n, len(ALPHABET))
+            chars.append(ALPHABET[i])
+        body = "".join(chars)
+        return self.prefix + body + check_char(body)
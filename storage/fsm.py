@@ -0,0 +1,300 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fsm (
+    bot_id      INTEGER NOT NULL,
+    chat_id     INTEGER NOT NULL,
+    user_id     INTEGER NOT NULL,
+    thread_id   INTEGER,
+    business_id TEXT,
+    destiny     TEXT NOT NULL,
+    state       TEXT,
+    data        TEXT NOT NULL,
+    expires_at  REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS fsm_key ON fsm (
+    bot_id, chat_id, user_id, IFNULL(thread_id, 0), IFNULL(business_id, ''), destiny
+);
+"""
+
+Key = Tuple[int, int, int, Optional[int], Optional[str], str]
+
+
+class _Record:
+    __slots__ = ("state", "data", "expires_at")
+
+    def __init__(self, state: Optional[str], data: Dict[str, Any], expires_at: float) -> None:
+        self.state = state
+        self.data = data
+        self.expires_at = expires_at
+
+
+def _key(key: StorageKey) -> Key:
+    return (
+        key.bot_id, key.chat_id, key.user_id, key.thread_id,
+        getattr(key, "business_connection_id", None), key.destiny,
+    )
+
+
+class FSMStorage(BaseStorage):
+    """
+    aiogram FSM storage where every state expires `ttl` seconds after it was
+    last set, so users who open the join flow and walk away are forgotten.
+
+    Live records are kept in an LRU cache of at most `max_cached` entries, so
+    `get_state` is a dict lookup. With a `path`, records are also written to
+    SQLite in the background and survive restarts; records pushed out of the
+    cache are read back from disk on demand, in a thread. Without a path,
+    records pushed out of the cache are dropped.
+
+    Records are also counted per chat. aiogram looks the state up for every
+    message, and in a chat where nobody is in the middle of a flow that
+    lookup returns right away, without touching the cache or the disk.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: float = 15 * 60,
+        max_cached: int = 10_000,
+        flush_interval: float = 1.0,
+        sweep_interval: float = 60.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.ttl = ttl
+        self.max_cached = max_cached
+        self.flush_interval = flush_interval
+        self.sweep_interval = sweep_interval
+        self.clock = clock
+        self._last_sweep = clock()
+
+        self._cache: "OrderedDict[Key, _Record]" = OrderedDict()
+        self._dirty: Dict[Key, Optional[_Record]] = {}  # None = delete
+        self._writing: Dict[Key, Optional[_Record]] = {}  # the batch being committed
+        self._on_disk: Dict[Key, float] = {}  # uncached keys on disk -> expires_at
+        self._chats: Counter = Counter()  # chat_id -> records in _cache + _on_disk
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+            # Only keys are loaded at startup; states and data are read on first use
+            for *key, expires_at in self._conn.execute(
+                "SELECT bot_id, chat_id, user_id, thread_id, business_id, destiny, expires_at "
+                "FROM fsm WHERE expires_at > ?", (clock(),)
+            ):
+                self._on_disk[tuple(key)] = expires_at
+                self._chats[key[1]] += 1
+
+    @property
+    def live_records(self) -> int:
+        return len(self._cache) + len(self._on_disk)
+
+    # -------------------------
+    # BaseStorage
+    # -------------------------
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state = state.state if isinstance(state, State) else state
+        k = _key(key)
+        record = await self._get(k)
+        if record is None:
+            if state is None:
+                return
+            record = _Record(None, {}, 0.0)
+        record.state = state
+        self._put(k, record)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        record = await self._get(_key(key))
+        return record.state if record else None
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        k = _key(key)
+        record = await self._get(k)
+        if record is None:
+            if not data:
+                return
+            record = _Record(None, {}, 0.0)
+        record.data = dict(data)
+        self._put(k, record)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        record = await self._get(_key(key))
+        return dict(record.data) if record else {}
+
+    async def close(self) -> None:
+        # Called by the dispatcher on shutdown and by stop_services; only the first call counts
+        self.flush()
+        if self._conn:
+            with self._db_lock:
+                self._conn.close()
+            self._conn = None
+
+    # -------------------------
+    # Cache
+    # -------------------------
+    async def _get(self, k: Key) -> Optional[_Record]:
+        if k[1] not in self._chats:
+            return None
+        record = self._cache.get(k)
+        if record is not None:
+            self._cache.move_to_end(k)
+        else:
+            if k not in self._on_disk:
+                return None
+            record = await self._load(k)
+            if record is None:
+                return None
+
+        if record.expires_at <= self.clock():
+            self._delete(k)
+            return None
+        return record
+
+    async def _load(self, k: Key) -> Optional[_Record]:
+        """Bring back a record pushed out of the cache."""
+        while True:
+            # Not committed yet: the queued change is the newest
+            if k in self._dirty:
+                record = self._dirty[k]
+                break
+            if k in self._writing:
+                record = self._writing[k]
+                break
+            record = await asyncio.to_thread(self._read, k)
+            if k not in self._on_disk:
+                return self._cache.get(k)  # set, deleted or brought back while reading
+            if k not in self._dirty and k not in self._writing:
+                break  # otherwise changed and pushed out again while reading
+
+        if record is None:
+            self._delete(k)
+            return None
+        del self._on_disk[k]
+        self._cache[k] = record
+        self._trim()
+        return record
+
+    def _put(self, k: Key, record: _Record) -> None:
+        if record.state is None and not record.data:
+            self._delete(k)
+            return
+        record.expires_at = self.clock() + self.ttl
+        if k not in self._cache and self._on_disk.pop(k, None) is None:
+            self._chats[k[1]] += 1
+        self._cache[k] = record
+        self._cache.move_to_end(k)
+        if self._conn:
+            self._dirty[k] = record
+        self._trim()
+
+    def _delete(self, k: Key) -> None:
+        if self._cache.pop(k, None) is not None or self._on_disk.pop(k, None) is not None:
+            self._forget_chat(k[1])
+        if self._conn:
+            self._dirty[k] = None
+        else:
+            self._dirty.pop(k, None)
+
+    def _trim(self) -> None:
+        while len(self._cache) > self.max_cached:
+            k, record = self._cache.popitem(last=False)
+            if self._conn:
+                # Still on disk (or about to be, if dirty); read back on demand
+                self._on_disk[k] = record.expires_at
+            else:
+                self._forget_chat(k[1])
+
+    def _forget_chat(self, chat_id: int) -> None:
+        self._chats[chat_id] -= 1
+        if not self._chats[chat_id]:
+            del self._chats[chat_id]
+
+    # -------------------------
+    # Expiry + write-behind
+    # -------------------------
+    def sweep(self) -> int:
+        """Forget expired records. Returns how many were removed."""
+        now = self._last_sweep = self.clock()
+        expired = [k for k, r in self._cache.items() if r.expires_at <= now]
+        expired += [k for k, expires_at in self._on_disk.items() if expires_at <= now]
+        for k in expired:
+            self._delete(k)
+        return len(expired)
+
+    async def run_writer(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if self.clock() - self._last_sweep >= self.sweep_interval:
+                self.sweep()
+            if self._conn is None or not self._dirty:
+                continue
+            batch, self._dirty = self._dirty, {}
+            rows, deletes = self._rows(batch)
+            # Keys pushed out of the cache are read from here until the commit
+            self._writing = batch
+            try:
+                await asyncio.to_thread(self._write, rows, deletes)
+            except sqlite3.Error:
+                logger.exception("Failed to write %d FSM records, will retry", len(batch))
+                for k, record in batch.items():
+                    self._dirty.setdefault(k, record)
+            finally:
+                self._writing = {}
+
+    def flush(self) -> None:
+        if self._conn is None or not self._dirty:
+            return
+        batch, self._dirty = self._dirty, {}
+        self._write(*self._rows(batch))
+
+    def _rows(self, batch: Dict[Key, Optional[_Record]]) -> Tuple[List[tuple], List[Key]]:
+        rows = []
+        deletes = []
+        for k, record in batch.items():
+            deletes.append(k)  # upsert = delete + insert (NULLs in the key)
+            if record is not None:
+                rows.append((*k, record.state, json.dumps(record.data), record.expires_at))
+        return rows, deletes
+
+    def _write(self, rows: List[tuple], deletes: List[Key]) -> None:
+        with self._db_lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "DELETE FROM fsm WHERE bot_id = ? AND chat_id = ? AND user_id = ? "
+                    "AND thread_id IS ? AND business_id IS ? AND destiny = ?",
+                    deletes,
+                )
+                self._conn.executemany("INSERT INTO fsm VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                self._conn.execute("DELETE FROM fsm WHERE expires_at <= ?", (self.clock(),))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _read(self, k: Key) -> Optional[_Record]:
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT state, data, expires_at FROM fsm WHERE bot_id = ? AND chat_id = ? AND user_id = ? "
+                "AND thread_id IS ? AND business_id IS ? AND destiny = ?",
+                k,
+            ).fetchone()
+        if row is None:
+            return None
+        state, data, expires_at = row
+        return _Record(state, json.loads(data), expires_at)
@@ -0,0 +1,105 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from game.session import GameSession, SessionState
+
+
+class SessionIndex:
+    """
+    Secondary indexes over the sessions a storage holds in memory:
+
+    - users:  telegram_id -> sessions the user plays in
+    - chats:  chat_id -> its sessions
+    - states: state -> sessions in that state
+
+    Each maps to a code -> session dict, so adding, removing and looking up
+    are all dict operations. `update()` is called after every change to a
+    session; players are only ever appended, so it only indexes the players
+    and state that changed since the last call.
+    """
+
+    def __init__(self) -> None:
+        self.users: Dict[int, Dict[str, GameSession]] = {}
+        self.chats: Dict[int, Dict[str, GameSession]] = {}
+        self.states: Dict[SessionState, Dict[str, GameSession]] = {state: {} for state in SessionState}
+        self._indexed: Dict[str, Tuple[int, SessionState]] = {}  # code -> (players, state) as indexed
+
+    def __len__(self) -> int:
+        return len(self._indexed)
+
+    def update(self, session: GameSession) -> None:
+        code = session.code
+        indexed = self._indexed.get(code)
+        if indexed is None:
+            self.chats.setdefault(session.chat_id, {})[code] = session
+            players, state = 0, None
+        else:
+            players, state = indexed
+
+        for player in session.players[players:]:
+            self.users.setdefault(player.telegram_id, {})[code] = session
+        if session.state != state:
+            if state is not None:
+                del self.states[state][code]
+            self.states[session.state][code] = session
+        self._indexed[code] = (len(session.players), session.state)
+
+    def remove(self, session: GameSession) -> None:
+        code = session.code
+        indexed = self._indexed.pop(code, None)
+        if indexed is None:
+            return
+        players, state = indexed
+
+        for player in session.players[:players]:
+            _discard(self.users, player.telegram_id, code)
+        _discard(self.chats, session.chat_id, code)
+        del self.states[state][code]
+
+    def of_user(self, telegram_id: int) -> List[GameSession]:
+        return list(self.users.get(telegram_id, {}).values())
+
+    def in_chat(self, chat_id: int) -> List[GameSession]:
+        return list(self.chats.get(chat_id, {}).values())
+
+    def latest_in_chat(self, chat_id: int) -> Optional[GameSession]:
+        sessions = self.chats.get(chat_id)
+        return max(sessions.values(), key=lambda s: s.created_at) if sessions else None
+
+    def count(self, state: SessionState) -> int:
+        return len(self.states[state])
+
+    # -------------------------
+    # Maintenance
+    # -------------------------
+    def rebuild(self, sessions: Iterable[GameSession]) -> None:
+        self.users.clear()
+        self.chats.clear()
+        for by_state in self.states.values():
+            by_state.clear()
+        self._indexed.clear()
+        for session in sessions:
+            self.update(session)
+
+    def check(self, sessions: Iterable[GameSession]) -> List[str]:
+        """Differences between the indexes and a fresh index of `sessions`."""
+        fresh = SessionIndex()
+        fresh.rebuild(sessions)
+        problems = []
+        for name in ("users", "chats", "states"):
+            ours, theirs = getattr(self, name), getattr(fresh, name)
+            for key in ours.keys() | theirs.keys():
+                have = set(ours.get(key, ()))
+                want = set(theirs.get(key, ()))
+                if have != want:
+                    problems.append(
+                        f"{name}[{key}]: missing {sorted(want - have)}, stale {sorted(have - want)}"
+                    )
+        return problems
+
+
+def _discard(index: Dict[int, Dict[str, GameSession]], key: int, code: str) -> None:
+    sessions = index.get(key)
+    if sessions is not None:
+        sessions.pop(code, None)
+        if not sessions:
+            del index[key]
@@ -0,0 +1,306 @@
+import asyncio
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from game.events import Event, PlayerJoined, SessionClosed, SessionOpened, StateChanged, apply, events_of
+from game.player import Player
+from game.session import GameSession, SessionState
+from storage.codes import CodeAllocator
+from storage.memory import EvictionPolicy, InMemoryStorage
+
+logger = logging.getLogger(__name__)
+
+# A record is: u32 payload length, u32 crc32 of the payload, payload.
+# The payload is a kind byte, the session code (length-prefixed) and the
+# event's fields. A crash can leave a half-written record at the end of the
+# journal; its length or checksum doesn't match and reading stops there.
+HEADER = struct.Struct("<II")
+OPENED, JOINED, STATE, CLOSED = range(1, 5)
+_OPENED = struct.Struct("<qqqBB")  # chat_id, owner_id, created_at, min_players, max_players
+_JOINED = struct.Struct("<qq")     # telegram_id, joined_at; the username follows
+_STATES = tuple(SessionState)
+
+SNAPSHOT_MAGIC = b"CLUESNAP"
+_SNAPSHOT_HEADER = struct.Struct("<8sI")  # magic, generation of the first journal after it
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+Buffer = Union[bytes, mmap.mmap]
+
+
+def encode(event: Event) -> bytes:
+    code = event.code.encode()
+    if isinstance(event, SessionOpened):
+        payload = bytes((OPENED, len(code))) + code + _OPENED.pack(
+            event.chat_id, event.owner_id, (event.created_at - EPOCH) // MICROSECOND,
+            event.min_players, event.max_players,
+        )
+    elif isinstance(event, PlayerJoined):
+        p = event.player
+        payload = bytes((JOINED, len(code))) + code + _JOINED.pack(
+            p.telegram_id, (p.joined_at - EPOCH) // MICROSECOND,
+        ) + p.username.encode()
+    elif isinstance(event, StateChanged):
+        payload = bytes((STATE, len(code))) + code + bytes((_STATES.index(event.state),))
+    else:
+        payload = bytes((CLOSED, len(code))) + code
+    return HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def decode(payload: bytes) -> Event:
+    kind, n = payload[0], payload[1]
+    code = payload[2:2 + n].decode()
+    pos = 2 + n
+    if kind == OPENED:
+        chat_id, owner_id, created_at, min_players, max_players = _OPENED.unpack_from(payload, pos)
+        return SessionOpened(
+            code, chat_id, owner_id, EPOCH + created_at * MICROSECOND, min_players, max_players,
+        )
+    if kind == JOINED:
+        telegram_id, joined_at = _JOINED.unpack_from(payload, pos)
+        username = payload[pos + _JOINED.size:].decode()
+        return PlayerJoined(code, Player(telegram_id, username, EPOCH + joined_at * MICROSECOND))
+    if kind == STATE:
+        return StateChanged(code, _STATES[payload[pos]])
+    if kind == CLOSED:
+        return SessionClosed(code)
+    raise ValueError(f"Unknown journal record kind {kind}")
+
+
+def iter_records(buf: Buffer, start: int = 0) -> Iterator[Tuple[Event, int]]:
+    """
+    Events in `buf` from offset `start`, each with the offset just past it.
+    Stops at the first torn or corrupt record.
+    """
+    pos = start
+    size = len(buf)
+    while pos + HEADER.size <= size:
+        length, crc = HEADER.unpack_from(buf, pos)
+        end = pos + HEADER.size + length
+        if end > size:
+            return
+        payload = buf[pos + HEADER.size:end]
+        if zlib.crc32(payload) != crc:
+            return
+        yield decode(payload), end
+        pos = end
+
+
+def read_journal(path: str, start: int = 0) -> Iterator[Tuple[Event, int]]:
+    """iter_records over a memory-mapped file."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size <= start:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            yield from iter_records(buf, start)
+
+
+def recover(directory: str) -> Tuple[Dict[str, GameSession], int, int]:
+    """
+    Rebuild the live sessions from the snapshot and the journals written
+    after it. Returns the sessions (code -> session, in no particular order),
+    the current journal generation and the length of its valid part.
+    """
+    sessions: Dict[str, GameSession] = {}
+    generation = 0
+
+    snapshot = os.path.join(directory, "snapshot")
+    if os.path.exists(snapshot):
+        with open(snapshot, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            magic, generation = _SNAPSHOT_HEADER.unpack_from(buf, 0)
+            end = _SNAPSHOT_HEADER.size
+            if magic != SNAPSHOT_MAGIC:
+                raise ValueError(f"{snapshot} is not a session snapshot")
+            for event, end in iter_records(buf, end):
+                apply(sessions, event)
+            if end != len(buf):
+                # Snapshots are renamed into place once complete, so this is real damage
+                raise ValueError(f"{snapshot} is corrupt at offset {end}")
+
+    valid = 0
+    for gen in _journal_generations(directory):
+        if gen < generation:
+            continue
+        generation, valid = gen, 0
+        for event, valid in read_journal(_journal_path(directory, gen)):
+            apply(sessions, event)
+    return sessions, generation, valid
+
+
+def _journal_path(directory: str, generation: int) -> str:
+    return os.path.join(directory, f"journal.{generation:08d}")
+
+
+def _journal_generations(directory: str) -> List[int]:
+    return sorted(
+        int(name.partition(".")[2]) for name in os.listdir(directory)
+        if name.startswith("journal.") and name.partition(".")[2].isdigit()
+    )
+
+
+class JournalStorage(InMemoryStorage):
+    """
+    InMemoryStorage that records every change to a session in an append-only
+    journal of events (see game/events.py).
+
+    `save()` compares the session with what was journaled last and appends
+    the difference; `run_writer()` writes the new records every
+    `flush_interval_ms`, off the event loop. Once the journal has grown past
+    `snapshot_bytes`, the live sessions are written to a compact snapshot and
+    a new journal is started, so a restart replays only the journal tail.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        flush_interval_ms: int = 200,
+        snapshot_bytes: int = 16 * 1024 * 1024,
+        fsync: bool = True,
+        policy: Optional[EvictionPolicy] = None,
+        codes: Optional[CodeAllocator] = None,
+    ) -> None:
+        super().__init__(policy, codes=codes)
+        self.directory = directory
+        self.flush_interval = flush_interval_ms / 1000
+        self.snapshot_bytes = snapshot_bytes
+        self.fsync = fsync
+
+        self._pending = bytearray()
+        # code -> (players, state) as of the last journaled event
+        self._journaled: Dict[str, Tuple[int, SessionState]] = {}
+        # The writer thread and shutdown never touch the files at the same time
+        self._io_lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        sessions, self._generation, self._journal_size = recover(directory)
+
+        # Drop a record torn by a crash, or new records would follow garbage
+        path = _journal_path(directory, self._generation)
+        if os.path.exists(path) and os.path.getsize(path) > self._journal_size:
+            logger.warning("Truncating torn record at the end of %s", path)
+            os.truncate(path, self._journal_size)
+        self._file = open(path, "ab", buffering=0)
+
+        # Oldest first, so each chat ends up pointing at its newest session
+        for session in sorted(sessions.values(), key=lambda s: s.created_at):
+            self.by_chat[session.chat_id] = session
+            self._journaled[session.code] = (len(session.players), session.state)
+            self._track(session)
+
+    def save(self, session: GameSession) -> None:
+        super().save(session)
+        code = session.code
+        if self.by_code.get(code) is not session:
+            return  # already dropped; nothing to record
+
+        journaled = self._journaled.get(code)
+        if journaled is None:
+            events = events_of(session)
+        else:
+            players, state = journaled
+            events = [PlayerJoined(code, p) for p in session.players[players:]]
+            if session.state != state:
+                events.append(StateChanged(code, session.state))
+        for event in events:
+            self._pending += encode(event)
+        self._journaled[code] = (len(session.players), session.state)
+
+    def _on_evict(self, session: GameSession, reason: str) -> None:
+        if self._journaled.pop(session.code, None) is not None:
+            self._pending += encode(SessionClosed(session.code))
+        super()._on_evict(session, reason)
+
+    # -------------------------
+    # Writing
+    # -------------------------
+    async def run_writer(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                if self._pending:
+                    data, self._pending = bytes(self._pending), bytearray()
+                    try:
+                        await asyncio.to_thread(self._write, data)
+                    except OSError:
+                        self._pending[:0] = data
+                        raise
+                if self._journal_size >= self.snapshot_bytes:
+                    await self.snapshot()
+            except OSError:
+                logger.exception("Failed to write the session journal, will retry")
+
+    async def snapshot(self) -> None:
+        """Write all live sessions to a new snapshot and start a new journal."""
+        # Encoded on the event loop, so it matches the journal exactly. In the
+        # order the sessions were opened, not the LRU order of by_code.
+        live = sorted(self.by_code.values(), key=lambda s: s.created_at)
+        data = b"".join(encode(e) for s in live for e in events_of(s))
+
+        # Records from before the snapshot go to the old journal; anything
+        # recorded from here on goes to the new one.
+        pending, self._pending = bytes(self._pending), bytearray()
+        if pending:
+            try:
+                await asyncio.to_thread(self._write, pending)
+            except OSError:
+                self._pending[:0] = pending
+                raise
+        await asyncio.to_thread(self._rotate, data)
+
+    def flush(self) -> None:
+        """Write pending records synchronously (used on shutdown)."""
+        if self._pending:
+            data, self._pending = bytes(self._pending), bytearray()
+            self._write(data)
+
+    def close(self) -> None:
+        self.flush()
+        with self._io_lock:
+            self._file.close()
+
+    def _write(self, data: bytes) -> None:
+        with self._io_lock:
+            self._append(data)
+
+    def _append(self, data: bytes) -> None:
+        start = self._journal_size
+        view = memoryview(data)
+        try:
+            while view:
+                view = view[self._file.write(view):]
+            if self.fsync:
+                os.fsync(self._file.fileno())
+        except OSError:
+            # Don't leave a torn record in the middle of the journal
+            self._file.truncate(start)
+            raise
+        self._journal_size = start + len(data)
+
+    def _rotate(self, data: bytes) -> None:
+        with self._io_lock:
+            generation = self._generation + 1
+            new_file = open(_journal_path(self.directory, generation), "ab", buffering=0)
+            self._file.close()
+            self._file = new_file
+            self._generation, self._journal_size = generation, 0
+
+            # A crash before the rename leaves the old snapshot, and every
+            # journal since it, in place.
+            path = os.path.join(self.directory, "snapshot")
+            with open(path + ".tmp", "wb") as f:
+                f.write(_SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, generation))
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + ".tmp", path)
+
+            for gen in _journal_generations(self.directory):
+                if gen < generation:
+                    os.remove(_journal_path(self.directory, gen))
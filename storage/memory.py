@@ -1,39 +1,237 @@
-import random
-import string
-from typing import Dict
+import asyncio
+import heapq
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
 
-from game.session import GameSession
+from game.session import GameSession, SessionState
 from game.errors import SessionNotFound
+from storage.codes import CodeAllocator
+from storage.index import SessionIndex
 
 
-def generate_code(length: int = 4) -> str:
-    chars = string.ascii_uppercase + string.digits
-    return "".join(random.choice(chars) for _ in range(length))
+@dataclass
+class EvictionPolicy:
+    # Seconds of inactivity after which a session is dropped (None = keep)
+    lobby_ttl: Optional[float] = 2 * 60 * 60
+    started_ttl: Optional[float] = 12 * 60 * 60  # abandoned without a new game
+    finished_ttl: Optional[float] = 10 * 60
+
+    # Hard cap on sessions kept in memory; least recently used go first
+    max_sessions: Optional[int] = 100_000
+
+    sweep_interval: float = 30.0
+
+    def ttl(self, state: SessionState) -> Optional[float]:
+        if state == SessionState.LOBBY:
+            return self.lobby_ttl
+        if state == SessionState.STARTED:
+            return self.started_ttl
+        return self.finished_ttl
 
 
 class InMemoryStorage:
-    def __init__(self) -> None:
-        self.by_chat: Dict[int, GameSession] = {}
-        self.by_code: Dict[str, GameSession] = {}
+    """
+    Sessions in dicts. A chat can have several sessions (say, a game still
+    running when a new lobby is opened); `by_chat` points to the newest one,
+    which is what the chat's commands act on. `index` finds sessions by user,
+    chat and state.
+    """
+
+    def __init__(
+        self,
+        policy: Optional[EvictionPolicy] = None,
+        clock: Callable[[], float] = time.monotonic,
+        codes: Optional[CodeAllocator] = None,
+    ) -> None:
+        self.by_chat: Dict[int, GameSession] = {}  # chat_id -> its newest session
+        # Ordered by last access, oldest first (LRU)
+        self.by_code: "OrderedDict[str, GameSession]" = OrderedDict()
+
+        self.index = SessionIndex()
+        self.codes = codes or CodeAllocator()
+        self.policy = policy or EvictionPolicy()
+        self.clock = clock
+        self.evictions: Counter = Counter()  # reason -> count
+        self._eviction_listeners: List[Callable[[GameSession, str], None]] = []
+
+        # Expiry bookkeeping: one live heap entry per session with a TTL.
+        # Touching a session only records the time; a popped entry whose
+        # session was touched since is pushed back with the new deadline, so a
+        # sweep costs O(expired + touched), not O(all sessions).
+        self._last_active: Dict[str, float] = {}
+        self._expiry: List[Tuple[float, str]] = []
+        self._scheduled: Dict[str, float] = {}  # code -> deadline of its live entry
+
+    @property
+    def live_sessions(self) -> int:
+        return len(self.by_code)
 
     def create_session(self, chat_id: int, owner_id: int) -> GameSession:
-        code = generate_code()
-        while code in self.by_code:
-            code = generate_code()
+        code = self.codes.allocate()
+        while self._code_taken(code):
+            code = self.codes.allocate()
+
+        # A new lobby replaces an old one. A game already started is over once
+        # the chat starts the next one; it stays findable until finished_ttl.
+        previous = self.by_chat.get(chat_id) or self._load_by_chat(chat_id)
+        if previous is not None and previous.state == SessionState.LOBBY:
+            self._evict(previous, "replaced")
+        elif previous is not None and previous.state == SessionState.STARTED:
+            previous.state = SessionState.FINISHED
+            self.save(previous)
 
         session = GameSession(code=code, chat_id=chat_id, owner_id=owner_id)
         self.by_chat[chat_id] = session
-        self.by_code[code] = session
+        self._track(session)
+        self.save(session)
         return session
 
     def get_by_chat(self, chat_id: int) -> GameSession:
-        session = self.by_chat.get(chat_id)
+        session = self.by_chat.get(chat_id) or self._load_by_chat(chat_id)
         if not session:
             raise SessionNotFound("There is no active game. Use /newgame")
+        self._touch(session)
         return session
 
     def get_by_code(self, code: str) -> GameSession:
-        session = self.by_code.get(code.upper())
+        code = code.upper()
+        session = self.by_code.get(code) or self._load_by_code(code)
         if not session:
             raise SessionNotFound("Invalid code.")
+        self._touch(session)
         return session
+
+    def save(self, session: GameSession) -> None:
+        # The dicts already hold the live objects; only the TTL and the
+        # indexes may change (new players, LOBBY -> STARTED).
+        if self.by_code.get(session.code) is not session:
+            return  # dropped meanwhile
+        self.index.update(session)
+        self._touch(session)
+
+    async def sessions_of_user(self, telegram_id: int) -> List[GameSession]:
+        return [s for s in self.index.of_user(telegram_id) if s.state != SessionState.FINISHED]
+
+    async def preload_chat(self, chat_id: int) -> None:
+        pass  # everything is in memory already
+
+    async def preload_code(self, code: str) -> None:
+        pass
+
+    def has_session(self, code: str) -> bool:
+        """Whether the code belongs to a live session, without loading it."""
+        return self._code_taken(code.upper())
+
+    def sessions_in_chat(self, chat_id: int) -> List[GameSession]:
+        return self.index.in_chat(chat_id)
+
+    def on_eviction(self, listener: Callable[[GameSession, str], None]) -> None:
+        """Call `listener(session, reason)` whenever a session is dropped for good."""
+        self._eviction_listeners.append(listener)
+
+    def check_indexes(self) -> List[str]:
+        """Problems found by comparing the indexes with a fresh rebuild."""
+        return self.index.check(self.by_code.values())
+
+    # -------------------------
+    # Eviction
+    # -------------------------
+    def sweep(self) -> int:
+        """Drop sessions whose TTL has passed. Returns how many were evicted."""
+        now = self.clock()
+        evicted = 0
+        while self._expiry and self._expiry[0][0] <= now:
+            deadline, code = heapq.heappop(self._expiry)
+            if self._scheduled.get(code) != deadline:
+                continue  # superseded or evicted
+            del self._scheduled[code]
+
+            session = self.by_code.get(code)
+            if session is None:
+                continue
+
+            deadline = self._deadline(session)
+            if deadline is None:
+                continue  # no TTL in the current state; save() reschedules
+            if deadline > now:
+                self._schedule(code, deadline)
+                continue
+
+            self._evict(session, "ttl")
+            evicted += 1
+        return evicted
+
+    async def run_sweeper(self) -> None:
+        while True:
+            await asyncio.sleep(self.policy.sweep_interval)
+            self.sweep()
+
+    def _track(self, session: GameSession) -> None:
+        self.by_code[session.code] = session
+        self.index.update(session)
+        self._touch(session)
+
+        max_sessions = self.policy.max_sessions
+        if max_sessions is not None:
+            while len(self.by_code) > max_sessions:
+                _, oldest = next(iter(self.by_code.items()))
+                self._evict(oldest, "lru")
+
+    def _touch(self, session: GameSession) -> None:
+        code = session.code
+        if code not in self.by_code:
+            return
+        self.by_code.move_to_end(code)
+        self._last_active[code] = self.clock()
+
+        # A later deadline is picked up when the old entry pops; only an
+        # earlier one (e.g. after the game finished) needs a new entry.
+        deadline = self._deadline(session)
+        scheduled = self._scheduled.get(code)
+        if deadline is not None and (scheduled is None or deadline < scheduled):
+            self._schedule(code, deadline)
+
+    def _deadline(self, session: GameSession) -> Optional[float]:
+        ttl = self.policy.ttl(session.state)
+        if ttl is None:
+            return None
+        return self._last_active[session.code] + ttl
+
+    def _schedule(self, code: str, deadline: float) -> None:
+        heapq.heappush(self._expiry, (deadline, code))
+        self._scheduled[code] = deadline
+
+    def _evict(self, session: GameSession, reason: str) -> None:
+        code = session.code
+        if self.by_code.get(code) is not session:
+            return
+        del self.by_code[code]
+        self._last_active.pop(code, None)
+        self._scheduled.pop(code, None)  # its heap entry is now stale
+        self.index.remove(session)
+        if self.by_chat.get(session.chat_id) is session:
+            # Fall back to the chat's next newest session, if any
+            latest = self.index.latest_in_chat(session.chat_id)
+            if latest is not None:
+                self.by_chat[session.chat_id] = latest
+            else:
+                del self.by_chat[session.chat_id]
+        self.evictions[reason] += 1
+        self._on_evict(session, reason)
+
+    # Hooks for persistent backends (see storage/sqlite.py)
+    def _code_taken(self, code: str) -> bool:
+        return code in self.by_code
+
+    def _load_by_chat(self, chat_id: int) -> Optional[GameSession]:
+        return None
+
+    def _load_by_code(self, code: str) -> Optional[GameSession]:
+        return None
+
+    def _on_evict(self, session: GameSession, reason: str) -> None:
+        self.codes.release(session.code)
+        for listener in self._eviction_listeners:
+            listener(session, reason)
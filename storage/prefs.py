@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from typing import List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Language codes as stored on disk (2 bits each). The order is part of the
+# file format: only ever append, and there is room for one more.
+LANG_CODES = ("en", "ru", "he")
+
+HEADER = struct.Struct("<8sQQ")  # magic, chats, capacity
+MAGIC = b"CLUELANG"
+MIN_CAPACITY = 1024
+_HASH = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+
+
+class ChatLanguages:
+    """
+    The language of each chat, in about 16.25 bytes per chat.
+
+    Chat ids sit in an open-addressing hash table (an int64 array, at most
+    half full) and the language codes are packed four to a byte beside it.
+    The file holds the same two arrays behind a small header, so loading is
+    two copies out of an mmap. `run_writer()` writes changes back every
+    `flush_interval` seconds: only the changed slots, or the whole file after
+    the table grew.
+    """
+
+    def __init__(self, path: Optional[str] = None, default: str = "en", flush_interval: float = 5.0) -> None:
+        self.path = path
+        self.default = default
+        self.flush_interval = flush_interval
+
+        self._count = 0
+        self._dirty: Set[int] = set()  # slots changed since the last write
+        self._rewrite = False          # the file must be written from scratch
+        self._io_lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            self._load(path)
+        else:
+            self._resize(MIN_CAPACITY)
+            self._rewrite = path is not None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def get(self, chat_id: int) -> str:
+        slot = self._find(chat_id)
+        if self._keys[slot] != chat_id:
+            return self.default
+        return LANG_CODES[(self._langs[slot >> 2] >> ((slot & 3) * 2)) & 3]
+
+    def set(self, chat_id: int, lang: str) -> None:
+        if chat_id == 0:
+            raise ValueError("Chat id 0 marks an empty slot")
+        code = LANG_CODES.index(lang)
+
+        slot = self._find(chat_id)
+        if self._keys[slot] != chat_id:
+            if (self._count + 1) * 2 > len(self._keys):
+                self._grow()
+                slot = self._find(chat_id)
+            self._keys[slot] = chat_id
+            self._count += 1
+
+        shift = (slot & 3) * 2
+        byte = slot >> 2
+        self._langs[byte] = (self._langs[byte] & ~(3 << shift)) | (code << shift)
+        if self.path and not self._rewrite:
+            self._dirty.add(slot)
+
+    # -------------------------
+    # Hash table
+    # -------------------------
+    def _find(self, chat_id: int) -> int:
+        """Slot holding `chat_id`, or the empty slot where it would go."""
+        keys = self._keys
+        mask = len(keys) - 1
+        slot = ((chat_id * _HASH) & _MASK64) >> self._shift
+        while True:
+            key = keys[slot]
+            if key == chat_id or key == 0:
+                return slot
+            slot = (slot + 1) & mask
+
+    def _resize(self, capacity: int) -> None:
+        self._keys = array("q", bytes(8 * capacity))
+        self._langs = bytearray(capacity // 4)
+        self._shift = 64 - (capacity.bit_length() - 1)
+
+    def _grow(self) -> None:
+        keys, langs = self._keys, self._langs
+        self._resize(len(keys) * 2)
+        for slot, key in enumerate(keys):
+            if key:
+                new = self._find(key)
+                self._keys[new] = key
+                code = (langs[slot >> 2] >> ((slot & 3) * 2)) & 3
+                self._langs[new >> 2] |= code << ((new & 3) * 2)
+        self._dirty.clear()
+        self._rewrite = self.path is not None
+
+    # -------------------------
+    # File
+    # -------------------------
+    def _load(self, path: str) -> None:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            magic, count, capacity = HEADER.unpack_from(buf, 0)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a chat language file")
+            self._shift = 64 - (capacity.bit_length() - 1)
+            keys_end = HEADER.size + 8 * capacity
+            self._keys = array("q")
+            self._keys.frombytes(buf[HEADER.size:keys_end])
+            self._langs = bytearray(buf[keys_end:keys_end + capacity // 4])
+        if sys.byteorder == "big":
+            self._keys.byteswap()
+        self._count = count
+
+    def _snapshot(self) -> bytes:
+        keys = self._keys
+        if sys.byteorder == "big":
+            keys = array("q", keys)
+            keys.byteswap()
+        return HEADER.pack(MAGIC, self._count, len(self._keys)) + keys.tobytes() + bytes(self._langs)
+
+    def _take(self) -> Tuple[Optional[bytes], List[Tuple[int, int, int]]]:
+        """What to write: the whole file, or (slot, chat id, language byte) per changed slot."""
+        if self._rewrite:
+            self._rewrite = False
+            self._dirty.clear()
+            return self._snapshot(), []
+        slots = [(slot, self._keys[slot], self._langs[slot >> 2]) for slot in self._dirty]
+        self._dirty.clear()
+        return None, slots
+
+    def _write(self, count: int, capacity: int, whole: Optional[bytes], slots: List[Tuple[int, int, int]]) -> None:
+        with self._io_lock:
+            if whole is not None:
+                with open(self.path + ".tmp", "wb") as f:
+                    f.write(whole)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(self.path + ".tmp", self.path)
+                return
+
+            langs_at = HEADER.size + 8 * capacity
+            with open(self.path, "r+b") as f:
+                for slot, key, byte in slots:
+                    f.seek(HEADER.size + 8 * slot)
+                    f.write(struct.pack("<q", key))
+                    f.seek(langs_at + (slot >> 2))
+                    f.write(bytes((byte,)))
+                f.seek(0)
+                f.write(HEADER.pack(MAGIC, count, capacity))
+
+    def flush(self) -> None:
+        """Write pending changes synchronously (used on shutdown)."""
+        if self.path and (self._rewrite or self._dirty):
+            self._write(self._count, len(self._keys), *self._take())
+
+    async def run_writer(self) -> None:
+        if not self.path:
+            return
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if not (self._rewrite or self._dirty):
+                continue
+            # Taken on the event loop, so the write never sees a half-applied change
+            count, capacity = self._count, len(self._keys)
+            batch = self._take()
+            try:
+                await asyncio.to_thread(self._write, count, capacity, *batch)
+            except OSError:
+                logger.exception("Failed to write chat languages, will rewrite the file")
+                self._rewrite = True
+
+    def close(self) -> None:
+        self.flush()
@@ -0,0 +1,394 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from game.player import Player
+from game.session import GameSession, SessionState
+from storage.codes import CodeAllocator
+from storage.memory import EvictionPolicy, InMemoryStorage
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    code        TEXT PRIMARY KEY,
+    chat_id     INTEGER NOT NULL,
+    owner_id    INTEGER NOT NULL,
+    created_at  TEXT NOT NULL,
+    state       TEXT NOT NULL,
+    min_players INTEGER NOT NULL,
+    max_players INTEGER NOT NULL,
+    updated_at  REAL NOT NULL DEFAULT 0     -- wall time of the last write
+);
+CREATE INDEX IF NOT EXISTS sessions_chat ON sessions (chat_id, state);
+
+CREATE TABLE IF NOT EXISTS players (
+    code        TEXT NOT NULL,
+    position    INTEGER NOT NULL,
+    telegram_id INTEGER NOT NULL,
+    username    TEXT NOT NULL,
+    joined_at   TEXT NOT NULL,
+    PRIMARY KEY (code, position)
+);
+CREATE INDEX IF NOT EXISTS players_user ON players (telegram_id);
+"""
+
+SESSION_COLUMNS = "code, chat_id, owner_id, created_at, state, min_players, max_players, updated_at"
+
+SessionRow = Tuple[str, int, int, str, str, int, int, float]
+PlayerRow = Tuple[str, int, int, str, str]
+
+
+class SQLiteStorage(InMemoryStorage):
+    """
+    InMemoryStorage backed by an SQLite file.
+
+    Handlers keep working with the in-memory objects. `save()` only marks a
+    session dirty; `run_writer()` writes all dirty sessions in one transaction
+    every `flush_interval_ms`, off the event loop. Sessions are loaded from disk
+    lazily, the first time a chat or code is looked up.
+
+    The codes and chats of all unfinished sessions are read once at start and
+    kept up to date, so looking up a chat or code that has nothing on disk
+    (a chat without a lobby, a freshly allocated code) never queries SQLite.
+    Actual loads use their own connection: in WAL mode they read the last
+    committed state without waiting for the writer's transaction.
+
+    Lookups are synchronous, so handlers call `preload_chat()` /
+    `preload_code()` first: they read the session in a thread and the lookup
+    then finds it in memory. Loading on the event loop is only the fallback
+    for callers that did not preload.
+
+    Rows untouched for longer than the policy's TTLs are finished at start
+    and by `run_sweeper()`, and finished ones are deleted after
+    `finished_ttl`, so neither the startup scan nor the file grows with
+    every game ever played.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        flush_interval_ms: int = 200,
+        policy: Optional[EvictionPolicy] = None,
+        codes: Optional[CodeAllocator] = None,
+        wall: Callable[[], float] = time.time,
+    ) -> None:
+        super().__init__(policy, codes=codes)
+        self.flush_interval = flush_interval_ms / 1000
+        self.wall = wall  # stored in updated_at, so it must survive restarts
+        self._dirty: Dict[str, GameSession] = {}
+        self._writing: Dict[str, GameSession] = {}  # batch the writer is committing
+
+        # The writer thread's connection, and one for lazy loads on the event loop
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+        self._db_lock = threading.Lock()
+        # Shared by preloads in worker threads and the fallback on the loop
+        self._reader = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._read_lock = threading.Lock()
+
+        # Unfinished sessions, in memory or only on disk
+        self._live_codes: Dict[str, int] = {}                   # code -> chat_id
+        self._live_chats: Dict[int, Dict[str, datetime]] = {}   # chat_id -> {code: created_at}
+        now = self.wall()
+        self._prune(self._stale(now), now)
+        for code, chat_id, created_at in self._reader.execute(
+            "SELECT code, chat_id, created_at FROM sessions WHERE state != 'FINISHED'"
+        ):
+            self._remember(code, chat_id, datetime.fromisoformat(created_at))
+
+    def _migrate(self) -> None:
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(sessions)")]
+        if "updated_at" not in columns:
+            # Files from before updated_at: give every session a full TTL from now
+            self._conn.execute("ALTER TABLE sessions ADD COLUMN updated_at REAL NOT NULL DEFAULT 0")
+            self._conn.execute("UPDATE sessions SET updated_at = ?", (self.wall(),))
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_stale ON sessions (state, updated_at)")
+
+    def save(self, session: GameSession) -> None:
+        super().save(session)
+        self._dirty[session.code] = session
+        if session.state == SessionState.FINISHED:
+            self._forget(session.code)
+
+    async def sessions_of_user(self, telegram_id: int) -> List[GameSession]:
+        # Sessions unloaded by the LRU cap are only on disk (or still queued)
+        codes = await asyncio.to_thread(self._codes_of_user, telegram_id)
+        # Queued changes are newer than the disk
+        codes = [code for code in codes if self._pending(code) is None]
+        codes.extend(
+            s.code for s in self._queued()
+            if s.state != SessionState.FINISHED and any(p.telegram_id == telegram_id for p in s.players)
+        )
+        for code in codes:
+            await self.preload_code(code)
+        found = {session.code: session for session in await super().sessions_of_user(telegram_id)}
+        for code in codes:
+            if code not in found:
+                session = self.by_code.get(code) or self._load_by_code(code)
+                if session is not None:
+                    found[code] = session
+        return list(found.values())
+
+    async def preload_chat(self, chat_id: int) -> None:
+        if chat_id in self.by_chat:
+            return
+        codes = self._live_chats.get(chat_id)
+        if codes:
+            # get_by_chat() then finds the newest code in memory
+            await self.preload_code(max(codes, key=codes.__getitem__))
+
+    async def preload_code(self, code: str) -> None:
+        code = code.upper()
+        if not self._on_disk_only(code):
+            return
+        rows = await asyncio.to_thread(self._read, code)
+        # Loaded, changed or finished while we were reading
+        if rows is not None and self._on_disk_only(code):
+            self._track(self._build(*rows))
+
+    def _on_disk_only(self, code: str) -> bool:
+        return code not in self.by_code and code in self._live_codes and self._pending(code) is None
+
+    def _on_evict(self, session: GameSession, reason: str) -> None:
+        # "lru" only unloads the session; it stays on disk and is loaded
+        # again on the next lookup. Any other reason means it was abandoned.
+        if reason == "lru":
+            return
+        if session.state != SessionState.FINISHED:
+            session.state = SessionState.FINISHED
+            self._dirty[session.code] = session
+        self._forget(session.code)
+        super()._on_evict(session, reason)
+
+    def _track(self, session: GameSession) -> None:
+        if session.state != SessionState.FINISHED:
+            self._remember(session.code, session.chat_id, session.created_at)
+        super()._track(session)
+
+    def _remember(self, code: str, chat_id: int, created_at: datetime) -> None:
+        self._live_codes[code] = chat_id
+        self._live_chats.setdefault(chat_id, {})[code] = created_at
+
+    def _forget(self, code: str) -> None:
+        chat_id = self._live_codes.pop(code, None)
+        if chat_id is None:
+            return
+        codes = self._live_chats[chat_id]
+        del codes[code]
+        if not codes:
+            del self._live_chats[chat_id]
+
+    # -------------------------
+    # Pruning
+    # -------------------------
+    async def run_sweeper(self) -> None:
+        while True:
+            await asyncio.sleep(self.policy.sweep_interval)
+            self.sweep()
+            try:
+                await self.prune()
+            except sqlite3.Error:
+                logger.exception("Failed to prune stale sessions, will retry")
+
+    async def prune(self) -> int:
+        """Finish sessions idle on disk past their TTL. Returns how many."""
+        now = self.wall()
+        stale = await asyncio.to_thread(self._stale, now)
+        # Sessions in memory expire through sweep(), queued ones are newer
+        # than the disk
+        stale = [(code, updated_at) for code, updated_at in stale if self._on_disk_only(code)]
+        await asyncio.to_thread(self._prune, stale, now)
+        for code, _ in stale:
+            if self._on_disk_only(code):  # not loaded meanwhile
+                self._forget(code)
+                self.codes.release(code)
+        self.evictions["ttl"] += len(stale)
+        return len(stale)
+
+    def _stale(self, now: float) -> List[Tuple[str, float]]:
+        stale = []
+        with self._read_lock:
+            for state in (SessionState.LOBBY, SessionState.STARTED):
+                ttl = self.policy.ttl(state)
+                if ttl is not None:
+                    stale.extend(self._reader.execute(
+                        "SELECT code, updated_at FROM sessions WHERE state = ? AND updated_at <= ?",
+                        (state.value, now - ttl),
+                    ))
+        return stale
+
+    def _prune(self, stale: List[Tuple[str, float]], now: float) -> None:
+        with self._db_lock:
+            self._conn.execute("BEGIN")
+            try:
+                # Skips rows the writer has rewritten since they were selected
+                self._conn.executemany(
+                    "UPDATE sessions SET state = 'FINISHED' WHERE code = ? AND updated_at = ?", stale
+                )
+                if self.policy.finished_ttl is not None:
+                    cutoff = (now - self.policy.finished_ttl,)
+                    self._conn.execute(
+                        "DELETE FROM players WHERE code IN (SELECT code FROM sessions"
+                        " WHERE state = 'FINISHED' AND updated_at <= ?)", cutoff,
+                    )
+                    self._conn.execute(
+                        "DELETE FROM sessions WHERE state = 'FINISHED' AND updated_at <= ?", cutoff
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    # -------------------------
+    # Write-behind
+    # -------------------------
+    async def run_writer(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if not self._dirty:
+                continue
+            self._writing = self._dirty
+            batch = self._take_batch()
+            try:
+                await asyncio.to_thread(self._write, *batch)
+            except sqlite3.Error:
+                logger.exception("Failed to write %d sessions, will retry", len(self._writing))
+                for code, s in self._writing.items():
+                    self._dirty.setdefault(code, s)
+            finally:
+                self._writing = {}
+
+    def flush(self) -> None:
+        """Write pending changes synchronously (used on shutdown)."""
+        if self._dirty:
+            self._write(*self._take_batch())
+
+    def close(self) -> None:
+        self.flush()
+        self._reader.close()
+        with self._db_lock:
+            self._conn.close()
+
+    def _take_batch(self) -> Tuple[List[SessionRow], List[PlayerRow]]:
+        # Runs on the event loop, so the snapshot never sees a half-applied change.
+        sessions, self._dirty = list(self._dirty.values()), {}
+        now = self.wall()
+        session_rows = []
+        player_rows = []
+        for s in sessions:
+            session_rows.append((
+                s.code, s.chat_id, s.owner_id, s.created_at.isoformat(),
+                s.state.value, s.min_players, s.max_players, now,
+            ))
+            for i, p in enumerate(s.players):
+                player_rows.append((s.code, i, p.telegram_id, p.username, p.joined_at.isoformat()))
+        return session_rows, player_rows
+
+    def _write(self, session_rows: List[SessionRow], player_rows: List[PlayerRow]) -> None:
+        with self._db_lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO sessions ({SESSION_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    session_rows,
+                )
+                self._conn.executemany(
+                    "DELETE FROM players WHERE code = ?", [(row[0],) for row in session_rows]
+                )
+                self._conn.executemany("INSERT INTO players VALUES (?, ?, ?, ?, ?)", player_rows)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    # -------------------------
+    # Lazy loading
+    # -------------------------
+    def _code_taken(self, code: str) -> bool:
+        return code in self.by_code or code in self._live_codes or self._pending(code) is not None
+
+    def _load_by_chat(self, chat_id: int) -> Optional[GameSession]:
+        codes = self._live_chats.get(chat_id)
+        if not codes:
+            return None
+        newest = max(codes, key=codes.__getitem__)
+        session = self.by_code.get(newest) or self._load_by_code(newest)
+        if session:
+            self.by_chat[chat_id] = session
+        return session
+
+    def _load_by_code(self, code: str) -> Optional[GameSession]:
+        # Unloaded by the LRU cap before the writer got to it (or committed it)
+        pending = self._pending(code)
+        if pending is not None:
+            if pending.state == SessionState.FINISHED:
+                return None
+            self._track(pending)
+            return pending
+        if code not in self._live_codes:
+            return None
+        return self._load(code)
+
+    def _pending(self, code: str) -> Optional[GameSession]:
+        """The session's newest state not yet committed, if any."""
+        return self._dirty.get(code) or self._writing.get(code)
+
+    def _queued(self) -> Iterator[GameSession]:
+        yield from self._dirty.values()
+        yield from (s for code, s in self._writing.items() if code not in self._dirty)
+
+    def _load(self, code: str) -> Optional[GameSession]:
+        rows = self._read(code)
+        if rows is None:
+            return None
+        session = self._build(*rows)
+        self._track(session)
+        return session
+
+    def _codes_of_user(self, telegram_id: int) -> List[str]:
+        with self._read_lock:
+            return [
+                code for code, in self._reader.execute(
+                    "SELECT s.code FROM players p JOIN sessions s ON s.code = p.code"
+                    " WHERE p.telegram_id = ? AND s.state != 'FINISHED'",
+                    (telegram_id,),
+                )
+            ]
+
+    def _read(self, code: str) -> Optional[Tuple[SessionRow, List[Tuple[int, str, str]]]]:
+        with self._read_lock:
+            row = self._reader.execute(
+                f"SELECT {SESSION_COLUMNS} FROM sessions WHERE state != 'FINISHED' AND code = ?", (code,)
+            ).fetchone()
+            if row is None:
+                return None
+            player_rows = self._reader.execute(
+                "SELECT telegram_id, username, joined_at FROM players WHERE code = ? ORDER BY position",
+                (code,),
+            ).fetchall()
+        return row, player_rows
+
+    @staticmethod
+    def _build(row: SessionRow, player_rows: List[Tuple[int, str, str]]) -> GameSession:
+        code, chat_id, owner_id, created_at, state, min_players, max_players, _ = row
+        return GameSession(
+            code=code,
+            chat_id=chat_id,
+            owner_id=owner_id,
+            created_at=datetime.fromisoformat(created_at),
+            state=SessionState(state),
+            players=[
+                Player(telegram_id=tid, username=name, joined_at=datetime.fromisoformat(joined))
+                for tid, name, joined in player_rows
+            ],
+            min_players=min_players,
+            max_players=max_players,
+        )
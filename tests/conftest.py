@@ -0,0 +1,78 @@
+import asyncio
+from typing import Any, Collection, Dict, List, Optional
+
+import pytest
+
+# Environment that would make create_app() open files or serve metrics
+APP_ENV = (
+    "DB_PATH", "JOURNAL_DIR", "TIMERS_PATH", "LANG_PATH", "METRICS_PORT",
+    "SLOW_UPDATE_MS", "LOBBY_AUTOSTART", "ADMIN_IDS",
+)
+
+
+@pytest.fixture
+def bot_app(monkeypatch):
+    """bot.py with fresh in-memory services and an unlimited outbox (see app/loadgen.py)."""
+    pytest.importorskip("aiogram")
+    from app import loadgen
+
+    for name in APP_ENV:
+        monkeypatch.delenv(name, raising=False)
+    return loadgen.load_app()
+
+
+class Driver:
+    """
+    Feeds raw updates through bot.py's dispatcher, as Telegram would, and
+    records every API call the fake session answers.
+
+        async with Driver(app) as bot:
+            calls = await bot.press(-100, 1, pack("menu"))
+    """
+
+    def __init__(self, app: Any, latency: float = 0.0, no_dm: Collection[int] = ()) -> None:
+        from aiogram import Bot
+        from app.loadgen import TOKEN, FakeSession, Updates
+
+        class RecordingSession(FakeSession):
+            async def make_request(self, bot: Any, method: Any, timeout: Optional[int] = None) -> Any:
+                result = await super().make_request(bot, method, timeout)
+                requests.append(method)  # only what Telegram accepted
+                return result
+
+        requests: List[Any] = []
+        self.requests = requests
+        self.app = app
+        self.session = RecordingSession(latency, no_dm)
+        self.bot = Bot(token=TOKEN, session=self.session)
+        self.updates = Updates()
+
+    async def __aenter__(self) -> "Driver":
+        self.dp = self.app.build_dispatcher()
+        self.services = self.app.start_services(self.bot)
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.app.stop_services(self.services)
+
+    async def message(self, chat_id: int, user_id: int, text: str) -> List[Any]:
+        return await self.feed(self.updates.message(chat_id, user_id, text))
+
+    async def press(self, chat_id: int, user_id: int, data: str) -> List[Any]:
+        return await self.feed(self.updates.callback(chat_id, user_id, data))
+
+    async def feed(self, update: Dict[str, Any]) -> List[Any]:
+        """Handle one update and wait until what it queued is sent. Returns those API calls."""
+        start = len(self.requests)
+        await self.dp.feed_raw_update(self.bot, update)
+        await self.drain()
+        return self.requests[start:]
+
+    async def drain(self) -> None:
+        while self.app.outbox.depth or self.app.background_tasks:
+            await asyncio.sleep(0.001)
+
+
+@pytest.fixture
+def driver():
+    return Driver
@@ -0,0 +1,209 @@
+import asyncio
+
+import pytest
+
+from app.callbacks import MAX_CALLBACK_DATA, CallbackRouter, action_of, pack
+from game.errors import NotOwner, SessionNotFound
+from i18n import t
+
+GROUP = -100
+OWNER = 1
+
+
+def edits(calls):
+    return [c for c in calls if type(c).__name__ == "EditMessageText"]
+
+
+def sent(calls):
+    return [c for c in calls if type(c).__name__ == "SendMessage"]
+
+
+def answered(calls) -> bool:
+    return any(type(c).__name__ == "AnswerCallbackQuery" for c in calls)
+
+
+# -------------------------
+# CallbackRouter
+# -------------------------
+def make_router():
+    router = CallbackRouter()
+
+    @router.action("plain")
+    async def plain(call, state, lang):
+        pass
+
+    @router.action("lang", str)
+    async def lang(call, state, lang, new_lang):
+        pass
+
+    @router.action("seat", int, str)
+    async def seat(call, state, lang, number, name):
+        pass
+
+    return router, plain, lang, seat
+
+
+def test_router_resolves_actions_and_converts_arguments():
+    router, plain, lang, seat = make_router()
+    assert router.resolve(pack("plain")) == (plain, ())
+    assert router.resolve(pack("lang", "ru")) == (lang, ("ru",))
+    assert router.resolve(pack("seat", 3, "x")) == (seat, (3, "x"))
+
+
+@pytest.mark.parametrize("data", [
+    "",
+    "plain",                # no version
+    "0:plain",              # older format
+    "1:",                   # no action
+    "1:nope",               # unknown action
+    "1:plain:extra",        # too many arguments
+    "1:lang",               # too few
+    "1:seat:three:x",       # not an int
+])
+def test_router_ignores_unknown_and_stale_payloads(data):
+    router, *_ = make_router()
+    assert router.resolve(data) is None
+
+
+def test_router_rejects_separator_in_action_name():
+    with pytest.raises(ValueError):
+        CallbackRouter().action("a:b")
+
+
+def test_pack_enforces_telegram_limit():
+    assert pack("lang", "x" * (MAX_CALLBACK_DATA - len("1:lang:"))).startswith("1:lang:")
+    with pytest.raises(ValueError):
+        pack("lang", "x" * MAX_CALLBACK_DATA)
+
+
+def test_action_of():
+    assert action_of(pack("lang", "en")) == "lang"
+    assert action_of("0:lang:en") == "unknown"
+    assert action_of("1:") == "unknown"
+
+
+# -------------------------
+# Every button, through the dispatcher
+# -------------------------
+def press(bot_app, driver, *presses, chat_id=GROUP):
+    """Edits made by the last of `presses` (each (user_id, data)), after the others ran."""
+    async def scenario():
+        async with driver(bot_app) as bot:
+            for user_id, data in presses[:-1]:
+                await bot.press(GROUP, user_id, data)
+            user_id, data = presses[-1]
+            update = bot.updates.callback(chat_id, user_id, data)
+            if chat_id > 0:
+                update["callback_query"]["message"]["chat"] = {"id": chat_id, "type": "private"}
+            calls = await bot.feed(update)
+            assert answered(calls)  # the spinner always stops
+            return edits(calls)
+
+    return asyncio.run(scenario())
+
+
+def error_of(bot_app, error):
+    return bot_app.error_text(error, "en")
+
+
+def test_menu_button_shows_the_menu_and_leaves_the_join_flow(bot_app, driver):
+    from aiogram.fsm.storage.base import StorageKey
+
+    async def scenario():
+        async with driver(bot_app) as bot:
+            await bot.press(GROUP, OWNER, pack("join_flow"))
+            key = StorageKey(bot_id=bot.bot.id, chat_id=GROUP, user_id=OWNER)
+            assert await bot_app.fsm_storage.get_state(key) is not None
+            calls = await bot.press(GROUP, OWNER, pack("menu"))
+            assert await bot_app.fsm_storage.get_state(key) is None
+            return edits(calls)
+
+    [edit] = asyncio.run(scenario())
+    assert edit.text == t("en", "menu_title")
+    assert edit.reply_markup == bot_app.main_menu("en")
+
+
+@pytest.mark.parametrize("action, key, menu", [
+    ("help", "help", "back_menu"),
+    ("languages", "lang_choose", "languages_menu"),
+])
+def test_static_buttons(bot_app, driver, action, key, menu):
+    [edit] = press(bot_app, driver, (OWNER, pack(action)))
+    assert edit.text == t("en", key)
+    assert edit.reply_markup == getattr(bot_app, menu)("en")
+
+
+@pytest.mark.parametrize("lang", ["en", "ru", "he"])
+def test_language_button_switches_the_chat(bot_app, driver, lang):
+    [edit] = press(bot_app, driver, (OWNER, pack("lang", lang)))
+    assert edit.text == t(lang, f"lang_set_{lang}")
+    assert edit.reply_markup == bot_app.main_menu(lang)
+    assert bot_app.get_lang(GROUP) == lang
+
+
+def test_unknown_language_falls_back_to_english(bot_app, driver):
+    press(bot_app, driver, (OWNER, pack("lang", "ru")), (OWNER, pack("lang", "xx")))
+    assert bot_app.get_lang(GROUP) == "en"
+
+
+def test_join_button_asks_for_the_code(bot_app, driver):
+    [edit] = press(bot_app, driver, (OWNER, pack("join_flow")))
+    assert edit.text == t("en", "send_join_code")
+
+
+@pytest.mark.parametrize("action, key", [("join_flow", "join_only_group"), ("newgame", "only_group_cmd")])
+def test_group_buttons_in_a_private_chat(bot_app, driver, action, key):
+    [edit] = press(bot_app, driver, (OWNER, pack(action)), chat_id=OWNER)
+    assert edit.text == t("en", key)
+
+
+def test_newgame_button_turns_the_menu_into_the_lobby_board(bot_app, driver):
+    [edit] = press(bot_app, driver, (OWNER, pack("newgame")))
+    session = bot_app.game_storage.get_by_chat(GROUP)
+    assert edit.text.startswith(t("en", "game_created", code=session.code))
+    assert [p.telegram_id for p in session.players] == [OWNER]
+
+
+def test_players_and_status_buttons(bot_app, driver):
+    [players] = press(bot_app, driver, (OWNER, pack("newgame")), (OWNER, pack("players")))
+    session = bot_app.game_storage.get_by_chat(GROUP)
+    assert players.text == bot_app.format_players(session, "en")
+
+    [status] = press(bot_app, driver, (OWNER, pack("status")))
+    assert session.code in status.text
+
+
+def test_start_button_starts_the_game_and_deals(bot_app, driver):
+    async def scenario():
+        async with driver(bot_app) as bot:
+            await bot.press(GROUP, OWNER, pack("newgame"))
+            code = bot_app.game_storage.get_by_chat(GROUP).code
+            for user_id in (2, 3):
+                await bot.message(GROUP, user_id, f"/join {code}")
+            calls = await bot.press(GROUP, OWNER, pack("start"))
+            await asyncio.sleep(0)
+            await bot.drain()
+            return calls, bot.requests
+
+    calls, everything = asyncio.run(scenario())
+    assert edits(calls)[-1].text == t("en", "game_started")
+    assert bot_app.game_storage.get_by_chat(GROUP).state.value == "STARTED"
+    assert {m.chat_id for m in sent(everything)} >= {OWNER, 2, 3}  # hands in private
+
+
+@pytest.mark.parametrize("action", ["players", "status", "start"])
+def test_game_errors_are_shown_in_the_menu_message(bot_app, driver, action):
+    # No lobby in the chat: the central handler turns SessionNotFound into text
+    [edit] = press(bot_app, driver, (OWNER, pack(action)))
+    assert edit.text == error_of(bot_app, SessionNotFound())
+    assert edit.reply_markup == bot_app.back_menu("en")
+
+
+def test_start_by_someone_else_is_refused(bot_app, driver):
+    [edit] = press(bot_app, driver, (OWNER, pack("newgame")), (2, pack("start")))
+    assert edit.text == error_of(bot_app, NotOwner())
+
+
+@pytest.mark.parametrize("data", ["0:menu", "1:nope", "1:lang", "garbage"])
+def test_stale_buttons_are_only_answered(bot_app, driver, data):
+    assert press(bot_app, driver, (OWNER, data)) == []
@@ -0,0 +1,48 @@
+import random
+
+from storage.codes import ALPHABET, CodeAllocator
+
+
+def test_looks_like_matches_issued_codes_only():
+    codes = CodeAllocator(prefix="B", key=1)
+    code = codes.allocate()
+    assert codes.looks_like(code)
+    assert codes.looks_like(f"  {code.lower()} ")
+    for chatter in ("thanks", "hello", "ok", "", None, "A" + code[1:], code + "!", code * 10):
+        assert not codes.looks_like(chatter)
+
+
+def test_looks_like_keeps_previous_length_after_growing():
+    codes = CodeAllocator(length=1, max_fill=0.5, key=1)
+    first = codes.allocate()
+    assert not codes.looks_like("")
+    while codes.length == 1:
+        codes.allocate()
+    assert codes.looks_like(first)
+    assert codes.looks_like(codes.allocate())
+    assert not codes.looks_like("ABC")
+
+
+def test_looks_like_needs_the_check_character():
+    codes = CodeAllocator(key=1)
+    code = codes.allocate()
+    assert len(code) == codes.length + 1
+    for i in range(len(code)):
+        for c in ALPHABET:
+            if c != code[i]:
+                assert not codes.looks_like(code[:i] + c + code[i + 1:])
+    # Any other five-character word has one chance in 36
+    rng = random.Random(1)
+    words = ["".join(rng.choice(ALPHABET) for _ in range(5)) for _ in range(36_000)]
+    assert 800 < sum(map(codes.looks_like, words)) < 1200
+
+
+def test_releasing_codes_not_counted_keeps_live_at_zero():
+    # After a restart the codes recovered from disk were not allocated here
+    codes = CodeAllocator(key=1)
+    recovered = CodeAllocator(key=2)
+    for _ in range(3):
+        codes.release(recovered.allocate())
+    assert codes.live == 0
+    codes.allocate()
+    assert codes.live == 1
@@ -0,0 +1,118 @@
+import asyncio
+import random
+from collections import Counter
+
+import pytest
+
+pytest.importorskip("aiogram")
+
+from aiogram import types  # noqa: E402
+
+import bot as app  # noqa: E402
+from app.locks import ChatLocks  # noqa: E402
+from app.timers import TimerWheel  # noqa: E402
+from game.errors import GameError  # noqa: E402
+from game.session import SessionState  # noqa: E402
+from storage.memory import InMemoryStorage  # noqa: E402
+
+CHATS = (-1, -2, -3)
+USERS = range(1, 9)
+
+
+def user(user_id: int) -> types.User:
+    return types.User(id=user_id, is_bot=False, first_name=f"user{user_id}", username=f"user{user_id}")
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    storage = InMemoryStorage()
+    monkeypatch.setattr(app, "game_storage", storage, raising=False)
+    monkeypatch.setattr(app, "timers", TimerWheel(), raising=False)
+    monkeypatch.setattr(app, "chat_locks", ChatLocks())
+    monkeypatch.setattr(app, "NEWGAME_DEBOUNCE", app.timedelta(0))
+    return storage
+
+
+async def newgame(rng: random.Random, log: Counter) -> None:
+    await app.open_lobby(rng.choice(CHATS), user(rng.choice(USERS)))
+    log["newgame"] += 1
+
+
+async def join(rng: random.Random, log: Counter, storage: InMemoryStorage) -> None:
+    try:
+        session = storage.get_by_chat(rng.choice(CHATS))
+    except GameError:
+        return
+    # Let other calls run between looking the lobby up and joining it
+    await asyncio.sleep(0)
+    try:
+        player = await app.join_lobby(session, user(rng.choice(USERS)))
+    except GameError:
+        return
+    assert session.get_player(player.telegram_id) is player
+    log["join"] += 1
+
+
+async def start(rng: random.Random, log: Counter, started: dict, storage: InMemoryStorage) -> None:
+    chat_id = rng.choice(CHATS)
+    try:
+        owner = storage.get_by_chat(chat_id).owner_id
+    except GameError:
+        return
+    await asyncio.sleep(0)
+    try:
+        session = await app.start_game(chat_id, owner)
+    except GameError:
+        return
+    started[session.code] = (session, list(session.players))
+    log["start"] += 1
+
+
+def check_invariants(storage: InMemoryStorage, started: dict) -> None:
+    assert storage.check_indexes() == []
+    for chat_id in CHATS:
+        sessions = storage.sessions_in_chat(chat_id)
+        if not sessions:
+            assert chat_id not in storage.by_chat
+            continue
+        # The chat points at its newest session and has at most one lobby
+        assert storage.by_chat[chat_id] is max(sessions, key=lambda s: s.created_at)
+        assert sum(s.state == SessionState.LOBBY for s in sessions) <= 1
+        assert sum(s.state == SessionState.STARTED for s in sessions) <= 1
+
+    for session in storage.by_code.values():
+        ids = [p.telegram_id for p in session.players]
+        assert len(ids) == len(set(ids))
+        assert 1 <= len(ids) <= session.max_players
+        assert session.players[0].telegram_id == session.owner_id
+        if session.state == SessionState.STARTED:
+            assert len(ids) >= session.min_players
+
+    # Nobody got in after the game started (or was finished by the next one)
+    for session, players in started.values():
+        assert session.state in (SessionState.STARTED, SessionState.FINISHED)
+        assert session.players == players
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_interleaved_join_start_newgame_keep_invariants(storage, seed):
+    rng = random.Random(seed)
+    log: Counter = Counter()
+    started: dict = {}
+
+    async def scenario():
+        for _ in range(20):
+            calls = []
+            for _ in range(50):
+                kind = rng.random()
+                if kind < 0.15:
+                    calls.append(newgame(rng, log))
+                elif kind < 0.9:
+                    calls.append(join(rng, log, storage))
+                else:
+                    calls.append(start(rng, log, started, storage))
+            await asyncio.gather(*calls)
+            check_invariants(storage, started)
+
+    asyncio.run(scenario())
+    assert log["newgame"] and log["join"] and log["start"]
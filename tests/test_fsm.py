@@ -0,0 +1,131 @@
+import asyncio
+import sys
+
+import pytest
+
+pytest.importorskip("aiogram")
+
+from aiogram.fsm.storage.base import StorageKey  # noqa: E402
+
+from storage.fsm import FSMStorage  # noqa: E402
+
+
+def key(user_id: int) -> StorageKey:
+    return StorageKey(bot_id=1, chat_id=-100, user_id=user_id)
+
+
+def test_record_pushed_out_while_its_batch_commits_is_read_back(tmp_path):
+    async def scenario():
+        storage = FSMStorage(str(tmp_path / "fsm.db"), max_cached=1)
+        await storage.set_state(key(1), "waiting")
+        # What run_writer does before handing the batch to its thread
+        storage._writing, storage._dirty = storage._dirty, {}
+
+        await storage.set_state(key(2), "other")  # pushes key 1 out of the cache
+        assert await storage.get_state(key(1)) == "waiting"
+        await storage.close()
+
+    asyncio.run(scenario())
+
+
+def test_restart_reads_states_from_disk(tmp_path):
+    async def scenario():
+        path = str(tmp_path / "fsm.db")
+        storage = FSMStorage(path)
+        await storage.set_state(key(1), "waiting")
+        await storage.set_data(key(1), {"code": "ABCD"})
+        await storage.close()
+
+        restarted = FSMStorage(path)
+        assert await restarted.get_state(key(1)) == "waiting"
+        assert await restarted.get_data(key(1)) == {"code": "ABCD"}
+        assert await restarted.get_state(key(2)) is None
+        await restarted.close()
+
+    asyncio.run(scenario())
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_state_expires_after_its_ttl():
+    async def scenario():
+        clock = FakeClock()
+        storage = FSMStorage(ttl=60, clock=clock)
+        await storage.set_state(key(1), "waiting")
+        clock.now += 30
+        await storage.set_data(key(1), {"code": "ABCD"})  # every change restarts the TTL
+
+        clock.now += 59
+        assert await storage.get_state(key(1)) == "waiting"
+        clock.now += 1
+        assert await storage.get_state(key(1)) is None
+        assert await storage.get_data(key(1)) == {}
+        assert storage.live_records == 0
+        assert storage._chats == {}
+
+    asyncio.run(scenario())
+
+
+def test_sweep_removes_only_expired_records():
+    async def scenario():
+        clock = FakeClock()
+        storage = FSMStorage(ttl=60, clock=clock)
+        for user_id in range(10):
+            await storage.set_state(key(user_id), "waiting")
+            clock.now += 10
+
+        assert storage.sweep() == 5  # set at +0 .. +40, now +100
+        assert storage.live_records == 5
+        clock.now += 60
+        assert storage.sweep() == 5
+        assert storage.live_records == 0 and storage._chats == {}
+
+    asyncio.run(scenario())
+
+
+def test_lru_without_a_path_drops_the_least_recently_used():
+    async def scenario():
+        storage = FSMStorage(max_cached=3)
+        for user_id in (1, 2, 3):
+            await storage.set_state(key(user_id), "waiting")
+        await storage.get_state(key(1))  # now the most recently used
+        await storage.set_state(key(4), "waiting")
+
+        assert await storage.get_state(key(2)) is None  # nowhere to read it back from
+        assert [await storage.get_state(key(u)) for u in (1, 3, 4)] == ["waiting"] * 3
+        assert storage.live_records == 3
+        assert storage._chats == {-100: 3}
+        assert storage._dirty == {} and storage._on_disk == {}
+
+    asyncio.run(scenario())
+
+
+def test_memory_stays_flat_with_100k_idle_users():
+    users = 100_000
+
+    async def round_of_idle_users(storage: FSMStorage, clock: FakeClock) -> None:
+        for user_id in range(users):
+            # Everyone opens the join flow in their own chat and walks away
+            await storage.set_state(StorageKey(bot_id=1, chat_id=-user_id, user_id=user_id), "waiting")
+            assert storage.live_records <= storage.max_cached
+        clock.now += storage.ttl
+        storage.sweep()
+        assert storage.live_records == 0
+        assert storage._chats == {} and storage._cache == {}
+
+    async def scenario():
+        clock = FakeClock()
+        storage = FSMStorage(clock=clock)
+        await round_of_idle_users(storage, clock)  # grows the dicts to their working size
+        blocks = sys.getallocatedblocks()
+        await round_of_idle_users(storage, clock)
+        await round_of_idle_users(storage, clock)
+        assert sys.getallocatedblocks() - blocks < 1000
+
+    asyncio.run(scenario())
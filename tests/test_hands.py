@@ -0,0 +1,76 @@
+import asyncio
+
+from app.callbacks import pack
+from i18n import t
+
+GROUP = -100
+PLAYERS = [1, 2, 3, 4, 5, 6]
+
+
+async def start_game(bot, app) -> list:
+    """Open a lobby, let everyone join and start; returns the API calls from the start on."""
+    await bot.message(GROUP, PLAYERS[0], "/newgame")
+    code = app.game_storage.get_by_chat(GROUP).code
+    for user_id in PLAYERS[1:]:
+        await bot.message(GROUP, user_id, f"/join {code}")
+    start = len(bot.requests)
+    await bot.press(GROUP, PLAYERS[0], pack("start"))
+    await bot.drain()
+    return bot.requests[start:]
+
+
+def messages_to(calls, chat_id: int) -> list:
+    return [c.text for c in calls if type(c).__name__ == "SendMessage" and c.chat_id == chat_id]
+
+
+def hand_prefix(app) -> str:
+    code = app.game_storage.get_by_chat(GROUP).code
+    return t("en", "your_hand", code=code, cards="").rstrip()
+
+
+def test_blocked_dms_are_reported_and_the_rest_get_their_hands(bot_app, driver):
+    no_dm = {3, 5}
+
+    async def scenario():
+        async with driver(bot_app, latency=0.001, no_dm=no_dm) as bot:
+            return await start_game(bot, bot_app)
+
+    calls = asyncio.run(scenario())
+    prefix = hand_prefix(bot_app)
+    for user_id in PLAYERS:
+        hands = [text for text in messages_to(calls, user_id) if text.startswith(prefix)]
+        assert len(hands) == (0 if user_id in no_dm else 1), user_id
+
+    session = bot_app.game_storage.get_by_chat(GROUP)
+    names = ", ".join(session.get_player(user_id).username for user_id in sorted(no_dm))
+    assert t("en", "hands_unreachable", players=names) in messages_to(calls, GROUP)
+    stats = bot_app.hand_fanout.stats()
+    assert (stats["delivered"], stats["unreachable"], stats["held"]) == (4, 2, 2)
+
+
+def test_held_hand_is_sent_once_the_player_opens_a_private_chat(bot_app, driver):
+    no_dm = {3}
+
+    async def scenario():
+        async with driver(bot_app, no_dm=no_dm) as bot:
+            await start_game(bot, bot_app)
+            no_dm.clear()  # the player pressed Start in the bot's chat
+            update = bot.updates.message(3, 3, "/start")
+            update["message"]["chat"] = {"id": 3, "type": "private"}
+            return await bot.feed(update)
+
+    calls = asyncio.run(scenario())
+    assert [text for text in messages_to(calls, 3) if text.startswith(hand_prefix(bot_app))]
+    assert bot_app.hand_fanout.stats()["held"] == 0
+
+
+def test_hands_go_out_concurrently_on_a_slow_api(bot_app, driver):
+    latency = 0.1
+
+    async def scenario():
+        async with driver(bot_app, latency=latency, no_dm={2}) as bot:
+            await start_game(bot, bot_app)
+
+    asyncio.run(scenario())
+    # One after another would take len(PLAYERS) * latency
+    assert bot_app.hand_fanout.stats()["seconds_max"] < 3 * latency
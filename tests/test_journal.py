@@ -0,0 +1,198 @@
+import asyncio
+import os
+import random
+from datetime import datetime
+
+import pytest
+
+from game.errors import GameError, SessionNotFound
+from game.events import PlayerJoined
+from game.player import Player
+from game.session import GameSession, SessionState
+from storage.journal import JournalStorage, encode
+
+
+def open_storage(directory) -> JournalStorage:
+    return JournalStorage(str(directory), fsync=False)
+
+
+def started_game(storage: JournalStorage, chat_id: int) -> GameSession:
+    session = storage.create_session(chat_id, owner_id=1)
+    for user_id in (1, 2, 3):
+        session.add_player(user_id, f"user{user_id}")
+    session.start(1)
+    storage.save(session)
+    return session
+
+
+def test_restart_after_snapshot_keeps_newest_session_of_chat(tmp_path):
+    storage = open_storage(tmp_path)
+    game = started_game(storage, chat_id=-100)
+    lobby = storage.create_session(-100, owner_id=2)
+    # The older game becomes the most recently used session
+    storage.get_by_code(game.code)
+    asyncio.run(storage.snapshot())
+    storage.close()
+
+    restarted = open_storage(tmp_path)
+    assert restarted.get_by_chat(-100).code == lobby.code
+    # Over once the chat opened the next game, but still there
+    assert restarted.get_by_code(game.code).state == SessionState.FINISHED
+    assert restarted.check_indexes() == []
+    restarted.close()
+
+
+def test_restart_from_journal_keeps_newest_session_of_chat(tmp_path):
+    storage = open_storage(tmp_path)
+    game = started_game(storage, chat_id=-100)
+    lobby = storage.create_session(-100, owner_id=2)
+    storage.get_by_code(game.code)
+    storage.close()
+
+    restarted = open_storage(tmp_path)
+    assert restarted.get_by_chat(-100).code == lobby.code
+    restarted.close()
+
+
+def test_replayed_players_are_found_by_id(tmp_path):
+    storage = open_storage(tmp_path)
+    game = started_game(storage, chat_id=-100)
+    storage.close()
+
+    restarted = open_storage(tmp_path)
+    session = restarted.get_by_code(game.code)
+    assert [p.telegram_id for p in session.players] == [1, 2, 3]
+    assert session.has_player(2) and session.get_player(3) == game.players[2]
+    with pytest.raises(GameError):
+        session.add_player(2, "again")
+    restarted.close()
+
+
+# -------------------------
+# Crash consistency
+# -------------------------
+def state_of(storage: JournalStorage) -> dict:
+    sessions = {
+        code: (s.chat_id, s.owner_id, s.created_at, s.state, s.min_players, s.max_players, list(s.players))
+        for code, s in storage.by_code.items()
+    }
+    chats = {chat_id: s.code for chat_id, s in storage.by_chat.items()}
+    return {"sessions": sessions, "chats": chats}
+
+
+def play(storage: JournalStorage, seed: int, steps: int = 200) -> None:
+    rng = random.Random(seed)
+    for _ in range(steps):
+        chat_id = rng.randrange(-8, 0)
+        try:
+            session = storage.get_by_chat(chat_id)
+        except SessionNotFound:
+            session = None
+        roll = rng.random()
+        if session is None or roll < 0.2:
+            session = storage.create_session(chat_id, owner_id=rng.randrange(1, 20))
+            session.add_player(session.owner_id, None)
+        elif session.state == SessionState.LOBBY and roll < 0.85:
+            try:
+                session.add_player(rng.randrange(1, 20), None)
+            except GameError:
+                continue
+        elif session.state == SessionState.LOBBY and len(session.players) >= session.min_players:
+            session.start(session.owner_id)
+        else:
+            continue
+        storage.save(session)
+
+
+def crash(storage: JournalStorage) -> None:
+    """Stop without close(): only what the writer already wrote survives."""
+    storage._file.close()
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_restart_matches_state_before_crash(tmp_path, seed):
+    storage = open_storage(tmp_path)
+    play(storage, seed)
+    asyncio.run(storage.snapshot())
+    play(storage, seed + 100)
+    storage.flush()
+    before = state_of(storage)
+    crash(storage)
+
+    restarted = open_storage(tmp_path)
+    assert state_of(restarted) == before
+    assert restarted.check_indexes() == []
+    restarted.close()
+
+
+def test_torn_last_record_is_dropped(tmp_path):
+    storage = open_storage(tmp_path)
+    play(storage, 1)
+    storage.flush()
+    before = state_of(storage)
+    journal = storage._file.name
+    size = os.path.getsize(journal)
+    crash(storage)
+
+    # Half of a record that never finished writing
+    record = encode(PlayerJoined("ZZZZ", Player(99, "@late", datetime(2024, 1, 1))))
+    with open(journal, "ab") as f:
+        f.write(record[: len(record) // 2])
+
+    restarted = open_storage(tmp_path)
+    assert state_of(restarted) == before
+    assert os.path.getsize(journal) == size
+
+    # Records written after the restart follow the valid part, not the garbage
+    play(restarted, 2, steps=50)
+    restarted.flush()
+    after = state_of(restarted)
+    crash(restarted)
+    again = open_storage(tmp_path)
+    assert state_of(again) == after
+    again.close()
+
+
+def test_crash_during_snapshot_before_rename(tmp_path, monkeypatch):
+    storage = open_storage(tmp_path)
+    play(storage, 3)
+    asyncio.run(storage.snapshot())
+    play(storage, 4)
+    before = state_of(storage)
+
+    def crash_before_rename(src, dst):
+        raise OSError("crashed")
+
+    monkeypatch.setattr(os, "replace", crash_before_rename)
+    with pytest.raises(OSError):
+        asyncio.run(storage.snapshot())
+    monkeypatch.undo()
+    crash(storage)
+    # The new snapshot was written out but never renamed into place
+    assert os.path.exists(tmp_path / "snapshot.tmp")
+
+    restarted = open_storage(tmp_path)
+    assert state_of(restarted) == before
+    restarted.close()
+
+
+def test_crash_during_snapshot_after_rename(tmp_path, monkeypatch):
+    storage = open_storage(tmp_path)
+    play(storage, 5)
+    asyncio.run(storage.snapshot())
+    play(storage, 6)
+    before = state_of(storage)
+
+    def crash_before_cleanup(path):
+        raise OSError("crashed")
+
+    # The new snapshot is in place but the journals it covers are still there
+    monkeypatch.setattr(os, "remove", crash_before_cleanup)
+    with pytest.raises(OSError):
+        asyncio.run(storage.snapshot())
+    monkeypatch.undo()
+    crash(storage)
+
+    restarted = open_storage(tmp_path)
+    assert state_of(restarted) == before
+    restarted.close()
@@ -0,0 +1,23 @@
+import asyncio
+import json
+import os
+
+from app.loadgen import FakeSession, Report, regressions
+
+BASELINE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench", "loadgen-baseline.json")
+
+
+def test_stream_content_is_an_empty_file():
+    async def read():
+        return [chunk async for chunk in FakeSession().stream_content("https://example.invalid/file")]
+
+    assert asyncio.run(read()) == []
+
+
+def test_checked_in_baseline_is_a_report():
+    with open(BASELINE, encoding="utf-8") as f:
+        baseline = json.load(f)
+    report = Report(**baseline)
+    assert regressions(report, baseline, 0.0) == []
+    report.updates_per_sec /= 2
+    assert regressions(report, baseline, 0.1)
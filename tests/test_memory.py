@@ -0,0 +1,117 @@
+import asyncio
+from typing import Tuple
+
+import pytest
+
+from game.errors import SessionNotFound
+from game.session import SessionState
+from storage.memory import EvictionPolicy, InMemoryStorage
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_storage(**policy) -> Tuple[InMemoryStorage, FakeClock]:
+    clock = FakeClock()
+    return InMemoryStorage(EvictionPolicy(**policy), clock=clock), clock
+
+
+def test_idle_lobby_expires_after_its_ttl():
+    storage, clock = make_storage(lobby_ttl=60)
+    session = storage.create_session(-1, owner_id=1)
+
+    clock.now += 59
+    assert storage.sweep() == 0
+    clock.now += 1
+    assert storage.sweep() == 1
+    assert storage.evictions["ttl"] == 1
+    with pytest.raises(SessionNotFound):
+        storage.get_by_code(session.code)
+    with pytest.raises(SessionNotFound):
+        storage.get_by_chat(-1)
+
+
+def test_touched_lobby_gets_a_new_deadline():
+    storage, clock = make_storage(lobby_ttl=60)
+    session = storage.create_session(-1, owner_id=1)
+
+    clock.now += 50
+    storage.get_by_chat(-1)
+    clock.now += 50  # past the first deadline, not the second
+    assert storage.sweep() == 0
+    assert storage.get_by_code(session.code) is session
+
+    clock.now += 60
+    assert storage.sweep() == 1
+    # The entry pushed back on the heap was the only one left
+    assert storage._scheduled == {}
+
+
+def test_state_change_switches_ttl():
+    storage, clock = make_storage(lobby_ttl=60, started_ttl=None, finished_ttl=10)
+    session = storage.create_session(-1, owner_id=1)
+    session.state = SessionState.STARTED
+    storage.save(session)
+
+    clock.now += 1000
+    assert storage.sweep() == 0  # started games have no TTL
+
+    session.state = SessionState.FINISHED
+    storage.save(session)
+    clock.now += 10
+    assert storage.sweep() == 1
+
+
+def test_sweep_only_pops_due_entries():
+    storage, clock = make_storage(lobby_ttl=60)
+    for chat_id in range(-10, 0):
+        storage.create_session(chat_id, owner_id=1)
+        clock.now += 10
+
+    clock.now = 1000 + 60 + 25  # the first three are due
+    assert storage.sweep() == 3
+    assert len(storage._expiry) == 7
+    assert storage.live_sessions == 7
+
+
+def test_lru_cap_drops_least_recently_used():
+    storage, clock = make_storage(lobby_ttl=None, max_sessions=3)
+    first = storage.create_session(-1, owner_id=1)
+    second = storage.create_session(-2, owner_id=1)
+    storage.create_session(-3, owner_id=1)
+
+    clock.now += 1
+    storage.get_by_code(first.code)  # now the most recently used
+    storage.create_session(-4, owner_id=1)
+
+    assert storage.live_sessions == 3
+    assert storage.evictions["lru"] == 1
+    assert second.code not in storage.by_code
+    assert -2 not in storage.by_chat
+    assert storage.get_by_chat(-1) is first
+    assert storage.check_indexes() == []
+
+
+def test_repeated_games_in_one_chat_do_not_pile_up():
+    storage, clock = make_storage(finished_ttl=600)
+    live = []
+    for _ in range(2000):
+        session = storage.create_session(-1, owner_id=1)
+        session.add_player(1, "one")
+        session.add_player(2, "two")
+        session.add_player(3, "three")
+        session.start(1)
+        storage.save(session)
+        clock.now += 300  # a game every five minutes
+        storage.sweep()
+        live.append(storage.live_sessions)
+
+    # Only the games still inside finished_ttl stay, however many were played
+    assert max(live[100:]) == max(live[:100]) <= 3
+    assert asyncio.run(storage.sessions_of_user(3)) == [session]
+    assert storage.check_indexes() == []
@@ -0,0 +1,188 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiogram")
+
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter  # noqa: E402
+from aiogram.methods import SendMessage  # noqa: E402
+
+from app.outbound import OutboundScheduler  # noqa: E402
+
+GROUP = -100
+OTHER_GROUP = -200
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeBot:
+    """Records each call with the fake time; `fail` maps a call number to the error it raises."""
+
+    def __init__(self, clock: FakeClock) -> None:
+        self.clock = clock
+        self.calls = []
+        self.fail = {}
+
+    async def send_message(self, **kwargs):
+        return self._call("send_message", kwargs)
+
+    async def edit_message_text(self, **kwargs):
+        return self._call("edit_message_text", kwargs)
+
+    def _call(self, method, kwargs):
+        error = self.fail.pop(len(self.calls), None)
+        self.calls.append((self.clock.now, method, kwargs))
+        if error is not None:
+            raise error
+        return kwargs["text"]
+
+
+def make(**rates):
+    clock = FakeClock()
+    return OutboundScheduler(clock=clock, **rates), FakeBot(clock), clock
+
+
+async def pump(outbox: OutboundScheduler, bot: FakeBot) -> float:
+    """Start what may go now and let those sends finish."""
+    wait = outbox.pump(bot)
+    while outbox._sending:
+        await asyncio.sleep(0)
+    return wait
+
+
+async def drain(outbox: OutboundScheduler, bot: FakeBot, clock: FakeClock) -> None:
+    """Run the queue to the end, jumping the clock over every wait."""
+    while True:
+        wait = await pump(outbox, bot)
+        if wait == float("inf"):
+            if not outbox._ready:
+                return
+            wait = 0.0  # only waited on a send in flight
+        clock.now += wait
+
+
+def test_pending_edits_of_a_message_are_coalesced():
+    async def scenario():
+        outbox, bot, clock = make()
+        futures = [outbox.edit_message_text(GROUP, 7, f"v{i}") for i in range(5)]
+        outbox.edit_message_text(GROUP, 8, "other message")
+        await drain(outbox, bot, clock)
+
+        assert [(m, k["message_id"], k["text"]) for _, m, k in bot.calls] == [
+            ("edit_message_text", 7, "v4"), ("edit_message_text", 8, "other message"),
+        ]
+        # Every caller gets the result of the edit that was sent
+        assert [f.result() for f in futures] == ["v4"] * 5
+        assert outbox.coalesced == 4 and outbox.depth == 0
+
+    asyncio.run(scenario())
+
+
+def test_edit_after_the_first_was_sent_is_sent_again():
+    async def scenario():
+        outbox, bot, clock = make()
+        outbox.edit_message_text(GROUP, 7, "v1")
+        await pump(outbox, bot)
+        outbox.edit_message_text(GROUP, 7, "v2")
+        await drain(outbox, bot, clock)
+        assert [k["text"] for _, _, k in bot.calls] == ["v1", "v2"]
+
+    asyncio.run(scenario())
+
+
+def test_group_bucket_spaces_sends_after_the_burst():
+    async def scenario():
+        outbox, bot, clock = make(group_rate=1 / 3, group_burst=2)
+        start = clock.now
+        for i in range(4):
+            outbox.send_message(GROUP, f"m{i}")
+        await drain(outbox, bot, clock)
+        times = [round(t - start, 6) for t, _, _ in bot.calls]
+        assert times == [0, 0, 3, 6]
+
+    asyncio.run(scenario())
+
+
+def test_private_chats_have_their_own_bucket():
+    async def scenario():
+        outbox, bot, clock = make(group_rate=1 / 60, group_burst=1, private_rate=1, private_burst=1)
+        start = clock.now
+        for i in range(2):
+            outbox.send_message(GROUP, f"g{i}")
+            outbox.send_message(1, f"p{i}")
+        await drain(outbox, bot, clock)
+        at = {k["text"]: round(t - start, 6) for t, _, k in bot.calls}
+        assert at == {"g0": 0, "p0": 0, "p1": 1, "g1": 60}
+
+    asyncio.run(scenario())
+
+
+def test_global_bucket_caps_all_chats_together():
+    async def scenario():
+        outbox, bot, clock = make(global_rate=2, private_rate=100, private_burst=100)
+        start = clock.now
+        for user_id in range(1, 7):
+            outbox.send_message(user_id, "hand")
+        await drain(outbox, bot, clock)
+        times = [round(t - start, 6) for t, _, _ in bot.calls]
+        # A burst of two, then one every half second
+        assert times == [0, 0, 0.5, 1.0, 1.5, 2.0]
+
+    asyncio.run(scenario())
+
+
+def test_busy_chat_does_not_hold_up_the_others():
+    async def scenario():
+        outbox, bot, clock = make(group_rate=1 / 60, group_burst=1)
+        for i in range(3):
+            outbox.send_message(GROUP, f"busy{i}")
+        outbox.send_message(OTHER_GROUP, "quiet")
+        await pump(outbox, bot)
+        assert {k["text"] for _, _, k in bot.calls} == {"busy0", "quiet"}
+
+    asyncio.run(scenario())
+
+
+def test_retry_after_pauses_only_that_chat_and_resends():
+    async def scenario():
+        outbox, bot, clock = make()
+        start = clock.now
+        bot.fail[0] = TelegramRetryAfter(
+            method=SendMessage(chat_id=GROUP, text="x"), message="Too Many Requests", retry_after=7,
+        )
+        first = outbox.send_message(GROUP, "first")
+        second = outbox.send_message(GROUP, "second")
+        await pump(outbox, bot)
+        outbox.send_message(OTHER_GROUP, "elsewhere")
+        assert await pump(outbox, bot) == pytest.approx(7)  # the other chat went meanwhile
+
+        await drain(outbox, bot, clock)
+        sent = [(k["chat_id"], k["text"], round(t - start, 6)) for t, _, k in bot.calls]
+        assert sent == [
+            (GROUP, "first", 0), (OTHER_GROUP, "elsewhere", 0),
+            (GROUP, "first", 7), (GROUP, "second", 7),  # in order, after the pause
+        ]
+        assert (first.result(), second.result()) == ("first", "second")
+        assert outbox.retries == 1 and outbox.depth == 0
+
+    asyncio.run(scenario())
+
+
+def test_edit_that_changes_nothing_is_not_an_error():
+    async def scenario():
+        outbox, bot, clock = make()
+        bot.fail[0] = TelegramBadRequest(
+            method=SendMessage(chat_id=GROUP, text="x"), message="message is not modified",
+        )
+        edit = outbox.edit_message_text(GROUP, 7, "same")
+        await drain(outbox, bot, clock)
+        assert edit.result() is None
+        assert outbox.failed == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,110 @@
+import random
+from typing import List, Optional, Tuple
+
+import pytest
+
+from game.deck import (
+    CARD_NAMES, ITEMS, LOCATIONS, SUSPECTS, Deal, cards_of, deal, deal_many, mask_of,
+)
+from game.resolver import NO_REFUTATION, check_accusation, resolve_suggestion, suggestion_mask
+
+# The straightforward version with card names in lists, as the bitmask code
+# must behave.
+CASES = [(s, i, l) for s in SUSPECTS for i in ITEMS for l in LOCATIONS]
+
+
+def reference_deal(players: int, rng: random.Random) -> Tuple[Tuple[str, str, str], List[List[str]]]:
+    # Same draws from the same stream as deal(): case file, then Fisher–Yates from the end
+    case = CASES[int(rng.random() * len(CASES))]
+    deck = [name for name in CARD_NAMES if name not in case]
+    hands: List[List[str]] = [[] for _ in range(players)]
+    seat = 0
+    for i in range(len(deck) - 1, -1, -1):
+        j = int(rng.random() * (i + 1))
+        hands[seat].append(deck[j])
+        deck[j] = deck[i]
+        seat = (seat + 1) % players
+    return case, hands
+
+
+def reference_refutation(hands: List[List[str]], suggester: int, suggestion: List[str]) -> Tuple[Optional[int], List[str]]:
+    seat = suggester
+    for _ in range(len(hands) - 1):
+        seat = (seat + 1) % len(hands)
+        shown = [card for card in suggestion if card in hands[seat]]
+        if shown:
+            return seat, shown
+    return None, []
+
+
+def names(mask: int) -> List[str]:
+    return sorted(CARD_NAMES[card] for card in cards_of(mask))
+
+
+def ids(cards) -> List[int]:
+    return [CARD_NAMES.index(card) for card in cards]
+
+
+@pytest.mark.parametrize("players", range(1, 7))
+def test_deal_matches_reference(players):
+    for seed in range(300):
+        game = deal(players, random.Random(seed))
+        case, hands = reference_deal(players, random.Random(seed))
+        assert names(game.case_file) == sorted(case)
+        assert [names(hand) for hand in game.hands] == [sorted(hand) for hand in hands]
+
+
+@pytest.mark.parametrize("players", range(1, 7))
+def test_deal_is_a_partition(players):
+    for game in deal_many(300, players, seed=players):
+        suspect, item, location = cards_of(game.case_file)
+        assert (CARD_NAMES[suspect], CARD_NAMES[item], CARD_NAMES[location]) in CASES
+        everything = game.case_file
+        for hand in game.hands:
+            assert everything & hand == 0
+            everything |= hand
+        assert everything == mask_of(range(len(CARD_NAMES)))
+        sizes = [len(cards_of(hand)) for hand in game.hands]
+        assert max(sizes) - min(sizes) <= 1
+        assert sizes == sorted(sizes, reverse=True)  # extra cards go to the first seats
+
+
+@pytest.mark.parametrize("players", range(2, 7))
+def test_resolver_matches_reference(players):
+    rng = random.Random(players)
+    for _ in range(2000):
+        game = deal(players, rng)
+        hands = [names(hand) for hand in game.hands]
+        suggester = rng.randrange(players)
+        suggestion = [rng.choice(SUSPECTS), rng.choice(ITEMS), rng.choice(LOCATIONS)]
+
+        refutation = resolve_suggestion(game.hands, suggester, suggestion_mask(*ids(suggestion)))
+        refuter, shown = reference_refutation(hands, suggester, suggestion)
+        assert refutation.refuter == refuter
+        assert names(refutation.cards) == sorted(shown)
+        if refuter is None:
+            assert refutation == NO_REFUTATION
+
+
+def test_accusation_matches_reference():
+    rng = random.Random(7)
+    for game in deal_many(2000, 4, seed=7):
+        case = names(game.case_file)
+        accusation = [rng.choice(SUSPECTS), rng.choice(ITEMS), rng.choice(LOCATIONS)]
+        if rng.random() < 0.2:
+            accusation = list(case)
+        assert check_accusation(game.case_file, mask_of(ids(accusation))) == (sorted(accusation) == case)
+
+
+def test_suggestion_mask_rejects_wrong_categories():
+    suspect, item, location = ids([SUSPECTS[0], ITEMS[0], LOCATIONS[0]])
+    with pytest.raises(ValueError):
+        suggestion_mask(item, suspect, location)
+    with pytest.raises(ValueError):
+        suggestion_mask(suspect, item, item)
+
+
+def test_deal_needs_a_player():
+    with pytest.raises(ValueError):
+        deal(0)
+    assert isinstance(deal(1), Deal)
@@ -0,0 +1,148 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from game.errors import SessionNotFound
+from game.session import GameSession, SessionState
+from storage.memory import EvictionPolicy
+from storage.sqlite import SQLiteStorage
+
+
+def count_reads(storage: SQLiteStorage) -> list:
+    queries = []
+    storage._reader.set_trace_callback(queries.append)
+    return queries
+
+
+def test_lookups_without_a_session_do_not_query(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "bot.db"))
+    queries = count_reads(storage)
+    for _ in range(100):
+        with pytest.raises(SessionNotFound):
+            storage.get_by_chat(-100)
+    with pytest.raises(SessionNotFound):
+        storage.get_by_code("ZZZZ")
+    storage.create_session(-200, owner_id=1)
+    assert queries == []
+    storage.close()
+
+
+def test_unloaded_session_is_found_before_it_is_written(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "bot.db"), policy=EvictionPolicy(max_sessions=1))
+    first = storage.create_session(-100, owner_id=1)
+    first.add_player(1, "one")
+    storage.save(first)
+    storage.create_session(-200, owner_id=2)  # unloads the first by the LRU cap
+    assert first.code not in storage.by_code
+
+    assert storage.get_by_chat(-100) is first
+    assert asyncio.run(storage.sessions_of_user(1)) == [first]
+    storage.close()
+
+
+def started_game(storage: SQLiteStorage, chat_id: int) -> GameSession:
+    game = storage.create_session(chat_id, owner_id=1)
+    for user_id in (1, 2, 3):
+        game.add_player(user_id, f"user{user_id}")
+    game.start(1)
+    storage.save(game)
+    return game
+
+
+def test_restart_loads_newest_session_of_chat(tmp_path):
+    path = str(tmp_path / "bot.db")
+    storage = SQLiteStorage(path)
+    over = started_game(storage, -100)
+    lobby = storage.create_session(-100, owner_id=2)  # finishes the game before it
+    running = started_game(storage, -200)
+    storage.close()
+
+    restarted = SQLiteStorage(path)
+    assert restarted.get_by_chat(-100).code == lobby.code
+    assert [s.code for s in asyncio.run(restarted.sessions_of_user(3))] == [running.code]
+    assert restarted._code_taken(running.code)
+    assert not restarted._code_taken(over.code)
+    restarted.close()
+
+
+class WallClock:
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_preloaded_session_is_looked_up_without_a_query(tmp_path):
+    path = str(tmp_path / "bot.db")
+    storage = SQLiteStorage(path)
+    game = started_game(storage, -100)
+    storage.close()
+
+    restarted = SQLiteStorage(path)
+    asyncio.run(restarted.preload_chat(-100))
+    assert game.code in restarted.by_code
+    queries = count_reads(restarted)
+    assert restarted.get_by_chat(-100).code == game.code
+    assert restarted.get_by_code(game.code.lower()).code == game.code
+    assert queries == []
+    restarted.close()
+
+
+def test_restart_finishes_and_prunes_abandoned_sessions(tmp_path):
+    path = str(tmp_path / "bot.db")
+    wall = WallClock()
+    policy = EvictionPolicy(lobby_ttl=60, started_ttl=600, finished_ttl=60)
+    storage = SQLiteStorage(path, policy=policy, wall=wall)
+    for chat_id in range(-50, 0):
+        started_game(storage, chat_id)
+    lobby = storage.create_session(-100, owner_id=1)
+    storage.close()
+
+    wall.now += 120  # past lobby_ttl only
+    restarted = SQLiteStorage(path, policy=policy, wall=wall)
+    assert not restarted._code_taken(lobby.code)
+    assert len(restarted._live_codes) == 50
+    restarted.close()
+
+    wall.now += 600  # past started_ttl, and the lobby past finished_ttl
+    restarted = SQLiteStorage(path, policy=policy, wall=wall)
+    assert restarted._live_codes == {}
+    assert restarted._reader.execute("SELECT COUNT(*) FROM sessions").fetchone() == (0,)
+    assert restarted._reader.execute("SELECT COUNT(*) FROM players").fetchone() == (0,)
+    restarted.close()
+
+
+def test_prune_skips_sessions_in_memory(tmp_path):
+    wall = WallClock()
+    policy = EvictionPolicy(lobby_ttl=60, max_sessions=1)
+    storage = SQLiteStorage(str(tmp_path / "bot.db"), policy=policy, wall=wall)
+    first = storage.create_session(-100, owner_id=1)
+    second = storage.create_session(-200, owner_id=1)  # unloads the first
+    storage.flush()
+
+    wall.now += 60
+    assert asyncio.run(storage.prune()) == 1
+    assert not storage._code_taken(first.code)
+    assert storage.get_by_chat(-200) is second
+    storage.flush()
+    states = dict(storage._reader.execute("SELECT code, state FROM sessions"))
+    assert states == {first.code: SessionState.FINISHED.value, second.code: SessionState.LOBBY.value}
+    storage.close()
+
+
+def test_file_without_updated_at_is_migrated(tmp_path):
+    path = str(tmp_path / "bot.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE sessions (code TEXT PRIMARY KEY, chat_id INTEGER NOT NULL, owner_id INTEGER NOT NULL,"
+        " created_at TEXT NOT NULL, state TEXT NOT NULL, min_players INTEGER NOT NULL, max_players INTEGER NOT NULL)"
+    )
+    conn.execute("INSERT INTO sessions VALUES ('ABCD', -100, 1, '2024-01-01T00:00:00', 'LOBBY', 3, 6)")
+    conn.commit()
+    conn.close()
+
+    storage = SQLiteStorage(path)  # old rows get a full TTL, not pruned
+    assert storage.get_by_chat(-100).code == "ABCD"
+    storage.close()
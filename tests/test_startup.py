@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ("aiogram", "app.board", "app.hands", "app.outbound", "app.timers", "storage.fsm", "storage.prefs")
+
+CHECK = """
+import runpy, sys
+sys.argv = ["bot.py", "--check"]
+try:
+    runpy.run_path("bot.py", run_name="__main__")
+except SystemExit as e:
+    print(e.code, "aiogram" in sys.modules)
+"""
+
+
+def run(code: str) -> str:
+    env = dict(os.environ, BOT_TOKEN="123456:test")
+    done = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True)
+    assert done.returncode == 0, done.stderr
+    return done.stdout.strip()
+
+
+def test_importing_bot_defers_aiogram_and_services():
+    assert run(f"import sys, bot; print([m for m in {HEAVY!r} if m in sys.modules])") == "[]"
+
+
+def test_check_runs_without_aiogram():
+    assert run(CHECK).splitlines()[-1] == "0 False"
@@ -0,0 +1,204 @@
+import asyncio
+import json
+
+from app.timers import LEVELS, SLOTS, TimerWheel
+from storage.memory import EvictionPolicy, InMemoryStorage
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+async def noop(code: str) -> None:
+    pass
+
+
+def wheel_for(storage: InMemoryStorage, **kwargs) -> TimerWheel:
+    wheel = TimerWheel(**kwargs)
+    wheel.on("autostart", noop)
+    wheel.on("turn", noop)
+    storage.on_eviction(lambda session, reason: wheel.cancel_session(session.code))
+    return wheel
+
+
+def test_replaced_lobby_takes_its_timers_along():
+    storage = InMemoryStorage()
+    wheel = wheel_for(storage)
+    old = storage.create_session(-1, owner_id=1)
+    wheel.schedule(old.code, "autostart", 60)
+    wheel.schedule(old.code, "turn", 30)
+
+    new = storage.create_session(-1, owner_id=2)
+    wheel.schedule(new.code, "autostart", 60)
+    assert wheel.remaining(old.code, "autostart") is None
+    assert wheel.remaining(old.code, "turn") is None
+    assert len(wheel) == 1
+
+
+def test_expired_lobby_timers_are_not_persisted(tmp_path):
+    clock = FakeClock()
+    storage = InMemoryStorage(EvictionPolicy(lobby_ttl=60), clock=clock)
+    path = str(tmp_path / "timers.json")
+    wheel = wheel_for(storage, path=path, clock=clock)
+    lobby = storage.create_session(-1, owner_id=1)
+    wheel.schedule(lobby.code, "autostart", 120)
+    wheel.flush()
+
+    clock.now += 60
+    assert storage.sweep() == 1
+    wheel.flush()
+    with open(path) as f:
+        assert json.load(f) == []
+
+
+def test_lru_unload_of_a_memory_session_cancels_timers():
+    storage = InMemoryStorage(EvictionPolicy(max_sessions=1))
+    wheel = wheel_for(storage)
+    first = storage.create_session(-1, owner_id=1)
+    wheel.schedule(first.code, "autostart", 60)
+    storage.create_session(-2, owner_id=1)
+    assert len(wheel) == 0
+
+
+def recording_wheel(clock: FakeClock, **kwargs):
+    fired = []
+
+    async def record(code: str) -> None:
+        fired.append(code)
+
+    wheel = TimerWheel(clock=clock, **kwargs)
+    wheel.on("turn", record)
+    return wheel, fired
+
+
+async def advance_to(wheel: TimerWheel, clock: FakeClock, now: float) -> int:
+    clock.now = now
+    count = wheel.advance()
+    await asyncio.sleep(0)  # let the handlers run
+    return count
+
+
+def test_advance_fires_on_the_deadline_not_before():
+    async def scenario():
+        clock = FakeClock()
+        start = clock.now
+        wheel, fired = recording_wheel(clock)
+        wheel.schedule("AAAA", "turn", 5)
+        wheel.schedule("BBBB", "turn", 2.5)  # rounded up to the next tick
+
+        assert await advance_to(wheel, clock, start + 2) == 0
+        assert await advance_to(wheel, clock, start + 3) == 1
+        assert fired == ["BBBB"]
+        assert wheel.remaining("AAAA", "turn") == 2
+        assert await advance_to(wheel, clock, start + 4.9) == 0
+        assert await advance_to(wheel, clock, start + 5) == 1
+        assert fired == ["BBBB", "AAAA"] and len(wheel) == 0
+
+    asyncio.run(scenario())
+
+
+# Delays either side of every level boundary
+BOUNDARIES = sorted({
+    d for level in range(1, LEVELS) for n in (SLOTS ** level,) for d in (n - 1, n, n + 1, 2 * n + 3)
+} | {1, 2, SLOTS ** LEVELS + 10})
+
+
+def test_timers_move_down_the_levels_and_fire_on_their_tick():
+    async def scenario():
+        clock = FakeClock()
+        start = clock.now
+        wheel, fired = recording_wheel(clock)
+        for delay in BOUNDARIES:
+            wheel.schedule(str(delay), "turn", delay)
+
+        for delay in BOUNDARIES:
+            assert await advance_to(wheel, clock, start + delay - 1) == 0, delay
+            assert await advance_to(wheel, clock, start + delay) == 1, delay
+            assert fired[-1] == str(delay)
+        assert len(wheel) == 0
+
+    asyncio.run(scenario())
+
+
+def test_one_big_jump_fires_everything_due():
+    async def scenario():
+        clock = FakeClock()
+        wheel, fired = recording_wheel(clock)
+        for delay in BOUNDARIES:
+            wheel.schedule(str(delay), "turn", delay)
+        start = clock.now
+        due = sum(d <= SLOTS ** 3 for d in BOUNDARIES)
+        assert await advance_to(wheel, clock, start + SLOTS ** 3) == due
+        assert await advance_to(wheel, clock, start + SLOTS ** LEVELS + 10) == len(BOUNDARIES) - due
+        assert sorted(fired, key=int) == [str(d) for d in BOUNDARIES]
+
+    asyncio.run(scenario())
+
+
+def test_rescheduling_moves_the_timer():
+    async def scenario():
+        clock = FakeClock()
+        start = clock.now
+        wheel, fired = recording_wheel(clock)
+        wheel.schedule("AAAA", "turn", 5000)
+        wheel.schedule("AAAA", "turn", 10)  # same session and kind: replaced
+        assert len(wheel) == 1
+        assert await advance_to(wheel, clock, start + 10) == 1
+        assert await advance_to(wheel, clock, start + 5000) == 0
+        assert fired == ["AAAA"]
+
+    asyncio.run(scenario())
+
+
+def test_run_sleeps_until_the_clock_reaches_the_deadline():
+    async def scenario():
+        clock = FakeClock()
+        # Short ticks (exact in binary) so run() only sleeps for milliseconds
+        tick = 2 ** -8
+        wheel, fired = recording_wheel(clock, tick=tick)
+        task = asyncio.create_task(wheel.run())
+        wheel.schedule("AAAA", "turn", 2 * tick)
+        await asyncio.sleep(0.03)
+        assert fired == []  # the fake clock has not moved
+
+        clock.now += 2 * tick
+        await asyncio.sleep(0.03)
+        assert fired == ["AAAA"]
+        task.cancel()
+
+    asyncio.run(scenario())
+
+
+def test_saved_timers_of_sessions_gone_after_a_restart_are_dropped(tmp_path):
+    path = str(tmp_path / "timers.json")
+    storage = InMemoryStorage()
+    wheel = wheel_for(storage, path=path)
+    lobby = storage.create_session(-1, owner_id=1)
+    wheel.schedule(lobby.code, "autostart", 60)
+    wheel.schedule("ZZZZ", "turn", 60)
+    wheel.flush()
+
+    # Still there (as with a database): only the other timer goes
+    restored = TimerWheel(path)
+    assert restored.retain(storage.has_session) == 1
+    assert restored.remaining(lobby.code, "autostart") is not None
+
+    # In-memory storage starts empty, so a reused code cannot inherit a deadline
+    restored = TimerWheel(path)
+    assert restored.retain(InMemoryStorage().has_session) == 2
+    assert len(restored) == 0
+
+
+def test_create_app_drops_timers_of_lost_sessions(bot_app, tmp_path, monkeypatch):
+    from app import loadgen
+
+    path = str(tmp_path / "timers.json")
+    with open(path, "w") as f:
+        json.dump([["ABCD", "autostart", 1e12]], f)
+    monkeypatch.setenv("TIMERS_PATH", path)
+    app = loadgen.load_app()
+    assert len(app.timers) == 0